@@ -29,6 +29,10 @@ from datetime import datetime
 # Import our auth and security modules
 from auth import auth_manager
 from security import security_manager
+from parsers import (format_bytes, parse_audit_log_line, parse_event_line, parse_list_response,
+                     parse_security_log_line)
+from request_trace import TRACED_ENDPOINTS, request_trace
+from metrics import metrics
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests from dashboard
@@ -62,8 +66,10 @@ def require_auth(f):
     return decorated_function
 
 # C Server connection settings
-C_SERVER_HOST = '127.0.0.1'
-C_SERVER_PORT = 8888
+C_SERVER_HOST = os.environ.get('FILE_SERVER_HOST', '127.0.0.1')
+C_SERVER_PORT = int(os.environ.get('FILE_SERVER_PORT', '8888'))
+API_PORT = int(os.environ.get('API_PORT', '5000'))
+API_DEBUG = os.environ.get('API_DEBUG', '1') == '1'
 
 # Paths to C server's data directories (relative to project root, not api_layer/)
 STORAGE_DIR = '../storage/'
@@ -80,6 +86,49 @@ def log_event(action, detail):
     print(f"[{timestamp}] {action}: {detail}")
 
 
+# ==================== REQUEST TRACE (API_TRACE_LOG) ====================
+@app.before_request
+def trace_start():
+    request.trace_started = time.time()
+
+@app.after_request
+def trace_finish(response):
+    """Record file operations for workload replay (benchmarks/replay.py)"""
+    op = TRACED_ENDPOINTS.get(request.endpoint)
+    if op and request_trace.enabled:
+        session = getattr(request, 'session', None) or {}
+        name, nbytes = getattr(request, 'trace', (None, 0))
+        if name is None and request.view_args and 'filename' in request.view_args:
+            name = f"{session.get('username', 'anonymous')}/{request.view_args['filename']}"
+        if op == 'download' and response.status_code == 200:
+            nbytes = response.content_length or 0
+        request_trace.record(request.trace_started, op, name, nbytes, response.status_code,
+                             time.time() - request.trace_started)
+    return response
+
+
+# ==================== METRICS (API_METRICS) ====================
+@app.before_request
+def metrics_start():
+    request.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    request.metrics_started = time.perf_counter()
+    metrics.request_started(request.metrics_route)
+
+@app.after_request
+def metrics_finish(response):
+    if hasattr(request, 'metrics_started'):
+        metrics.request_finished(request.metrics_route, request.method, response.status_code,
+                                 time.perf_counter() - request.metrics_started)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def serve_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    if not metrics.enabled:
+        return 'metrics disabled\n', 404, {'Content-Type': 'text/plain'}
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
 # ==================== DASHBOARD SERVING ====================
 @app.route('/', methods=['GET'])
 def serve_dashboard():
@@ -156,17 +205,23 @@ def send_to_c_server(command):
     This demonstrates proper client-server separation
     """
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10)
-        sock.connect((C_SERVER_HOST, C_SERVER_PORT))
-        
-        # Auth + command in one flow to match server parser
-        auth_header = f"AUTH {AUTH_TOKEN}\n"
-        sock.sendall(auth_header.encode())
-        sock.sendall(command.encode() + b'\n')
-        response = sock.recv(4096).decode().strip()
-        
-        sock.close()
+        with metrics.c_server_call(command) as call:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(10)
+            sock.connect((C_SERVER_HOST, C_SERVER_PORT))
+
+            # Auth + command in one flow to match server parser
+            auth_header = f"AUTH {AUTH_TOKEN}\n".encode()
+            sock.sendall(auth_header)
+            sock.sendall(command.encode() + b'\n')
+            call.sent = len(auth_header) + len(command) + 1
+            reply = sock.recv(4096)
+            call.received = len(reply)
+            response = reply.decode().strip()
+            if response.startswith('ERROR'):
+                call.fail(response)
+
+            sock.close()
         return {'success': True, 'response': response}
     except socket.timeout:
         return {'success': False, 'error': 'C server timeout'}
@@ -214,16 +269,21 @@ def api_upload():
         file.save(tmp)
     
     file_size = os.path.getsize(temp_path)
+    request.trace = (user_file_path, file_size)
     # Use user-specific path for storage isolation
     command = f"UPLOAD {user_file_path} {file_size}\n"
     
     try:
         # Open one TCP connection and follow the same protocol as the Python CLI client
-        with socket.create_connection((C_SERVER_HOST, C_SERVER_PORT), timeout=10) as sock:
+        with metrics.c_server_call(command) as call, \
+                socket.create_connection((C_SERVER_HOST, C_SERVER_PORT), timeout=10) as sock:
             sock.sendall(f"AUTH {AUTH_TOKEN}\n".encode())
             sock.sendall(command.encode())
+            call.sent = len(f"AUTH {AUTH_TOKEN}\n") + len(command)
             ready = sock.recv(1024).decode()
+            call.received = len(ready)
             if 'READY' not in ready:
+                call.fail(ready)
                 os.remove(temp_path)
                 return jsonify({'success': False, 'error': ready}), 500
 
@@ -233,8 +293,10 @@ def api_upload():
                     if not chunk:
                         break
                     sock.sendall(chunk)
+            call.sent += file_size
 
             final_response = sock.recv(1024).decode()
+            call.received += len(final_response)
             os.remove(temp_path)
 
             if 'SUCCESS' in final_response:
@@ -245,6 +307,7 @@ def api_upload():
                     'filename': safe_name,
                     'os_operations': ['open()', 'fcntl(F_WRLCK)', 'write()', 'close()']
                 })
+            call.fail(final_response)
             log_event('UPLOAD', f"failed - {username}/{safe_name} :: {final_response.strip()}")
             return jsonify({'success': False, 'error': final_response}), 500
     except Exception as e:
@@ -269,38 +332,44 @@ def api_download(filename):
     command = f"DOWNLOAD {user_file_path}"
     
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((C_SERVER_HOST, C_SERVER_PORT))
-        sock.sendall(f"AUTH {AUTH_TOKEN}\n".encode())
-        sock.sendall(command.encode() + b'\n')
-        
-        # Get response with file size
-        response = sock.recv(1024).decode().strip().split('\n')[0]
-        
-        if 'SUCCESS' in response:
-            # Extract file size
-            parts = response.split()
-            file_size = int(parts[1])
-            
-            # Receive file data
-            temp_path = f'/tmp/download_{filename}'
-            with open(temp_path, 'wb') as f:
-                remaining = file_size
-                while remaining > 0:
-                    chunk_size = min(4096, remaining)
-                    chunk = sock.recv(chunk_size)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    remaining -= len(chunk)
-            
-            sock.close()
-            log_event('DOWNLOAD', f"ok - {filename} ({file_size} bytes)")
-            return send_file(temp_path, as_attachment=True, download_name=filename)
-        else:
-            log_event('DOWNLOAD', f"failed - {filename} :: {response}")
-            return jsonify({'success': False, 'error': response}), 404
-            
+        with metrics.c_server_call(command) as call:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.connect((C_SERVER_HOST, C_SERVER_PORT))
+            sock.sendall(f"AUTH {AUTH_TOKEN}\n".encode())
+            sock.sendall(command.encode() + b'\n')
+            call.sent = len(f"AUTH {AUTH_TOKEN}\n") + len(command) + 1
+
+            # Get response with file size
+            header = sock.recv(1024)
+            call.received = len(header)
+            response = header.decode().strip().split('\n')[0]
+
+            if 'SUCCESS' in response:
+                # Extract file size
+                parts = response.split()
+                file_size = int(parts[1])
+
+                # Receive file data
+                temp_path = f'/tmp/download_{filename}'
+                with open(temp_path, 'wb') as f:
+                    remaining = file_size
+                    while remaining > 0:
+                        chunk_size = min(4096, remaining)
+                        chunk = sock.recv(chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        call.received += len(chunk)
+                        remaining -= len(chunk)
+
+                sock.close()
+                log_event('DOWNLOAD', f"ok - {filename} ({file_size} bytes)")
+                return send_file(temp_path, as_attachment=True, download_name=filename)
+            else:
+                call.fail(response)
+                log_event('DOWNLOAD', f"failed - {filename} :: {response}")
+                return jsonify({'success': False, 'error': response}), 404
+
     except Exception as e:
         log_event('DOWNLOAD', f"exception - {filename} :: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -352,25 +421,18 @@ def api_list():
     result = send_to_c_server(command)
     
     if result['success']:
-        # Parse file list from response
-        response_lines = result['response'].split('\n')
+        # Parse file list from response: "filename.txt (1234 bytes)"
         files = []
-        
-        for line in response_lines:
-            if '(' in line and 'bytes)' in line:
-                # Parse: "filename.txt (1234 bytes)"
-                parts = line.split('(')
-                if len(parts) == 2:
-                    filename = parts[0].strip()
-                    # Remove username prefix if present for display
-                    if filename.startswith(f"{username}/"):
-                        filename = filename[len(username)+1:]
-                    size_str = parts[1].split()[0]
-                    files.append({
-                        'name': filename,
-                        'size': int(size_str),
-                        'size_human': format_bytes(int(size_str))
-                    })
+        prefix = f"{username}/"
+        for filename, size in parse_list_response(result['response']):
+            # Remove username prefix if present for display
+            if filename.startswith(prefix):
+                filename = filename[len(prefix):]
+            files.append({
+                'name': filename,
+                'size': size,
+                'size_human': format_bytes(size)
+            })
         
         log_event('LIST', f"ok - {username} has {len(files)} files")
         return jsonify({
@@ -529,17 +591,9 @@ def api_status():
         total_size = 0
         if list_result['success']:
             # Parse raw response from C server: "filename (size bytes)"
-            response_lines = list_result['response'].split('\n')
-            for line in response_lines:
-                if '(' in line and 'bytes)' in line:
-                    try:
-                        parts = line.split('(')
-                        if len(parts) == 2:
-                            size_str = parts[1].split()[0]
-                            file_count += 1
-                            total_size += int(size_str)
-                    except:
-                        pass
+            listing = parse_list_response(list_result['response'])
+            file_count = len(listing)
+            total_size = sum(size for _, size in listing)
         
         # Read log counts
         log_entries = 0
@@ -573,64 +627,6 @@ def api_status():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-# ============================================================================
-# UTILITY FUNCTIONS
-# ============================================================================
-
-def format_bytes(bytes_val):
-    """Human-readable file size"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes_val < 1024.0:
-            return f"{bytes_val:.1f} {unit}"
-        bytes_val /= 1024.0
-    return f"{bytes_val:.1f} TB"
-
-def parse_audit_log_line(line):
-    """Parse C server audit log format"""
-    # Format: [YYYY-MM-DD HH:MM:SS] OPERATION=X FILE=Y STATUS=Z DETAILS=...
-    try:
-        timestamp = line[1:20]
-        rest = line[22:]
-        
-        parts = {}
-        for item in rest.split(' DETAILS='):
-            if '=' in item:
-                for pair in item.split():
-                    if '=' in pair:
-                        key, val = pair.split('=', 1)
-                        parts[key] = val
-        
-        return {
-            'timestamp': timestamp,
-            'operation': parts.get('OPERATION', 'UNKNOWN'),
-            'file': parts.get('FILE', 'N/A'),
-            'status': parts.get('STATUS', 'UNKNOWN'),
-            'details': line.split('DETAILS=')[-1] if 'DETAILS=' in line else ''
-        }
-    except:
-        return {'timestamp': '', 'operation': 'PARSE_ERROR', 'file': '', 'status': '', 'details': line}
-
-
-def parse_security_log_line(line):
-    """Parse security log format: [ts] EVENT=X IP=Y FILE=Z DETAILS=..."""
-    try:
-        timestamp = line[1:20]
-        rest = line[22:]
-        parts = {}
-        for token in rest.split():
-            if '=' in token:
-                key, val = token.split('=', 1)
-                parts[key] = val
-        return {
-            'timestamp': timestamp,
-            'event': parts.get('EVENT', 'UNKNOWN'),
-            'ip': parts.get('IP', ''),
-            'file': parts.get('FILE', ''),
-            'details': line.split('DETAILS=')[-1] if 'DETAILS=' in line else ''
-        }
-    except:
-        return {'timestamp': '', 'event': 'PARSE_ERROR', 'ip': '', 'file': '', 'details': line}
-
 # ============================================================================
 # AUTHENTICATION ENDPOINTS (PHASE 1)
 # ============================================================================
@@ -733,46 +729,41 @@ def get_events():
         log_event('EVENTS_ERROR', str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def parse_event_line(line):
-    """Parse event line from events.log"""
-    try:
-        # Format: [timestamp] EVENT_TYPE filename lock_type pid user status
-        parts = line.strip('[]').split('] ', 1)
-        if len(parts) == 2:
-            timestamp = parts[0]
-            rest = parts[1]
-            tokens = rest.split()
-            
-            return {
-                'timestamp': timestamp,
-                'event_type': tokens[0] if len(tokens) > 0 else 'UNKNOWN',
-                'filename': tokens[1] if len(tokens) > 1 else '',
-                'lock_type': tokens[2] if len(tokens) > 2 else 'NONE',
-                'pid': tokens[3] if len(tokens) > 3 else '',
-                'user': tokens[4] if len(tokens) > 4 else 'system',
-                'status': tokens[5] if len(tokens) > 5 else 'PENDING'
-            }
-    except:
-        pass
-    
-    return {'timestamp': '', 'event_type': 'PARSE_ERROR', 'raw': line}
-
 # ============================================================================
 # PHASE 3: SECURITY ENDPOINTS
 # ============================================================================
 
+def parse_time_arg(value):
+    """Query-string time (epoch seconds or ISO timestamp) -> epoch seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 @app.route('/api/security/events', methods=['GET'])
 @require_auth
 def get_security_events():
-    """Get security events (requires authentication)"""
+    """Get security events (requires authentication)
+    
+    Optional filters: type, ip, since, until (epoch seconds or ISO timestamps)
+    """
     try:
         limit = request.args.get('limit', 50, type=int)
-        events = security_manager.get_security_events(limit)
+        events = security_manager.query_events(
+            event_type=request.args.get('type') or None,
+            ip=request.args.get('ip') or None,
+            since=parse_time_arg(request.args.get('since')),
+            until=parse_time_arg(request.args.get('until')),
+            limit=limit)
         return jsonify({
             'success': True,
             'events': events,
             'count': len(events)
         }), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid time filter: {e}'}), 400
     except Exception as e:
         log_event('SECURITY_EVENTS_ERROR', str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -842,7 +833,7 @@ def get_security_status():
     try:
         summary = security_manager.get_summary()
         threat_count = len(security_manager.get_high_severity_events())
-        blocked_count = len(security_manager.blocked_ips)
+        blocked_count = summary['blocked_ips']
         
         # Determine threat level
         if threat_count > 10 or blocked_count > 3:
@@ -873,7 +864,7 @@ if __name__ == '__main__':
     print("OS FILE SERVER - WEB API LAYER")
     print("=" * 70)
     print(f"C Server: {C_SERVER_HOST}:{C_SERVER_PORT}")
-    print("API Server: http://localhost:5000")
+    print(f"API Server: http://localhost:{API_PORT}")
     print()
     print("ARCHITECTURE:")
     print("  C File Server (OS Core)")
@@ -887,4 +878,4 @@ if __name__ == '__main__':
     print("=" * 70)
     print()
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=API_PORT, debug=API_DEBUG)
@@ -1,34 +1,231 @@
 """
 OS-Based Authentication Module
-Implements file-based user authentication with SHA-256 hashing
+Implements file-based user authentication with salted scrypt/PBKDF2 hashing
 No cloud services - pure local OS file operations
 """
 
 import hashlib
-import json
 import os
 import secrets
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
 from typing import Dict, Tuple, Optional
 
+from passwords import PasswordHasher, VerifierBusy
+from rate_limit import create_rate_tracker
+from session_store import Session, SessionJournal, SessionTable, SharedSessionTable
+from signed_tokens import RevocationList, TokenSigner, load_or_create_key
+from state_backend import get_default_backend
+
 # File paths - Use absolute path resolution
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)  # Go up from api_layer/ to project root
-USERS_DB_PATH = os.path.join(PROJECT_ROOT, "auth", "users.db")
-SESSIONS_PATH = os.path.join(PROJECT_ROOT, "auth", "sessions.json")
+AUTH_DIR = os.environ.get('AUTH_STATE_DIR', os.path.join(PROJECT_ROOT, "auth"))
+USERS_DB_PATH = os.path.join(AUTH_DIR, "users.db")
+SESSIONS_PATH = os.path.join(AUTH_DIR, "sessions.json")
+
+# Session lifetime (seconds): absolute max age, and idle timeout (0 = disabled)
+SESSION_MAX_AGE = 24 * 3600
+SESSION_IDLE_TIMEOUT = float(os.environ.get('SESSION_IDLE_TIMEOUT', '0'))
+SESSION_SWEEP_INTERVAL = 30
+
+# Token format: "session" (server-side session table) or "signed" (stateless
+# HMAC tokens any worker process can validate; logouts shared via a file)
+TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'session')
+TOKEN_KEY_PATH = os.path.join(AUTH_DIR, "token.key")
+REVOKED_TOKENS_PATH = os.path.join(AUTH_DIR, "revoked_tokens")
+
+class UserStore:
+    """In-memory index of users.db, reloaded only when the file changes
+
+    The file is re-parsed when its mtime, size or inode differ from the last
+    load (this also catches editors that replace the file), and the new index
+    is swapped in as a whole, so lookups never see a half-loaded table.
+    """
+
+    def __init__(self, path: str = USERS_DB_PATH):
+        self.path = path
+        self._users: Dict[str, Tuple[str, str]] = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @staticmethod
+    def _parse_line(line: str) -> Optional[Tuple[str, str, str]]:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None
+        parts = line.split(':')
+        if len(parts) != 3:
+            return None
+        return parts[0], parts[1], parts[2]
+
+    def _parse_file(self) -> Dict[str, Tuple[str, str]]:
+        users = {}
+        with open(self.path, 'r') as f:
+            for line in f:
+                entry = self._parse_line(line)
+                if entry:
+                    username, pwd_hash, role = entry
+                    users[username] = (pwd_hash, role)
+        return users
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload the index if users.db changed; returns True if reloaded"""
+        signature = self._stat_signature()
+        if not force and signature == self._signature:
+            return False
+
+        with self._lock:
+            signature = self._stat_signature()
+            if not force and signature == self._signature:
+                return False
+            if signature is None:
+                if self._signature is not None:
+                    print(f"[AUTH] [ERROR] users.db NOT FOUND at {self.path}")
+                self._users = {}
+            else:
+                try:
+                    users = self._parse_file()
+                except Exception as e:
+                    print(f"[AUTH] [ERROR] Error loading users: {e}")
+                    return False
+                self._users = users
+                print(f"[AUTH] [OK] Loaded {len(users)} users from {self.path}")
+            self._signature = signature
+            return True
+
+    def get(self, username: str) -> Optional[Tuple[str, str]]:
+        """Look up (password_hash, role) for a user"""
+        self.refresh()
+        return self._users.get(username)
+
+    def all(self) -> Dict[str, Tuple[str, str]]:
+        """Snapshot of the whole index"""
+        self.refresh()
+        return dict(self._users)
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._users)
+
+    @staticmethod
+    def _validate(*fields: str):
+        for field in fields:
+            if not field or ':' in field or '\n' in field or '\r' in field:
+                raise ValueError(f"Invalid user field: {field!r}")
+
+    def add_user(self, username: str, password_hash: str, role: str = "user"):
+        """Add or update a user without reloading the whole file"""
+        self._validate(username, password_hash, role)
+        self.refresh()
+        with self._lock:
+            if username in self._users:
+                self._rewrite_locked(username, (password_hash, role))
+            else:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'a+') as f:
+                    # Keep the appended record on its own line
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() > 0:
+                        f.seek(f.tell() - 1)
+                        if f.read(1) != '\n':
+                            f.write('\n')
+                    f.write(f"{username}:{password_hash}:{role}\n")
+                users = dict(self._users)
+                users[username] = (password_hash, role)
+                self._users = users
+                self._signature = self._stat_signature()
+
+    def remove_user(self, username: str) -> bool:
+        """Remove a user; returns False if the user does not exist"""
+        self.refresh()
+        with self._lock:
+            if username not in self._users:
+                return False
+            self._rewrite_locked(username, None)
+            return True
+
+    def _rewrite_locked(self, username: str, replacement: Optional[Tuple[str, str]]):
+        """Rewrite users.db with one record replaced or dropped (comments kept)"""
+        temp_path = f"{self.path}.tmp"
+        with open(self.path, 'r') as src, open(temp_path, 'w') as dst:
+            for line in src:
+                entry = self._parse_line(line)
+                if entry and entry[0] == username:
+                    if replacement:
+                        dst.write(f"{username}:{replacement[0]}:{replacement[1]}\n")
+                    continue
+                dst.write(line if line.endswith('\n') else line + '\n')
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(temp_path, self.path)
+
+        users = dict(self._users)
+        if replacement:
+            users[username] = replacement
+        else:
+            users.pop(username, None)
+        self._users = users
+        self._signature = self._stat_signature()
+
 
 class AuthManager:
     """Manages local user authentication and session handling"""
     
-    def __init__(self):
-        self.active_sessions = {}
-        self.blocked_ips = {}
-        self.failed_attempts = {}
-        self.load_sessions()
+    def __init__(self, users_path: str = USERS_DB_PATH, sessions_path: str = SESSIONS_PATH,
+                 journal_path: Optional[str] = None, idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 sweep_interval: float = SESSION_SWEEP_INTERVAL, token_mode: str = TOKEN_MODE,
+                 token_key_path: str = TOKEN_KEY_PATH, revoked_path: str = REVOKED_TOKENS_PATH,
+                 state=None, password_hasher: Optional[PasswordHasher] = None):
+        self.state = state if state is not None else get_default_backend()
+        self.password_hasher = password_hasher or PasswordHasher()
+        # Failed logins per IP over a 10 minute window (threshold 0: count only,
+        # blocking is applied explicitly in _track_failed_attempt)
+        self.login_failures = create_rate_tracker(self.state, 'auth', window=600, threshold=0,
+                                                  block_duration=600)
+        self.token_signer = None
+        if token_mode == "signed":
+            self.token_signer = TokenSigner(load_or_create_key(token_key_path),
+                                            RevocationList(revoked_path), SESSION_MAX_AGE)
+        self.user_store = UserStore(users_path)
+        if self.state.shared:
+            # Sessions live in the shared backend, which also persists them
+            self.sessions = SharedSessionTable(self.state, SESSION_MAX_AGE, idle_timeout)
+            self.session_journal = None
+        else:
+            self.sessions = SessionTable(SESSION_MAX_AGE, idle_timeout)
+            self.session_journal = SessionJournal(sessions_path, journal_path)
+            self.load_sessions()
+        if sweep_interval > 0:
+            threading.Thread(target=self._sweeper, args=(sweep_interval,), daemon=True).start()
+    
+    @property
+    def active_sessions(self) -> Dict[str, Session]:
+        """Live sessions by token (this process's table; empty with a shared backend)"""
+        return self.sessions.sessions
+    
+    @property
+    def blocked_ips(self) -> Dict[str, datetime]:
+        """IP -> block expiry"""
+        return {ip: datetime.fromtimestamp(expiry)
+                for ip, expiry in self.login_failures.blocked().items()}
+    
+    @property
+    def failed_attempts(self) -> Dict[str, int]:
+        """IP -> failed logins within the window since the last success"""
+        return self.login_failures.counts()
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash password using SHA-256 (OS best practice)"""
+        """Legacy unsalted SHA-256 hash (still accepted, upgraded on login)"""
         return hashlib.sha256(password.encode()).hexdigest()
     
     def load_users(self) -> Dict[str, Tuple[str, str]]:
@@ -36,25 +233,15 @@ class AuthManager:
         Format: username:password_hash:role
         Returns: {username: (password_hash, role)}
         """
-        users = {}
-        try:
-            print(f"[AUTH] Looking for users.db at: {USERS_DB_PATH}")
-            if os.path.exists(USERS_DB_PATH):
-                print(f"[AUTH] [OK] users.db found, loading...")
-                with open(USERS_DB_PATH, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            parts = line.split(':')
-                            if len(parts) == 3:
-                                username, pwd_hash, role = parts
-                                users[username] = (pwd_hash, role)
-                print(f"[AUTH] [OK] Loaded {len(users)} users")
-            else:
-                print(f"[AUTH] [ERROR] users.db NOT FOUND at {USERS_DB_PATH}")
-        except Exception as e:
-            print(f"[AUTH] [ERROR] Error loading users: {e}")
-        return users
+        return self.user_store.all()
+
+    def add_user(self, username: str, password: str, role: str = "user"):
+        """Add (or update) a user in users.db; takes effect immediately"""
+        self.user_store.add_user(username, self.password_hasher.hash(password), role)
+
+    def remove_user(self, username: str) -> bool:
+        """Remove a user from users.db; takes effect immediately"""
+        return self.user_store.remove_user(username)
     
     def authenticate(self, username: str, password: str, client_ip: str) -> Tuple[bool, str, Optional[str]]:
         """
@@ -69,105 +256,145 @@ class AuthManager:
         """
         
         # Check if IP is blocked
-        if client_ip in self.blocked_ips:
-            block_expiry = self.blocked_ips[client_ip]
-            if datetime.now() < block_expiry:
-                return False, f"IP {client_ip} blocked until {block_expiry}", None
-            else:
-                del self.blocked_ips[client_ip]
-                self.failed_attempts[client_ip] = 0
+        block_expiry = self.login_failures.blocked_until(client_ip)
+        if block_expiry is not None:
+            return False, f"IP {client_ip} blocked until {datetime.fromtimestamp(block_expiry)}", None
         
-        # Load users from file
-        users = self.load_users()
+        # Look up user (users.db is only re-read when it changes)
+        user = self.user_store.get(username)
         
-        if username not in users:
+        if user is None:
             self._track_failed_attempt(client_ip)
             return False, "Invalid username or password", None
         
-        expected_hash, role = users[username]
-        provided_hash = self.hash_password(password)
+        expected_hash, role = user
+        try:
+            valid, needs_rehash = self.password_hasher.verify(username, password, expected_hash)
+        except VerifierBusy:
+            return False, "Server busy, please retry login", None
         
-        if provided_hash != expected_hash:
+        if not valid:
             self._track_failed_attempt(client_ip)
             return False, "Invalid username or password", None
         
+        if needs_rehash:
+            self._upgrade_password_hash(username, password, role)
+        
+        self.login_failures.reset(client_ip)
+        
+        # Stateless mode: the signed token is the session
+        if self.token_signer:
+            return True, "Authentication successful", self.token_signer.issue(username, role)
+        
         # Authentication successful - create session
         token = secrets.token_urlsafe(32)
-        session = {
-            "username": username,
-            "role": role,
-            "token": token,
-            "client_ip": client_ip,
-            "login_time": datetime.now().isoformat(),
-            "last_activity": datetime.now().isoformat()
-        }
+        session = Session(token, username, role, client_ip, time.time())
         
-        self.active_sessions[token] = session
-        self.failed_attempts[client_ip] = 0
-        self.save_sessions()
+        self.sessions.add(session)
+        self._persist("record_create", session)
         
         return True, "Authentication successful", token
     
     def validate_token(self, token: str) -> Tuple[bool, Optional[Dict]]:
         """
         Validate session token
-        Returns: (valid: bool, session_data: dict or None)
+        Returns: (valid: bool, session: Session or None)
         """
-        if token not in self.active_sessions:
-            return False, None
+        if self.token_signer and TokenSigner.is_signed(token):
+            payload = self.token_signer.verify(token)
+            if payload is None:
+                return False, None
+            return True, Session(token, payload["u"], payload["r"], "", payload["iat"], time.time())
         
-        session = self.active_sessions[token]
+        session = self.sessions.get(token)
+        if session is None:
+            return False, None
         
-        # Check session expiry (24 hours)
-        login_time = datetime.fromisoformat(session["login_time"])
-        if datetime.now() - login_time > timedelta(hours=24):
-            del self.active_sessions[token]
-            self.save_sessions()
+        # Check session expiry (24 hours, or idle timeout)
+        now = time.time()
+        if now >= session.deadline:
+            if self.sessions.remove(token) is not None:
+                self._persist("record_delete", token)
             return False, None
         
-        # Update last activity
-        session["last_activity"] = datetime.now().isoformat()
+        # Update last activity (journaled at most once a minute per session)
+        self.sessions.touch(session, now)
+        self._persist("record_touch", session)
         return True, session
     
     def logout(self, token: str) -> bool:
         """Logout and invalidate session"""
-        if token in self.active_sessions:
-            del self.active_sessions[token]
-            self.save_sessions()
+        if self.token_signer and TokenSigner.is_signed(token):
+            return self.token_signer.revoke(token)
+        if self.sessions.remove(token) is not None:
+            self._persist("record_delete", token)
             return True
         return False
     
+    def _upgrade_password_hash(self, username: str, password: str, role: str):
+        """Re-hash a legacy/outdated password hash with the current KDF settings"""
+        try:
+            self.user_store.add_user(username, self.password_hasher.hash(password), role)
+            print(f"[AUTH] Upgraded password hash for {username} to {self.password_hasher.scheme}")
+        except Exception as e:
+            print(f"[AUTH] Error upgrading password hash for {username}: {e}")
+    
     def _track_failed_attempt(self, client_ip: str):
         """Track failed login attempts and block IP after 3 failures"""
-        if client_ip not in self.failed_attempts:
-            self.failed_attempts[client_ip] = 0
-        
-        self.failed_attempts[client_ip] += 1
+        failures, _ = self.login_failures.record(client_ip)
         
         # Block IP after 3 failed attempts (600 seconds = 10 minutes)
         # TESTING: Disabled for demo - uncomment for production
-        # if self.failed_attempts[client_ip] >= 3:
-        #     self.blocked_ips[client_ip] = datetime.now() + timedelta(seconds=600)
+        # if failures >= 3:
+        #     self.login_failures.block(client_ip, time.time() + 600)
         #     print(f"[AUTH] IP {client_ip} blocked for 600s (3 failures)")
     
+    def _persist(self, record: str, *args):
+        """Append one session change to the journal, compacting when it grows"""
+        if self.session_journal is None:
+            return
+        try:
+            getattr(self.session_journal, record)(*args)
+            if self.session_journal.needs_compaction(len(self.active_sessions)):
+                self.session_journal.compact(self.active_sessions)
+        except Exception as e:
+            print(f"[AUTH] Error saving sessions: {e}")
+    
     def save_sessions(self):
-        """Save active sessions to local file"""
+        """Save active sessions to local file (snapshot + empty journal)"""
+        if self.session_journal is None:
+            return
         try:
-            os.makedirs(os.path.dirname(SESSIONS_PATH), exist_ok=True)
-            with open(SESSIONS_PATH, 'w') as f:
-                json.dump(self.active_sessions, f, indent=2)
+            self.session_journal.compact(self.active_sessions)
         except Exception as e:
             print(f"[AUTH] Error saving sessions: {e}")
     
     def load_sessions(self):
-        """Load sessions from local file"""
+        """Load sessions from local file (snapshot + journal replay)"""
         try:
-            if os.path.exists(SESSIONS_PATH):
-                with open(SESSIONS_PATH, 'r') as f:
-                    self.active_sessions = json.load(f)
+            self.sessions.load(self.session_journal.load())
         except Exception as e:
             print(f"[AUTH] Error loading sessions: {e}")
     
+    def sweep_expired_sessions(self) -> int:
+        """Evict expired sessions; returns how many were removed"""
+        expired = self.sessions.sweep()
+        for token in expired:
+            self._persist("record_delete", token)
+        self.login_failures.purge()
+        if self.token_signer and self.token_signer.revocations.needs_compaction():
+            self.token_signer.revocations.compact()
+        return len(expired)
+    
+    def _sweeper(self, interval: float):
+        """Background thread: periodically evict expired sessions"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep_expired_sessions()
+            except Exception as e:
+                print(f"[AUTH] Error sweeping sessions: {e}")
+    
     def get_session_info(self, token: str) -> Optional[Dict]:
         """Get session information (safe for frontend)"""
         valid, session = self.validate_token(token)
@@ -175,15 +402,15 @@ class AuthManager:
             return None
         
         return {
-            "username": session["username"],
-            "role": session["role"],
-            "login_time": session["login_time"],
-            "last_activity": session["last_activity"]
+            "username": session.username,
+            "role": session.role,
+            "login_time": datetime.fromtimestamp(session.login_time).isoformat(),
+            "last_activity": datetime.fromtimestamp(session.last_activity).isoformat()
         }
     
     def get_active_sessions_count(self) -> int:
         """Get count of active sessions"""
-        return len(self.active_sessions)
+        return len(self.sessions)
 
 
 # Initialize global auth manager
@@ -0,0 +1,307 @@
+"""
+Persistent Security Event Log
+Append-only, segment-rotated JSON-lines log of SecurityManager events with a
+time-bucketed index, so /api/security/events can answer type / IP / time
+range queries over history that survives restarts
+
+- events-00000001.jsonl  one event per line; a new segment is started once
+                         the active one reaches segment_bytes and the oldest
+                         segments beyond max_segments are deleted
+- events-00000001.idx    index of a sealed segment (JSON list of buckets)
+
+The index is a list of buckets, one per bucket_seconds of event time and
+segment: byte range in the segment, min/max event time, and the set of event
+types and client IPs in it. Queries walk buckets newest first and only read
+the byte ranges of buckets that can contain a match.
+
+Events are queued and written by a background thread (one write + flush per
+batch), so recording an event never blocks a request on disk I/O. If the
+queue is full the event is dropped from the log (still kept in memory) and
+counted in `dropped`. Queued events are flushed at interpreter exit.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+MAX_BUCKET_IPS = 256    # Beyond this a bucket stops listing IPs (always scanned for IP queries)
+
+
+def event_time(event: Dict) -> float:
+    """Epoch seconds of an event's ISO timestamp (now if missing or malformed)"""
+    try:
+        return datetime.fromisoformat(event['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+class _Bucket:
+    """Index entry: a contiguous byte range of one segment"""
+
+    __slots__ = ("segment", "number", "start", "end", "min_ts", "max_ts", "types", "ips")
+
+    def __init__(self, segment: int, number: int, start: int, ts: float):
+        self.segment = segment
+        self.number = number          # Event time // bucket_seconds
+        self.start = start
+        self.end = start
+        self.min_ts = ts
+        self.max_ts = ts
+        self.types = set()
+        self.ips = set()              # None once more than MAX_BUCKET_IPS
+
+    def add(self, event: Dict, ts: float, end: int):
+        self.end = end
+        self.min_ts = min(self.min_ts, ts)
+        self.max_ts = max(self.max_ts, ts)
+        self.types.add(event.get('type', ''))
+        if self.ips is not None and event.get('ip'):
+            self.ips.add(event['ip'])
+            if len(self.ips) > MAX_BUCKET_IPS:
+                self.ips = None
+
+    def matches(self, event_type, ip, since, until) -> bool:
+        if since is not None and self.max_ts < since:
+            return False
+        if until is not None and self.min_ts > until:
+            return False
+        if event_type is not None and event_type not in self.types:
+            return False
+        return ip is None or self.ips is None or ip in self.ips
+
+    def to_list(self) -> List:
+        return [self.number, self.start, self.end, self.min_ts, self.max_ts,
+                sorted(self.types), None if self.ips is None else sorted(self.ips)]
+
+    @classmethod
+    def from_list(cls, segment: int, data: List) -> "_Bucket":
+        bucket = cls(segment, data[0], data[1], data[3])
+        bucket.end = data[2]
+        bucket.max_ts = data[4]
+        bucket.types = set(data[5])
+        bucket.ips = None if data[6] is None else set(data[6])
+        return bucket
+
+
+class EventLog:
+    """Segment-rotated event log with a background writer and a time index"""
+
+    def __init__(self, directory: str, segment_bytes: int = 8 << 20, max_segments: int = 20,
+                 bucket_seconds: float = 60, queue_size: int = 10000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.bucket_seconds = bucket_seconds
+        self.dropped = 0
+        self._buckets: List[_Bucket] = []       # Oldest first
+        self._segment = 0                       # Active segment id (0 = none yet)
+        self._size = 0                          # Bytes in the active segment
+        self._file = None
+        self._lock = threading.Lock()           # Guards the index
+        self._queue: "queue.Queue" = queue.Queue(queue_size)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._load()
+        atexit.register(self.flush)
+
+    # ---- files ----
+
+    def _path(self, segment: int, ext: str = 'jsonl') -> str:
+        return os.path.join(self.directory, f"events-{segment:08d}.{ext}")
+
+    def _segments(self) -> List[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(name[7:15]) for name in os.listdir(self.directory)
+                      if name.startswith('events-') and name.endswith('.jsonl'))
+
+    def _scan(self, segment: int, active: bool) -> List[_Bucket]:
+        """
+        Rebuild a segment's index from its lines. Unreadable lines are skipped;
+        only the active segment can have a torn tail (a partial last write),
+        which is truncated so the next event starts on a fresh line.
+        """
+        buckets: List[_Bucket] = []
+        path = self._path(segment)
+        offset = 0
+        indexed = 0                             # End of the last indexed line
+        with open(path, 'rb') as f:
+            for line in f:
+                start, offset = offset, offset + len(line)
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if active and not line.endswith(b'\n'):
+                    break
+                self._index(buckets, segment, event, event_time(event), start, offset)
+                indexed = offset
+        if active and indexed < offset:
+            os.truncate(path, indexed)
+        return buckets
+
+    def _load(self):
+        segments = self._segments()
+        for segment in segments:
+            buckets = None
+            if segment != segments[-1] and os.path.exists(self._path(segment, 'idx')):
+                try:
+                    with open(self._path(segment, 'idx'), 'r') as f:
+                        buckets = [_Bucket.from_list(segment, data) for data in json.load(f)]
+                except (OSError, ValueError):
+                    buckets = None
+            if buckets is None:
+                buckets = self._scan(segment, segment == segments[-1])
+            self._buckets.extend(buckets)
+        if segments:
+            self._segment = segments[-1]
+            self._size = os.path.getsize(self._path(self._segment))
+
+    def _index(self, buckets: List[_Bucket], segment: int, event: Dict, ts: float, start: int, end: int):
+        number = int(ts // self.bucket_seconds)
+        last = buckets[-1] if buckets else None
+        if last is None or last.segment != segment or last.number != number or last.end != start:
+            last = _Bucket(segment, number, start, ts)
+            buckets.append(last)
+        last.add(event, ts, end)
+
+    def _rotate(self):
+        """Seal the active segment (write its index) and start a new one"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._segment:
+            with self._lock:
+                sealed = [b.to_list() for b in self._buckets if b.segment == self._segment]
+            with open(self._path(self._segment, 'idx'), 'w') as f:
+                json.dump(sealed, f, separators=(',', ':'))
+        self._segment += 1
+        self._size = 0
+
+        segments = self._segments()
+        expired = segments[:max(0, len(segments) + 1 - self.max_segments)]
+        if expired:
+            with self._lock:
+                self._buckets = [b for b in self._buckets if b.segment > expired[-1]]
+            for segment in expired:
+                for ext in ('jsonl', 'idx'):
+                    if os.path.exists(self._path(segment, ext)):
+                        os.unlink(self._path(segment, ext))
+
+    # ---- writer ----
+
+    def append(self, event: Dict):
+        """Queue an event for the writer thread (never blocks)"""
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='security-event-log', daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            events = [event for event in batch if event is not None]
+            try:
+                if events:
+                    self._write(events)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[SECURITY] Warning writing event log: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(events) != len(batch):
+                return  # close() sentinel
+
+    def _write(self, events: List[Dict]):
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._segment == 0 or self._size >= self.segment_bytes:
+                self._rotate()
+            self._file = open(self._path(self._segment), 'ab')
+
+        lines = [json.dumps(event, separators=(',', ':')).encode() + b'\n' for event in events]
+        self._file.write(b''.join(lines))
+        self._file.flush()
+
+        offset = self._size
+        with self._lock:
+            for event, line in zip(events, lines):
+                self._index(self._buckets, self._segment, event, event_time(event), offset, offset + len(line))
+                offset += len(line)
+        self._size = offset
+        if self._size >= self.segment_bytes:
+            self._rotate()
+            self._file = open(self._path(self._segment), 'ab')
+
+    def flush(self):
+        """Wait until every queued event is written"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        atexit.unregister(self.flush)
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # ---- queries ----
+
+    def query(self, event_type: Optional[str] = None, ip: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 50) -> List[Dict]:
+        """Newest `limit` events matching every given filter, oldest first"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            candidates = [(b.segment, b.start, b.end) for b in reversed(self._buckets)
+                          if b.matches(event_type, ip, since, until)]
+
+        matches: List[Dict] = []
+        files = {}
+        try:
+            for segment, start, end in candidates:
+                f = files.get(segment)
+                if f is None:
+                    try:
+                        f = files[segment] = open(self._path(segment), 'rb')
+                    except FileNotFoundError:
+                        continue  # Deleted by retention since the index was read
+                f.seek(start)
+                for line in reversed(f.read(end - start).splitlines()):
+                    event = json.loads(line)
+                    if event_type is not None and event.get('type') != event_type:
+                        continue
+                    if ip is not None and event.get('ip') != ip:
+                        continue
+                    if since is not None or until is not None:
+                        ts = event_time(event)
+                        if (since is not None and ts < since) or (until is not None and ts > until):
+                            continue
+                    matches.append(event)
+                    if len(matches) >= limit:
+                        return matches[::-1]
+        finally:
+            for f in files.values():
+                f.close()
+        return matches[::-1]
@@ -0,0 +1,136 @@
+"""
+Security Event Store
+Fixed-capacity storage for SecurityManager events with secondary indexes and
+running counters, so the /api/security/* endpoints cost O(limit) no matter
+how long the API has been running
+
+- EventStore        ring buffer of the last `capacity` events, per-severity
+                    and per-type indexes (sequence numbers of retained
+                    events), cumulative counters
+- SharedEventStore  same interface on the shared state backend (one list per
+                    severity / type plus atomic counters) for multi-worker use
+"""
+
+import heapq
+import itertools
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+
+class EventStore:
+    """Ring buffer of recent events with severity/type indexes"""
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self._ring: List[Optional[Dict]] = [None] * capacity
+        self._next = 0                                   # Sequence number of the next event
+        self._by_severity: Dict[str, deque] = {}         # severity -> seqs, oldest first
+        self._by_type: Dict[str, deque] = {}             # type -> seqs, oldest first
+        self._severity_counts: Dict[str, int] = {}       # Cumulative since start
+        self._type_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def append(self, event: Dict):
+        severity = event.get('severity', 'INFO')
+        event_type = event.get('type', '')
+        with self._lock:
+            seq = self._next
+            slot = seq % self.capacity
+            evicted = self._ring[slot] if seq >= self.capacity else None
+            if evicted is not None:
+                # The evicted event is the oldest entry of its indexes
+                self._by_severity[evicted.get('severity', 'INFO')].popleft()
+                self._by_type[evicted.get('type', '')].popleft()
+            self._ring[slot] = event
+            self._next = seq + 1
+            self._by_severity.setdefault(severity, deque()).append(seq)
+            self._by_type.setdefault(event_type, deque()).append(seq)
+            self._severity_counts[severity] = self._severity_counts.get(severity, 0) + 1
+            self._type_counts[event_type] = self._type_counts.get(event_type, 0) + 1
+
+    def _events(self, seqs: Iterable[int]) -> List[Dict]:
+        return [self._ring[seq % self.capacity] for seq in seqs]
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """Last `limit` events (all retained if None), oldest first"""
+        with self._lock:
+            first = max(0, self._next - self.capacity)
+            if limit is not None:
+                first = max(first, self._next - limit)
+            return self._events(range(first, self._next))
+
+    def by_severity(self, severities: Iterable[str], limit: int) -> List[Dict]:
+        """Last `limit` events with any of the given severities, oldest first"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            newest = [list(itertools.islice(reversed(self._by_severity.get(s, ())), limit))
+                      for s in severities]
+            seqs = heapq.nlargest(limit, itertools.chain.from_iterable(newest))
+            return self._events(reversed(seqs))
+
+    def by_type(self, event_type: str, limit: int) -> List[Dict]:
+        if limit <= 0:
+            return []
+        with self._lock:
+            seqs = list(itertools.islice(reversed(self._by_type.get(event_type, ())), limit))
+            return self._events(reversed(seqs))
+
+    def counts(self) -> Dict:
+        """Cumulative event counts since start (O(number of severities/types))"""
+        with self._lock:
+            return {'total': self._next,
+                    'by_severity': dict(self._severity_counts),
+                    'by_type': dict(self._type_counts)}
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+
+class SharedEventStore:
+    """EventStore interface on a shared state backend"""
+
+    def __init__(self, state, capacity: int = 10000, name: str = 'security_events'):
+        self.state = state
+        self.capacity = capacity
+        self.ns = name
+        self.ns_counts = f"{name}_counts"
+
+    def append(self, event: Dict):
+        severity = event.get('severity', 'INFO')
+        event_type = event.get('type', '')
+        self.state.append(self.ns, event, self.capacity)
+        self.state.append(f"{self.ns}:severity:{severity}", event, self.capacity)
+        self.state.append(f"{self.ns}:type:{event_type}", event, self.capacity)
+        self.state.incr(self.ns_counts, 'total')
+        self.state.incr(self.ns_counts, f"severity:{severity}")
+        self.state.incr(self.ns_counts, f"type:{event_type}")
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        return self.state.tail(self.ns, limit)
+
+    def by_severity(self, severities: Iterable[str], limit: int) -> List[Dict]:
+        if limit <= 0:
+            return []
+        merged = heapq.merge(*(self.state.tail(f"{self.ns}:severity:{s}", limit) for s in severities),
+                             key=lambda event: event.get('timestamp', ''))
+        return list(merged)[-limit:]
+
+    def by_type(self, event_type: str, limit: int) -> List[Dict]:
+        return self.state.tail(f"{self.ns}:type:{event_type}", limit) if limit > 0 else []
+
+    def counts(self) -> Dict:
+        counts = {'total': 0, 'by_severity': {}, 'by_type': {}}
+        for key, value in self.state.items(self.ns_counts).items():
+            kind, _, name = key.partition(':')
+            if kind == 'total':
+                counts['total'] = value
+            elif kind == 'severity':
+                counts['by_severity'][name] = value
+            elif kind == 'type':
+                counts['by_type'][name] = value
+        return counts
+
+    def __len__(self) -> int:
+        return min(self.counts()['total'], self.capacity)
@@ -0,0 +1,190 @@
+"""
+File Integrity Hash Store
+Persistent filename -> SHA-256 map for SecurityManager.check_file_integrity
+
+- file_hashes.jsonl  one {"file": ..., "hash": ...} record per line; the last
+                     record of a file wins, "hash": null removes it
+
+Changes are buffered and appended in batches: a flush runs flush_delay
+seconds after the first unsaved change, or immediately once max_pending
+changes are waiting, so a burst of new files costs one small append instead
+of one full rewrite per file. The log is compacted (rewritten atomically)
+once it holds twice as many records as live hashes. A legacy
+security_state.json is imported on first use.
+
+hash_content() hashes bytes, a binary file object, or an iterable of byte
+chunks, so large files never need to be held in memory.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Union
+
+HASH_CHUNK_SIZE = 1 << 20
+
+Content = Union[bytes, bytearray, memoryview, Iterable[bytes]]
+
+
+def hash_content(content: Content, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """SHA-256 hex digest of bytes, a readable binary stream or a chunk iterator"""
+    digest = hashlib.sha256()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        digest.update(content)
+    elif hasattr(content, 'read'):
+        for chunk in iter(lambda: content.read(chunk_size), b''):
+            digest.update(chunk)
+    else:
+        for chunk in content:
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashStore:
+    """Incrementally persisted filename -> hash map with debounced flushes"""
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None, flush_delay: float = 1.0,
+                 max_pending: int = 1000, compact_min_records: int = 1000):
+        self.path = path
+        self.flush_delay = flush_delay      # 0 = flush on every change
+        self.max_pending = max_pending
+        self.compact_min_records = compact_min_records
+        self._hashes: Dict[str, str] = {}
+        self._pending: Dict[str, Optional[str]] = {}
+        self._records = 0                   # Records in the log file
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._load(legacy_path)
+        atexit.register(self.flush)
+
+    def _load(self, legacy_path: Optional[str]):
+        if os.path.exists(self.path):
+            offset = 0                      # End of the last complete record
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Torn write at the tail
+                    if not line.endswith(b'\n'):
+                        break
+                    if record.get('hash') is None:
+                        self._hashes.pop(record['file'], None)
+                    else:
+                        self._hashes[record['file']] = record['hash']
+                    self._records += 1
+                    offset += len(line)
+            if offset < os.path.getsize(self.path):
+                # Cut the torn tail so later appends start on a fresh line
+                os.truncate(self.path, offset)
+        elif legacy_path and os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, 'r') as f:
+                    legacy = json.load(f).get('file_hashes', {})
+            except (OSError, ValueError) as e:
+                print(f"[SECURITY] Warning loading state: {e}")
+                return
+            if legacy:
+                self._hashes.update(legacy)
+                self.compact()
+                print(f"[SECURITY] Imported {len(legacy)} file hashes from {legacy_path}")
+
+    def get(self, filename: str, default=None) -> Optional[str]:
+        return self._hashes.get(filename, default)
+
+    def __getitem__(self, filename: str) -> str:
+        return self._hashes[filename]
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def items(self):
+        return dict(self._hashes).items()
+
+    def __setitem__(self, filename: str, file_hash: str):
+        self._change(filename, file_hash)
+
+    def __delitem__(self, filename: str):
+        self._change(filename, None)
+
+    def _change(self, filename: str, file_hash: Optional[str]):
+        with self._lock:
+            if file_hash is None:
+                self._hashes.pop(filename, None)
+            else:
+                self._hashes[filename] = file_hash
+            self._pending[filename] = file_hash
+            flush_now = self.flush_delay <= 0 or len(self._pending) >= self.max_pending
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        """Append all buffered changes (one write), compacting when due"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return
+            start = None
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a') as f:
+                    start = f.tell()
+                    f.write(''.join(json.dumps({'file': name, 'hash': value}) + '\n'
+                                    for name, value in pending.items()))
+            except OSError as e:
+                print(f"[SECURITY] Warning saving file hashes: {e}")
+                self._retry(pending, start)
+                return
+            self._records += len(pending)
+            if self._records >= max(self.compact_min_records, 2 * len(self._hashes)):
+                try:
+                    self.compact()
+                except OSError as e:
+                    print(f"[SECURITY] Warning compacting file hashes: {e}")
+
+    def _retry(self, pending: Dict[str, Optional[str]], start: Optional[int]):
+        """Requeue changes whose append failed (newer changes win) and drop any partial write"""
+        if start is not None:
+            try:
+                os.truncate(self.path, start)
+            except OSError:
+                pass  # Cut on the next load instead
+        with self._lock:
+            for name, value in pending.items():
+                self._pending.setdefault(name, value)
+            if self.flush_delay > 0 and self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def compact(self):
+        """Rewrite the log with one record per live hash (atomic replace)"""
+        with self._lock:
+            snapshot = dict(self._hashes)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(''.join(json.dumps({'file': name, 'hash': value}) + '\n'
+                            for name, value in snapshot.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._records = len(snapshot)
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
@@ -0,0 +1,37 @@
+"""
+Password KDF Worker
+Entry point of the processes PasswordHasher runs the KDF in. Each worker is
+a fresh interpreter (started with subprocess, never forked from the API)
+that imports only the passwords module, so it carries none of the API's
+threads, locks or state.
+
+Protocol: pickled (function name, args) requests on stdin, one pickled
+(ok, result or exception) reply on stdout per request. The worker exits
+when stdin closes, so it never outlives the API process.
+"""
+
+import pickle
+import sys
+
+from passwords import encode_hash, verify_hash
+
+FUNCTIONS = {'encode_hash': encode_hash, 'verify_hash': verify_hash}
+
+
+def main():
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    while True:
+        try:
+            name, args = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            reply = (True, FUNCTIONS[name](*args))
+        except Exception as e:
+            reply = (False, e)
+        pickle.dump(reply, replies)
+        replies.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+API Metrics
+Request counts, in-flight gauges and latency histograms per Flask route,
+plus per-command timing of every C server round trip, exposed at /metrics
+in the Prometheus text exposition format (version 0.0.4)
+
+  api_requests_total{route,method,status}          counter
+  api_requests_in_flight{route}                    gauge
+  api_request_duration_seconds{route,method}       histogram
+  c_server_requests_total{command}                 counter
+  c_server_request_duration_seconds{command}       histogram
+  c_server_sent_bytes_total{command}               counter
+  c_server_received_bytes_total{command}           counter
+  c_server_errors_total{command,type}              counter
+      type: timeout | refused | connection | locked | server_error | <exception>
+
+Hot path cost: every thread writes only to its own shard (plain dicts,
+no lock), and shards are summed when /metrics is scraped. Shards of
+finished threads (the dev server uses a thread per request) are folded
+into one retired shard so their totals survive without the shard list
+growing. Route labels use the URL rule ("/api/download/<filename>"), so
+label cardinality stays bounded.
+
+Set API_METRICS=0 to disable recording and the endpoint.
+"""
+
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+
+API_METRICS = os.environ.get('API_METRICS', '1') == '1'
+
+# Upper bounds in seconds; C server round trips range from sub-ms LIST to long transfers
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'api_requests_total': ('counter', 'HTTP requests handled, by route, method and status'),
+    'api_requests_in_flight': ('gauge', 'HTTP requests currently being handled'),
+    'api_request_duration_seconds': ('histogram', 'HTTP request latency'),
+    'c_server_requests_total': ('counter', 'Round trips to the C file server, by command'),
+    'c_server_request_duration_seconds': ('histogram', 'C file server round-trip latency'),
+    'c_server_sent_bytes_total': ('counter', 'Bytes sent to the C file server'),
+    'c_server_received_bytes_total': ('counter', 'Bytes received from the C file server'),
+    'c_server_errors_total': ('counter', 'Failed C file server round trips, by error type'),
+}
+
+
+class _Shard:
+    """One thread's metric values; only its owner thread writes to it"""
+    __slots__ = ('thread', 'values', 'histograms')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.values = {}        # (name, labels) -> counter or gauge value
+        self.histograms = {}    # (name, labels) -> [count per bucket..., +Inf count, sum]
+
+    def add(self, key, amount=1):
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, key, seconds, buckets):
+        counts = self.histograms.get(key)
+        if counts is None:
+            counts = self.histograms[key] = [0] * (len(buckets) + 2)
+        counts[bisect_left(buckets, seconds)] += 1
+        counts[-1] += seconds
+
+    def merge_into(self, values, histograms):
+        for key, value in self.values.copy().items():
+            values[key] = values.get(key, 0) + value
+        for key, counts in self.histograms.copy().items():
+            counts = list(counts)
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = counts
+            else:
+                for i, count in enumerate(counts):
+                    total[i] += count
+
+
+class Metrics:
+    """Per-thread sharded counters, gauges and histograms"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, enabled=API_METRICS):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()       # guards the shard list, never taken on the hot path
+        self._shards = []
+        self._retired = _Shard(None)
+        self._prune_at = 64
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) >= self._prune_at:
+                    self._retire_finished()
+                    self._prune_at = max(64, 2 * len(self._shards))
+        return shard
+
+    def _retire_finished(self):
+        """Fold shards of finished threads into the retired shard (lock held)"""
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                shard.merge_into(self._retired.values, self._retired.histograms)
+        self._shards = live
+
+    # -- recording (hot path) -------------------------------------------------
+
+    def inc(self, name, labels=(), amount=1):
+        if self.enabled:
+            self._shard().add((name, labels), amount)
+
+    def observe(self, name, labels, seconds):
+        if self.enabled:
+            self._shard().observe((name, labels), seconds, self.buckets)
+
+    def request_started(self, route):
+        self.inc('api_requests_in_flight', (('route', route),))
+
+    def request_finished(self, route, method, status, seconds):
+        if not self.enabled:
+            return
+        shard = self._shard()
+        shard.add(('api_requests_in_flight', (('route', route),)), -1)
+        shard.add(('api_requests_total', (('route', route), ('method', method), ('status', str(status)))))
+        shard.observe(('api_request_duration_seconds', (('route', route), ('method', method))),
+                      seconds, self.buckets)
+
+    def c_server_call(self, command):
+        """Context manager timing one C server round trip (see CServerCall)"""
+        return CServerCall(self, command.split(' ', 1)[0].strip().upper() or 'UNKNOWN')
+
+    # -- scrape -------------------------------------------------------------------
+
+    def collect(self):
+        """-> (values, histograms) summed over all threads"""
+        with self._lock:
+            self._retire_finished()
+            shards = [self._retired] + self._shards
+        values, histograms = {}, {}
+        for shard in shards:
+            shard.merge_into(values, histograms)
+        return values, histograms
+
+    def render(self):
+        """Prometheus text exposition format"""
+        values, histograms = self.collect()
+        by_name = {}
+        for (name, labels), value in values.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), counts in histograms.items():
+            by_name.setdefault(name, []).append((labels, counts))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, text = HELP.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+class CServerCall:
+    """
+    with metrics.c_server_call(command) as call:
+        ...; call.sent += n; call.received += n
+        if reply is an error: call.fail(reply)
+    Exceptions are counted by type and re-raised.
+    """
+    __slots__ = ('metrics', 'command', 'started', 'sent', 'received', 'error')
+
+    def __init__(self, metrics, command):
+        self.metrics = metrics
+        self.command = command
+        self.sent = 0
+        self.received = 0
+        self.error = None
+
+    def fail(self, response):
+        """Mark an ERROR reply from the server"""
+        self.error = 'locked' if 'lock' in response.lower() else 'server_error'
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics = self.metrics
+        if not metrics.enabled:
+            return False
+        shard = metrics._shard()
+        labels = (('command', self.command),)
+        shard.observe(('c_server_request_duration_seconds', labels), time.perf_counter() - self.started,
+                      metrics.buckets)
+        shard.add(('c_server_requests_total', labels))
+        if self.sent:
+            shard.add(('c_server_sent_bytes_total', labels), self.sent)
+        if self.received:
+            shard.add(('c_server_received_bytes_total', labels), self.received)
+        error = _error_type(exc) if exc_type else self.error
+        if error:
+            shard.add(('c_server_errors_total', labels + (('type', error),)))
+        return False
+
+
+def _error_type(exc):
+    if isinstance(exc, socket.timeout):
+        return 'timeout'
+    if isinstance(exc, ConnectionRefusedError):
+        return 'refused'
+    if isinstance(exc, OSError):
+        return 'connection'
+    return type(exc).__name__
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
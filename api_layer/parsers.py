@@ -0,0 +1,107 @@
+"""
+Parsers for C server output used by the API endpoints
+
+Kept free of Flask so they can be unit tested and benchmarked
+(benchmarks/microbench.py) without the web stack.
+
+- format_bytes              human-readable sizes
+- parse_list_response       LIST reply -> [(name, size)]
+- parse_audit_log_line      logs/audit.log
+- parse_security_log_line   logs/security.log
+- parse_event_line          logs/events.log
+"""
+
+
+def format_bytes(bytes_val):
+    """Human-readable file size"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes_val < 1024.0:
+            return f"{bytes_val:.1f} {unit}"
+        bytes_val /= 1024.0
+    return f"{bytes_val:.1f} TB"
+
+
+def parse_list_response(response):
+    """LIST reply ("name (1234 bytes)" per line) -> [(name, size)]"""
+    files = []
+    for line in response.split('\n'):
+        if '(' in line and 'bytes)' in line:
+            parts = line.split('(')
+            if len(parts) == 2:
+                try:
+                    files.append((parts[0].strip(), int(parts[1].split()[0])))
+                except (ValueError, IndexError):
+                    pass
+    return files
+
+
+def parse_audit_log_line(line):
+    """Parse C server audit log format"""
+    # Format: [YYYY-MM-DD HH:MM:SS] OPERATION=X FILE=Y STATUS=Z DETAILS=...
+    try:
+        timestamp = line[1:20]
+        rest = line[22:]
+        
+        parts = {}
+        for item in rest.split(' DETAILS='):
+            if '=' in item:
+                for pair in item.split():
+                    if '=' in pair:
+                        key, val = pair.split('=', 1)
+                        parts[key] = val
+        
+        return {
+            'timestamp': timestamp,
+            'operation': parts.get('OPERATION', 'UNKNOWN'),
+            'file': parts.get('FILE', 'N/A'),
+            'status': parts.get('STATUS', 'UNKNOWN'),
+            'details': line.split('DETAILS=')[-1] if 'DETAILS=' in line else ''
+        }
+    except:
+        return {'timestamp': '', 'operation': 'PARSE_ERROR', 'file': '', 'status': '', 'details': line}
+
+
+def parse_security_log_line(line):
+    """Parse security log format: [ts] EVENT=X IP=Y FILE=Z DETAILS=..."""
+    try:
+        timestamp = line[1:20]
+        rest = line[22:]
+        parts = {}
+        for token in rest.split():
+            if '=' in token:
+                key, val = token.split('=', 1)
+                parts[key] = val
+        return {
+            'timestamp': timestamp,
+            'event': parts.get('EVENT', 'UNKNOWN'),
+            'ip': parts.get('IP', ''),
+            'file': parts.get('FILE', ''),
+            'details': line.split('DETAILS=')[-1] if 'DETAILS=' in line else ''
+        }
+    except:
+        return {'timestamp': '', 'event': 'PARSE_ERROR', 'ip': '', 'file': '', 'details': line}
+
+
+def parse_event_line(line):
+    """Parse event line from events.log"""
+    try:
+        # Format: [timestamp] EVENT_TYPE filename lock_type pid user status
+        parts = line.strip('[]').split('] ', 1)
+        if len(parts) == 2:
+            timestamp = parts[0]
+            rest = parts[1]
+            tokens = rest.split()
+            
+            return {
+                'timestamp': timestamp,
+                'event_type': tokens[0] if len(tokens) > 0 else 'UNKNOWN',
+                'filename': tokens[1] if len(tokens) > 1 else '',
+                'lock_type': tokens[2] if len(tokens) > 2 else 'NONE',
+                'pid': tokens[3] if len(tokens) > 3 else '',
+                'user': tokens[4] if len(tokens) > 4 else 'system',
+                'status': tokens[5] if len(tokens) > 5 else 'PENDING'
+            }
+    except:
+        pass
+    
+    return {'timestamp': '', 'event_type': 'PARSE_ERROR', 'raw': line}
@@ -0,0 +1,238 @@
+"""
+Password Hashing & Verification
+Salted, tunable-cost password hashes for users.db, verified off the request
+threads in a bounded process pool
+
+Hash formats (no ':' so they fit the username:hash:role lines of users.db):
+  $scrypt$n=16384,r=8,p=1$<salt>$<hash>         (default)
+  $pbkdf2-sha256$i=600000$<salt>$<hash>
+  <64 hex chars>                                 legacy unsalted SHA-256
+Salt and hash are unpadded base64. Legacy hashes and hashes with parameters
+other than the configured ones verify normally and are flagged for rehash, so
+AuthManager upgrades them on the next successful login.
+
+Recent successful verifications are cached for a short TTL, keyed by an
+HMAC (with a per-process random key) of user, stored hash and password, so
+repeated logins skip the KDF. Changing the stored hash invalidates the entry.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import pickle
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME', 'scrypt')
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', '16384'))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '600000'))
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', '2'))
+PASSWORD_CACHE_TTL = float(os.environ.get('PASSWORD_CACHE_TTL', '300'))
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+KDF_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kdf_worker.py')
+
+
+class VerifierBusy(Exception):
+    """Too many password verifications are already queued"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _derive(scheme: str, params: dict, password: str, salt: bytes) -> bytes:
+    if scheme == 'scrypt':
+        n, r, p = params['n'], params['r'], params['p']
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + (1 << 20), dklen=HASH_BYTES)
+    if scheme == 'pbkdf2-sha256':
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, params['i'], dklen=HASH_BYTES)
+    raise ValueError(f"Unknown password scheme: {scheme}")
+
+
+def _parse(encoded: str) -> Optional[Tuple[str, dict, bytes, bytes]]:
+    """Split '$scheme$params$salt$hash' into its parts (None if not that format)"""
+    parts = encoded.split('$')
+    if len(parts) != 5 or parts[0] != '':
+        return None
+    params = {}
+    for item in parts[2].split(','):
+        key, _, value = item.partition('=')
+        params[key] = int(value)
+    return parts[1], params, _b64decode(parts[3]), _b64decode(parts[4])
+
+
+def encode_hash(scheme: str, params: dict, password: str, salt: Optional[bytes] = None) -> str:
+    salt = salt or os.urandom(SALT_BYTES)
+    derived = _derive(scheme, params, password, salt)
+    param_text = ','.join(f"{key}={value}" for key, value in params.items())
+    return f"${scheme}${param_text}${_b64encode(salt)}${_b64encode(derived)}"
+
+
+def verify_hash(password: str, encoded: str) -> bool:
+    """Check a password against any supported stored hash (constant-time compare)"""
+    try:
+        parsed = _parse(encoded)
+        if parsed is None:
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy.encode(), encoded.encode())
+        scheme, params, salt, expected = parsed
+        return hmac.compare_digest(_derive(scheme, params, password, salt), expected)
+    except (ValueError, KeyError):
+        return False  # Malformed stored hash
+
+
+class _KdfWorker:
+    """One kdf_worker.py process; used by one request thread at a time"""
+
+    def __init__(self):
+        self.process = subprocess.Popen([sys.executable, KDF_WORKER_SCRIPT],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def call(self, fn, args) -> Tuple[bool, object]:
+        """-> (True, result) or (False, exception raised in the worker)"""
+        pickle.dump((fn.__name__, args), self.process.stdin)
+        self.process.stdin.flush()
+        return pickle.load(self.process.stdout)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords with a configurable KDF
+
+    workers > 0 runs the KDF in that many kdf_worker.py processes, started
+    with the hasher (at API startup), so a login burst uses at most that many
+    cores; at most max_pending verifications may be queued before callers get
+    VerifierBusy. workers = 0 hashes inline.
+    """
+
+    def __init__(self, scheme: str = PASSWORD_SCHEME, scrypt_n: int = PASSWORD_SCRYPT_N,
+                 pbkdf2_iterations: int = PASSWORD_PBKDF2_ITERATIONS, workers: int = PASSWORD_WORKERS,
+                 cache_ttl: float = PASSWORD_CACHE_TTL, max_pending: Optional[int] = None,
+                 queue_timeout: float = 5.0, cache_size: int = 10000):
+        if scheme == 'scrypt':
+            self.params = {'n': scrypt_n, 'r': SCRYPT_R, 'p': SCRYPT_P}
+        elif scheme == 'pbkdf2-sha256' or scheme == 'pbkdf2':
+            scheme = 'pbkdf2-sha256'
+            self.params = {'i': pbkdf2_iterations}
+        else:
+            raise ValueError(f"Unknown password scheme: {scheme}")
+        self.scheme = scheme
+        self.workers = workers
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending or max(1, workers) * 8)
+        self._workers: List[_KdfWorker] = []
+        self._idle: "queue.Queue[_KdfWorker]" = queue.Queue()
+        self._pool_lock = threading.Lock()
+        self._cache_key = secrets.token_bytes(32)
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        if workers > 0:
+            self._start()
+
+    def _start(self):
+        with self._pool_lock:
+            while len(self._workers) < self.workers:
+                worker = _KdfWorker()
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def _run(self, fn, *args):
+        """Run fn in the pool (bounded), or inline without workers"""
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise VerifierBusy("Password verification queue is full")
+        try:
+            if not self._workers:
+                self._start()  # Restarted after shutdown()
+            worker = self._idle.get()
+            try:
+                ok, result = worker.call(fn, args)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                # Worker died mid-request: replace it, fail this request
+                worker.process.kill()
+                worker.close()
+                with self._pool_lock:
+                    if worker in self._workers:
+                        self._workers.remove(worker)
+                        worker = _KdfWorker()
+                        self._workers.append(worker)
+                raise
+            finally:
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+        if not ok:
+            raise result
+        return result
+
+    def hash(self, password: str) -> str:
+        return self._run(encode_hash, self.scheme, self.params, password)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            parsed = _parse(encoded)
+        except ValueError:
+            return True
+        return parsed is None or parsed[0] != self.scheme or parsed[1] != self.params
+
+    def _cache_token(self, username: str, encoded: str, password: str) -> bytes:
+        message = b"\0".join((username.encode(), encoded.encode(), password.encode()))
+        return hmac.new(self._cache_key, message, hashlib.sha256).digest()
+
+    def verify(self, username: str, password: str, encoded: str) -> Tuple[bool, bool]:
+        """Returns (valid, needs_rehash)"""
+        token = None
+        if self.cache_ttl > 0:
+            token = self._cache_token(username, encoded, password)
+            now = time.monotonic()
+            with self._cache_lock:
+                expires = self._cache.get(token)
+                if expires is not None and expires > now:
+                    self._cache.move_to_end(token)
+                    self.cache_hits += 1
+                    return True, self.needs_rehash(encoded)
+
+        if not self._run(verify_hash, password, encoded):
+            return False, False
+
+        if token is not None:
+            with self._cache_lock:
+                self._cache[token] = time.monotonic() + self.cache_ttl
+                self._cache.move_to_end(token)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return True, self.needs_rehash(encoded)
+
+    def shutdown(self):
+        """Stop the worker processes (waits for requests in progress)"""
+        with self._pool_lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._idle.get().close()
@@ -0,0 +1,228 @@
+"""
+Brute-Force Rate Tracking
+One structure for counting failures per key (client IP) over a sliding
+window and blocking keys that cross a threshold, used by both AuthManager and
+SecurityManager
+
+The window is split into time buckets; a key's count is the sum of its
+buckets that are still inside the window, so old failures decay away bucket
+by bucket instead of accumulating forever.
+
+- RateTracker        per-process; tracked keys are an LRU capped at max_keys,
+                     block expiries are kept in a heap so cleanup is
+                     O(expired log n) for any block length, and at
+                     max_blocked new blocks are refused rather than evicting
+                     a live one
+- SharedRateTracker  same interface on a shared state backend (one counter
+                     key per key and bucket, expiring with the window)
+
+Block checks are a single dict / key lookup.
+"""
+
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class _Window:
+    """Bucketed failure counts of one key"""
+
+    __slots__ = ("counts", "ids")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.ids = [-1] * buckets   # Bucket number each slot currently holds
+
+    def add(self, bucket: int) -> None:
+        slot = bucket % len(self.counts)
+        if self.ids[slot] != bucket:
+            self.ids[slot] = bucket
+            self.counts[slot] = 0
+        self.counts[slot] += 1
+
+    def total(self, bucket: int) -> int:
+        oldest = bucket - len(self.counts)
+        return sum(count for count, bid in zip(self.counts, self.ids) if bid > oldest)
+
+
+class RateTracker:
+    """Sliding-window failure counter with blocking, bounded memory"""
+
+    def __init__(self, window: float = 600, buckets: int = 10, threshold: int = 3,
+                 block_duration: float = 600, max_keys: int = 10000, max_blocked: int = 10000):
+        self.window = window
+        self.bucket_width = window / buckets
+        self.buckets = buckets
+        self.threshold = threshold          # 0 = count only, never block automatically
+        self.block_duration = block_duration
+        self.max_keys = max_keys
+        self.max_blocked = max_blocked
+        self._windows: "OrderedDict[str, _Window]" = OrderedDict()   # LRU order
+        self._blocked: Dict[str, float] = {}                         # key -> block expiry
+        self._expiries: List[Tuple[float, str]] = []                 # Heap; stale once renewed or unblocked
+        self._lock = threading.Lock()
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_width)
+
+    def record(self, key: str, now: Optional[float] = None) -> Tuple[int, Optional[float]]:
+        """Count one failure; returns (failures in window, block expiry if now blocked)"""
+        now = time.time() if now is None else now
+        bucket = self._bucket(now)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = _Window(self.buckets)
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+            window.add(bucket)
+            count = window.total(bucket)
+
+        if self.threshold and count >= self.threshold:
+            return count, self.block(key, now + self.block_duration, now)
+        return count, None
+
+    def block(self, key: str, until: float, now: Optional[float] = None) -> Optional[float]:
+        """
+        Block a key until the given time; its failure count starts over.
+        Returns None (not blocked) if max_blocked live blocks already exist:
+        live blocks are never evicted to make room for new ones.
+        """
+        with self._lock:
+            self._purge_locked(time.time() if now is None else now)
+            if key not in self._blocked and len(self._blocked) >= self.max_blocked:
+                return None
+            self._windows.pop(key, None)
+            self._blocked[key] = until
+            heapq.heappush(self._expiries, (until, key))
+            if len(self._expiries) > 2 * len(self._blocked) + 64:
+                # Drop stale heap entries left by renewals and unblocks
+                self._expiries = [(t, k) for k, t in self._blocked.items()]
+                heapq.heapify(self._expiries)
+        return until
+
+    def blocked_until(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        until = self._blocked.get(key)
+        if until is None:
+            return None
+        if (time.time() if now is None else now) >= until:
+            with self._lock:
+                # Only drop the expiry we saw: another thread may have renewed it
+                if self._blocked.get(key) == until:
+                    del self._blocked[key]
+            return None
+        return until
+
+    def count(self, key: str, now: Optional[float] = None) -> int:
+        window = self._windows.get(key)
+        return window.total(self._bucket(time.time() if now is None else now)) if window else 0
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def unblock(self, key: str) -> None:
+        with self._lock:
+            self._blocked.pop(key, None)
+
+    def purge(self, now: Optional[float] = None) -> None:
+        """Drop expired blocks"""
+        with self._lock:
+            self._purge_locked(time.time() if now is None else now)
+
+    def _purge_locked(self, now: float) -> None:
+        while self._expiries and self._expiries[0][0] <= now:
+            until, key = heapq.heappop(self._expiries)
+            if self._blocked.get(key) == until:
+                del self._blocked[key]
+
+    def counts(self) -> Dict[str, int]:
+        bucket = self._bucket(time.time())
+        with self._lock:
+            counts = {key: window.total(bucket) for key, window in self._windows.items()}
+        return {key: count for key, count in counts.items() if count}
+
+    def blocked(self) -> Dict[str, float]:
+        self.purge()
+        with self._lock:
+            return dict(self._blocked)
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class SharedRateTracker:
+    """RateTracker backed by a shared state backend (all API workers count together)"""
+
+    def __init__(self, state, name: str, window: float = 600, buckets: int = 10,
+                 threshold: int = 3, block_duration: float = 600):
+        self.state = state
+        self.ns_counts = f"{name}_failures"   # "key\0bucket" -> count
+        self.ns_blocked = f"{name}_blocked"   # key -> block expiry
+        self.window = window
+        self.bucket_width = window / buckets
+        self.buckets = buckets
+        self.threshold = threshold
+        self.block_duration = block_duration
+
+    def record(self, key: str, now: Optional[float] = None) -> Tuple[int, Optional[float]]:
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_width)
+        self.state.incr(self.ns_counts, f"{key}\0{bucket}", 1, (bucket + self.buckets + 1) * self.bucket_width)
+        count = self.count(key, now)
+        if self.threshold and count >= self.threshold:
+            return count, self.block(key, now + self.block_duration)
+        return count, None
+
+    def block(self, key: str, until: float, now: Optional[float] = None) -> Optional[float]:
+        self.reset(key)
+        self.state.set(self.ns_blocked, key, until, until)
+        return until
+
+    def blocked_until(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        return self.state.get(self.ns_blocked, key)
+
+    def count(self, key: str, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        oldest = int(now // self.bucket_width) - self.buckets
+        return sum(count for bucket_key, count in self.state.items(self.ns_counts, f"{key}\0").items()
+                   if int(bucket_key.rpartition("\0")[2]) > oldest)
+
+    def reset(self, key: str) -> None:
+        for bucket_key in self.state.items(self.ns_counts, f"{key}\0"):
+            self.state.delete(self.ns_counts, bucket_key)
+
+    def unblock(self, key: str) -> None:
+        self.state.delete(self.ns_blocked, key)
+
+    def purge(self, now: Optional[float] = None) -> None:
+        self.state.purge_expired(self.ns_blocked, now)
+        self.state.purge_expired(self.ns_counts, now)
+
+    def counts(self) -> Dict[str, int]:
+        oldest = int(time.time() // self.bucket_width) - self.buckets
+        counts: Dict[str, int] = {}
+        for bucket_key, count in self.state.items(self.ns_counts).items():
+            key, _, bucket = bucket_key.rpartition("\0")
+            if int(bucket) > oldest:
+                counts[key] = counts.get(key, 0) + count
+        return counts
+
+    def blocked(self) -> Dict[str, float]:
+        return self.state.items(self.ns_blocked)
+
+    def __len__(self) -> int:
+        return len(self.counts())
+
+
+def create_rate_tracker(state, name: str, **config):
+    """Shared tracker when the state backend is shared, else a local one"""
+    if state is not None and state.shared:
+        config.pop("max_keys", None)
+        config.pop("max_blocked", None)
+        return SharedRateTracker(state, name, **config)
+    return RateTracker(**config)
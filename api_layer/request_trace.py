@@ -0,0 +1,63 @@
+"""
+Structured Request Trace
+Optional JSON-lines record of every file operation the API forwards to the
+C server, written so production traffic can be replayed against a test
+instance (benchmarks/replay.py)
+
+One line per request:
+  {"ts": 1767225600.123, "op": "upload", "file": "alice/a.bin",
+   "bytes": 4096, "status": 200, "latency_ms": 3.1}
+
+ts is the wall-clock time the request arrived (sub-second, unlike the
+audit log), bytes is the payload size (upload body or download reply).
+Set API_TRACE_LOG to a file path to enable; unset or empty = off.
+"""
+
+import json
+import os
+import threading
+
+API_TRACE_LOG = os.environ.get('API_TRACE_LOG', '')
+
+# Flask endpoint -> replayable operation
+TRACED_ENDPOINTS = {
+    'api_upload': 'upload',
+    'api_download': 'download',
+    'api_delete': 'delete',
+    'api_list': 'list',
+    'api_locks': 'locks',
+}
+
+
+class RequestTrace:
+    """Append-only JSONL writer shared by all request threads"""
+
+    def __init__(self, path=API_TRACE_LOG):
+        self.path = path
+        self.lock = threading.Lock()
+        self.f = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.f = open(path, 'a', buffering=1)   # line buffered: one write per request
+
+    @property
+    def enabled(self):
+        return self.f is not None
+
+    def record(self, ts, op, name, nbytes, status, latency):
+        if self.f is None:
+            return
+        line = json.dumps({'ts': round(ts, 6), 'op': op, 'file': name, 'bytes': nbytes,
+                           'status': status, 'latency_ms': round(latency * 1000, 3)},
+                          separators=(',', ':'))
+        with self.lock:
+            self.f.write(line + '\n')
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+request_trace = RequestTrace()
@@ -4,18 +4,28 @@ PHASE 3: Security & Intrusion Detection Module
 Implements rule-based security logic for OS events
 
 Features:
-- AUTH_FAIL tracking (3 failures = 600s IP block)
+- AUTH_FAIL tracking (3 failures within 600s = 600s IP block)
 - PATH_TRAVERSAL detection (../ patterns)
 - ACCESS_VIOLATION detection (concurrent write access)
 - FILE_INTEGRITY_ALERT (hash mismatches)
 - Automatic security event generation
 """
 
-import hashlib
-import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from datetime import datetime
+from typing import Dict, List, Set, Tuple, Optional
+
+from event_log import EventLog, event_time
+from event_store import EventStore, SharedEventStore
+from integrity_store import Content, HashStore, hash_content
+from rate_limit import create_rate_tracker
+from state_backend import get_default_backend
+
+SECURITY_EVENTS_CAPACITY = int(os.environ.get('SECURITY_EVENTS_CAPACITY', '10000'))
+STATE_DIR = os.environ.get('AUTH_STATE_DIR',
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'auth'))
+SECURITY_EVENT_LOG_DIR = os.environ.get('SECURITY_EVENT_LOG_DIR',
+                                        os.path.join(STATE_DIR, 'security_events'))   # Empty = no log
 
 class SecurityManager:
     """
@@ -23,43 +33,70 @@ class SecurityManager:
     Detects and tracks security violations
     """
     
-    def __init__(self):
-        self.auth_failures = {}           # IP -> list of (timestamp, user)
-        self.blocked_ips = {}             # IP -> block_expiry
-        self.file_hashes = {}             # filename -> hash
-        self.concurrent_writers = {}      # filename -> set of users
-        self.security_events = []         # List of security events
+    # State backend namespaces (shared between API workers with STATE_BACKEND=sqlite)
+    NS_WRITERS = 'security_writers'               # "filename\0user" -> True
+    NS_EVENTS = 'security_events'                 # Security event lists and counters
+    
+    def __init__(self, state=None, max_events: int = SECURITY_EVENTS_CAPACITY,
+                 hashes_path: Optional[str] = None, log_dir: str = SECURITY_EVENT_LOG_DIR):
+        self.state = state if state is not None else get_default_backend()
+        self.hashes_path = hashes_path or os.path.join(STATE_DIR, 'file_hashes.jsonl')
+        self.file_hashes = None           # filename -> hash (HashStore, set by load_security_state)
         self.MAX_AUTH_FAILURES = 3
         self.BLOCK_DURATION = 600         # 600 seconds = 10 minutes
+        self.MAX_EVENTS = max_events      # Oldest events leave memory beyond this (the event log keeps them)
+        self.FAILURE_WINDOW = 600         # Failures older than this no longer count
+        self.MAX_TRACKED_IPS = 10000      # LRU cap on IPs with failure counters
+        self.auth_tracker = create_rate_tracker(
+            self.state, 'security', window=self.FAILURE_WINDOW, threshold=self.MAX_AUTH_FAILURES,
+            block_duration=self.BLOCK_DURATION, max_keys=self.MAX_TRACKED_IPS,
+            max_blocked=self.MAX_TRACKED_IPS)
+        if self.state.shared:
+            self.events = SharedEventStore(self.state, self.MAX_EVENTS, self.NS_EVENTS)
+        else:
+            self.events = EventStore(self.MAX_EVENTS)
+        # Persistent, queryable history (the shared backend already persists events)
+        self.event_log = EventLog(log_dir) if log_dir and not self.state.shared else None
         self.load_security_state()
     
+    @property
+    def auth_failures(self) -> Dict[str, int]:
+        """IP -> failed auth attempts within the failure window"""
+        return self.auth_tracker.counts()
+    
+    @property
+    def blocked_ips(self) -> Dict[str, datetime]:
+        """IP -> block expiry (expired blocks are never returned)"""
+        return {ip: datetime.fromtimestamp(expiry)
+                for ip, expiry in self.auth_tracker.blocked().items()}
+    
+    @property
+    def concurrent_writers(self) -> Dict[str, Set[str]]:
+        """filename -> set of users currently writing it"""
+        writers = {}
+        for key in self.state.items(self.NS_WRITERS):
+            filename, _, user = key.partition('\0')
+            writers.setdefault(filename, set()).add(user)
+        return writers
+    
+    @property
+    def security_events(self) -> List[Dict]:
+        """All retained security events, oldest first"""
+        return self.events.recent()
+    
+    def _record_event(self, event: Dict):
+        self.events.append(event)
+        if self.event_log is not None:
+            self.event_log.append(event)
+    
     def load_security_state(self):
-        """Load existing security state from file"""
-        try:
-            state_file = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'auth', 'security_state.json'
-            )
-            if os.path.exists(state_file):
-                with open(state_file, 'r') as f:
-                    data = json.load(f)
-                    self.file_hashes = data.get('file_hashes', {})
-        except Exception as e:
-            print(f"[SECURITY] Warning loading state: {e}")
+        """Load existing security state (imports a legacy security_state.json once)"""
+        self.file_hashes = HashStore(self.hashes_path,
+                                     legacy_path=os.path.join(STATE_DIR, 'security_state.json'))
     
     def save_security_state(self):
-        """Persist security state"""
-        try:
-            state_dir = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'auth'
-            )
-            os.makedirs(state_dir, exist_ok=True)
-            state_file = os.path.join(state_dir, 'security_state.json')
-            with open(state_file, 'w') as f:
-                json.dump({'file_hashes': self.file_hashes}, f)
-        except Exception as e:
-            print(f"[SECURITY] Warning saving state: {e}")
+        """Persist security state (writes any buffered hash changes now)"""
+        self.file_hashes.flush()
     
     def check_path_traversal(self, filename: str) -> Tuple[bool, str]:
         """
@@ -84,28 +121,13 @@ class SecurityManager:
         Track failed authentication attempts
         Returns: (should_block, reason)
         """
-        # Clean expired blocks
-        self._clean_expired_blocks()
-        
         # Check if already blocked
-        if ip in self.blocked_ips:
-            expiry = self.blocked_ips[ip]
-            if datetime.now() < expiry:
-                return False, f"IP {ip} blocked until {expiry.isoformat()}"
-            else:
-                del self.blocked_ips[ip]
-                self.auth_failures[ip] = []
-        
-        # Track this failure
-        if ip not in self.auth_failures:
-            self.auth_failures[ip] = []
-        
-        self.auth_failures[ip].append({
-            'timestamp': datetime.now().isoformat(),
-            'username': username
-        })
+        expiry = self.auth_tracker.blocked_until(ip)
+        if expiry is not None:
+            return False, f"IP {ip} blocked until {datetime.fromtimestamp(expiry).isoformat()}"
         
-        failures = len(self.auth_failures[ip])
+        # Track this failure (sliding window; blocks once the threshold is reached)
+        failures, blocked_until = self.auth_tracker.record(ip)
         
         # Generate security event
         event = {
@@ -116,12 +138,10 @@ class SecurityManager:
             'failure_count': failures,
             'severity': 'HIGH' if failures >= 2 else 'MEDIUM'
         }
-        self.security_events.append(event)
+        self._record_event(event)
         
-        # Block if threshold exceeded
-        if failures >= self.MAX_AUTH_FAILURES:
-            self.blocked_ips[ip] = datetime.now() + timedelta(seconds=self.BLOCK_DURATION)
-            
+        # Block if threshold exceeded (the count restarts once the block is placed)
+        if blocked_until is not None:
             # Generate blocking event
             block_event = {
                 'timestamp': datetime.now().isoformat(),
@@ -130,7 +150,7 @@ class SecurityManager:
                 'reason': f'{failures} failed auth attempts',
                 'severity': 'CRITICAL'
             }
-            self.security_events.append(block_event)
+            self._record_event(block_event)
             
             return False, f"IP blocked after {failures} failures"
         
@@ -146,9 +166,9 @@ class SecurityManager:
             return True, "Safe (read operation)"
         
         # Check if file is being written by another user
-        if filename in self.concurrent_writers:
-            writers = self.concurrent_writers[filename]
-            if len(writers) > 0 and user not in writers:
+        writers = {key.partition('\0')[2] for key in self.state.items(self.NS_WRITERS, filename + '\0')}
+        if writers:
+            if user not in writers:
                 reason = f"CONCURRENT_WRITE: {filename} already being written by {writers}"
                 
                 # Generate security event
@@ -160,19 +180,20 @@ class SecurityManager:
                     'current_writers': list(writers),
                     'severity': 'HIGH'
                 }
-                self.security_events.append(event)
+                self._record_event(event)
                 
                 return False, reason
         
         return True, "Safe (no concurrent access)"
     
-    def check_file_integrity(self, filename: str, content: bytes) -> Tuple[bool, str]:
+    def check_file_integrity(self, filename: str, content: Content) -> Tuple[bool, str]:
         """
         Check file integrity via hash verification
+        content: bytes, a binary file object or an iterable of byte chunks
         Returns: (integrity_ok, reason)
         """
         try:
-            current_hash = hashlib.sha256(content).hexdigest()
+            current_hash = hash_content(content)
             
             if filename in self.file_hashes:
                 expected_hash = self.file_hashes[filename]
@@ -188,17 +209,15 @@ class SecurityManager:
                         'actual_hash': current_hash,
                         'severity': 'CRITICAL'
                     }
-                    self.security_events.append(event)
+                    self._record_event(event)
                     
-                    # Update hash for future comparisons
+                    # Update hash for future comparisons (persisted in the next batch)
                     self.file_hashes[filename] = current_hash
-                    self.save_security_state()
                     
                     return False, reason
             else:
                 # First time seeing this file, store hash
                 self.file_hashes[filename] = current_hash
-                self.save_security_state()
             
             return True, "Integrity verified"
         except Exception as e:
@@ -207,9 +226,7 @@ class SecurityManager:
     def track_file_operation(self, filename: str, user: str, operation: str):
         """Track file operation for concurrent access detection"""
         if operation.upper() == 'WRITE':
-            if filename not in self.concurrent_writers:
-                self.concurrent_writers[filename] = set()
-            self.concurrent_writers[filename].add(user)
+            self.state.set(self.NS_WRITERS, f"{filename}\0{user}", True)
         
         # Generate operation event (non-security)
         event = {
@@ -219,54 +236,62 @@ class SecurityManager:
             'user': user,
             'severity': 'INFO'
         }
-        self.security_events.append(event)
+        self._record_event(event)
     
     def release_file_operation(self, filename: str, user: str, operation: str):
         """Release file operation tracking"""
-        if operation.upper() == 'WRITE' and filename in self.concurrent_writers:
-            self.concurrent_writers[filename].discard(user)
-            if not self.concurrent_writers[filename]:
-                del self.concurrent_writers[filename]
+        if operation.upper() == 'WRITE':
+            self.state.delete(self.NS_WRITERS, f"{filename}\0{user}")
     
     def _clean_expired_blocks(self):
         """Remove expired IP blocks"""
-        expired = [ip for ip, expiry in self.blocked_ips.items() 
-                  if datetime.now() >= expiry]
-        for ip in expired:
-            del self.blocked_ips[ip]
-            if ip in self.auth_failures:
-                self.auth_failures[ip] = []
+        self.auth_tracker.purge()
     
     def get_security_events(self, limit: int = 50) -> List[Dict]:
         """Get recent security events (last 'limit' events)"""
-        return self.security_events[-limit:]
+        return self.events.recent(limit)
+    
+    def query_events(self, event_type: Optional[str] = None, ip: Optional[str] = None,
+                     since: Optional[float] = None, until: Optional[float] = None,
+                     limit: int = 50) -> List[Dict]:
+        """Newest events matching type / IP / time range (epoch seconds), oldest first"""
+        if event_type is None and ip is None and since is None and until is None:
+            return self.get_security_events(limit)
+        if self.event_log is not None:
+            return self.event_log.query(event_type, ip, since, until, limit)
+        
+        # No log: filter the retained events
+        events = self.events.by_type(event_type, self.MAX_EVENTS) if event_type else self.events.recent()
+        matches = [e for e in events
+                   if (ip is None or e.get('ip') == ip)
+                   and (since is None or event_time(e) >= since)
+                   and (until is None or event_time(e) <= until)]
+        return matches[-limit:] if limit > 0 else []
     
     def get_high_severity_events(self, limit: int = 20) -> List[Dict]:
-        """Get high/critical severity events only"""
-        high_events = [e for e in self.security_events 
-                      if e.get('severity') in ['HIGH', 'CRITICAL']]
-        return high_events[-limit:]
+        """Get high/critical severity events only (served from the severity index)"""
+        return self.events.by_severity(['HIGH', 'CRITICAL'], limit)
     
     def is_ip_blocked(self, ip: str) -> Tuple[bool, Optional[str]]:
         """Check if IP is currently blocked"""
-        self._clean_expired_blocks()
-        if ip in self.blocked_ips:
-            expiry = self.blocked_ips[ip]
-            if datetime.now() < expiry:
-                return True, expiry.isoformat()
+        expiry = self.auth_tracker.blocked_until(ip)
+        if expiry is not None:
+            return True, datetime.fromtimestamp(expiry).isoformat()
         return False, None
     
     def get_summary(self) -> Dict:
-        """Get security summary"""
-        high_sev = len([e for e in self.security_events 
-                       if e.get('severity') in ['HIGH', 'CRITICAL']])
+        """Get security summary (event totals are running counters since startup)"""
+        counts = self.events.counts()
+        by_severity = counts['by_severity']
         
         return {
-            'total_events': len(self.security_events),
-            'high_severity': high_sev,
-            'blocked_ips': len(self.blocked_ips),
+            'total_events': counts['total'],
+            'high_severity': by_severity.get('HIGH', 0) + by_severity.get('CRITICAL', 0),
+            'events_by_severity': by_severity,
+            'events_by_type': counts['by_type'],
+            'blocked_ips': len(self.auth_tracker.blocked()),
             'tracked_files': len(self.file_hashes),
-            'recent_events': self.security_events[-10:] if self.security_events else []
+            'recent_events': self.events.recent(10)
         }
 
 
@@ -0,0 +1,337 @@
+"""
+Session Persistence Engine
+Append-only journal of session changes plus a periodically compacted snapshot,
+and an expiry-indexed in-memory session table
+
+- sessions.json      snapshot: {token: session} as of the last compaction
+- sessions.journal   one JSON record per line, appended after the snapshot:
+                       {"op": "create", "token": ..., "session": {...}}
+                       {"op": "touch",  "token": ..., "last_activity": ...}
+                       {"op": "delete", "token": ...}
+
+Every login/logout/expiry appends one line (O(1)) instead of rewriting all
+sessions. Startup loads the snapshot and replays the journal; records are
+idempotent, so a crash between writing a snapshot and truncating the journal
+replays harmlessly, and a torn last line is ignored.
+
+Timestamps are epoch seconds (floats); ISO strings written by older versions
+are converted on load.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def _epoch(value) -> float:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class Session:
+    """One login session (slotted: a few hundred bytes per session)"""
+
+    __slots__ = ("token", "username", "role", "client_ip",
+                 "login_time", "last_activity", "expires_at", "deadline")
+
+    def __init__(self, token: str, username: str, role: str, client_ip: str,
+                 login_time: float, last_activity: Optional[float] = None):
+        self.token = token
+        self.username = username
+        self.role = role
+        self.client_ip = client_ip
+        self.login_time = login_time
+        self.last_activity = login_time if last_activity is None else last_activity
+        self.expires_at = 0.0   # Absolute expiry (login_time + max age)
+        self.deadline = 0.0     # min(expires_at, last_activity + idle timeout)
+
+    # Dict-style access for request handlers (request.session.get('username'))
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        return {
+            "username": self.username,
+            "role": self.role,
+            "token": self.token,
+            "client_ip": self.client_ip,
+            "login_time": self.login_time,
+            "last_activity": self.last_activity,
+        }
+
+    @classmethod
+    def from_dict(cls, token: str, data: Dict) -> "Session":
+        return cls(token, data["username"], data["role"], data.get("client_ip", ""),
+                   _epoch(data["login_time"]), _epoch(data.get("last_activity", data["login_time"])))
+
+
+class SessionJournal:
+    """Persists a {token: Session} table as snapshot + append-only journal"""
+
+    def __init__(self, snapshot_path: str, journal_path: Optional[str] = None,
+                 compact_min_records: int = 1000, touch_interval: float = 60.0):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.compact_min_records = compact_min_records
+        self.touch_interval = touch_interval   # Seconds between persisted touches per session
+        self._journal = None
+        self._records = 0                      # Records appended since the last snapshot
+        self._last_touch: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Session]:
+        """Rebuild the session table from snapshot + journal"""
+        sessions: Dict[str, Session] = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                data = f.read()
+            if data.strip():
+                for token, session in json.loads(data).items():
+                    sessions[token] = Session.from_dict(token, session)
+
+        records = 0
+        if os.path.exists(self.journal_path):
+            offset = 0                         # End of the last complete record
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Torn write at the tail (crash mid-append)
+                    if not line.endswith(b"\n"):
+                        break
+                    self._apply(sessions, record)
+                    records += 1
+                    offset += len(line)
+            if offset < os.path.getsize(self.journal_path):
+                # Cut the torn tail so the next append starts on a fresh line
+                os.truncate(self.journal_path, offset)
+
+        with self._lock:
+            self._records = records
+            self._last_touch.clear()
+        return sessions
+
+    @staticmethod
+    def _apply(sessions: Dict[str, Session], record: Dict):
+        op = record.get("op")
+        token = record.get("token")
+        if op == "create":
+            sessions[token] = Session.from_dict(token, record["session"])
+        elif op == "touch":
+            if token in sessions:
+                sessions[token].last_activity = _epoch(record["last_activity"])
+        elif op == "delete":
+            sessions.pop(token, None)
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._journal is None:
+                os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write(line)
+            self._journal.flush()
+            self._records += 1
+
+    def record_create(self, session: Session):
+        self._append({"op": "create", "token": session.token, "session": session.to_dict()})
+        with self._lock:
+            self._last_touch[session.token] = time.monotonic()
+
+    def record_touch(self, session: Session) -> bool:
+        """Journal a touch at most once per touch_interval per session"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_touch.get(session.token)
+            if last is not None and now - last < self.touch_interval:
+                return False
+            self._last_touch[session.token] = now
+        self._append({"op": "touch", "token": session.token, "last_activity": session.last_activity})
+        return True
+
+    def record_delete(self, token: str):
+        self._append({"op": "delete", "token": token})
+        with self._lock:
+            self._last_touch.pop(token, None)
+
+    def needs_compaction(self, live_sessions: int) -> bool:
+        """Compact once the journal outgrows the live table"""
+        return self._records >= max(self.compact_min_records, 2 * live_sessions)
+
+    def compact(self, sessions: Dict[str, Session]):
+        """Write a fresh snapshot atomically, then start an empty journal
+
+        The table is copied under the journal lock: every record already in the
+        journal is reflected in the copy, so truncating it loses nothing.
+        """
+        with self._lock:
+            snapshot = {token: session.to_dict() for token, session in dict(sessions).items()}
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_path, 'w')
+            self._records = 0
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+class SessionTable:
+    """Token -> Session map with a min-heap of expiry deadlines
+
+    Validation is a dict lookup plus one float comparison against the
+    session's precomputed deadline. The heap holds at most one entry per
+    session; touches never push, the sweeper re-queues a session whose
+    deadline moved forward when its old entry comes due. Sweeping costs
+    O(log n) per evicted or re-queued session.
+    """
+
+    def __init__(self, max_age: float, idle_timeout: float = 0):
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout   # 0 disables idle expiry
+        self.sessions: Dict[str, Session] = {}
+        self._heap: List = []              # (deadline, token)
+        self._lock = threading.Lock()
+
+    def _schedule(self, session: Session):
+        session.expires_at = session.login_time + self.max_age
+        session.deadline = session.expires_at
+        if self.idle_timeout:
+            session.deadline = min(session.deadline, session.last_activity + self.idle_timeout)
+
+    def load(self, sessions: Dict[str, Session]):
+        with self._lock:
+            for session in sessions.values():
+                self._schedule(session)
+            self.sessions = dict(sessions)
+            self._heap = [(s.deadline, token) for token, s in self.sessions.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, session: Session):
+        self._schedule(session)
+        with self._lock:
+            self.sessions[session.token] = session
+            heapq.heappush(self._heap, (session.deadline, session.token))
+
+    def get(self, token: str) -> Optional[Session]:
+        return self.sessions.get(token)
+
+    def touch(self, session: Session, now: float):
+        session.last_activity = now
+        if self.idle_timeout:
+            session.deadline = min(session.expires_at, now + self.idle_timeout)
+
+    def remove(self, token: str) -> Optional[Session]:
+        with self._lock:
+            return self.sessions.pop(token, None)
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """Evict every session whose deadline has passed; returns their tokens"""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _, token = heapq.heappop(heap)
+                session = self.sessions.get(token)
+                if session is None:
+                    continue  # Logged out; entry was left in the heap
+                if session.deadline <= now:
+                    del self.sessions[token]
+                    expired.append(token)
+                else:
+                    heapq.heappush(heap, (session.deadline, token))
+
+            # Drop heap entries of logged-out sessions once they dominate
+            if len(heap) > 2 * len(self.sessions) + 64:
+                self._heap = [(s.deadline, token) for token, s in self.sessions.items()]
+                heapq.heapify(self._heap)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+class SharedSessionTable:
+    """Session table kept in a shared state backend (multi-worker deployments)
+
+    Same interface as SessionTable. Each session is one backend key that
+    expires at its deadline, so the backend itself persists and expires
+    sessions (no journal needed). Activity updates are written back at most
+    once per touch_interval, so idle deadlines are exact to that interval.
+    """
+
+    NAMESPACE = "sessions"
+
+    def __init__(self, backend, max_age: float, idle_timeout: float = 0, touch_interval: float = 60.0):
+        self.backend = backend
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.touch_interval = touch_interval
+        self.sessions: Dict[str, Session] = {}   # Nothing to snapshot locally
+
+    def _schedule(self, session: Session):
+        session.expires_at = session.login_time + self.max_age
+        session.deadline = session.expires_at
+        if self.idle_timeout:
+            session.deadline = min(session.deadline, session.last_activity + self.idle_timeout)
+
+    def _store(self, session: Session):
+        self.backend.set(self.NAMESPACE, session.token, session.to_dict(), session.deadline)
+
+    def load(self, sessions: Dict[str, Session]):
+        for session in sessions.values():
+            self.add(session)
+
+    def add(self, session: Session):
+        self._schedule(session)
+        self._store(session)
+
+    def get(self, token: str) -> Optional[Session]:
+        data = self.backend.get(self.NAMESPACE, token)
+        if data is None:
+            return None
+        session = Session.from_dict(token, data)
+        self._schedule(session)
+        return session
+
+    def touch(self, session: Session, now: float):
+        persisted = session.last_activity
+        session.last_activity = now
+        if self.idle_timeout:
+            session.deadline = min(session.expires_at, now + self.idle_timeout)
+        if now - persisted >= self.touch_interval:
+            self._store(session)
+
+    def remove(self, token: str) -> Optional[Session]:
+        session = self.get(token)
+        if self.backend.delete(self.NAMESPACE, token):
+            return session
+        return None
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        return self.backend.purge_expired(self.NAMESPACE, now)
+
+    def __len__(self) -> int:
+        return self.backend.count(self.NAMESPACE)
@@ -0,0 +1,249 @@
+"""
+Stateless Signed Session Tokens
+HMAC-SHA256 signed tokens that carry the session itself, so any API worker
+process can validate them without shared session state
+
+Format: v1.<base64url(payload)>.<base64url(signature)>
+Payload: {"u": username, "r": role, "iat": issued_at, "exp": expires_at, "jti": token_id}
+
+Logouts go to a revocation file shared by all workers on the host: one
+"<jti> <exp>" line per revoked token, appended with O_APPEND (atomic for such
+short lines) under an flock that compaction also takes. Each worker reloads it
+only when its mtime/size/inode change and forgets entries once the token would
+have expired anyway.
+"""
+
+import base64
+import fcntl
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Dict, Optional
+
+TOKEN_PREFIX = "v1."
+KEY_BYTES = 32                 # Minimum (and generated) signing key length
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def load_or_create_key(path: str, timeout: float = 2.0) -> bytes:
+    """
+    Read the signing key, creating a random one (mode 0600) on first use.
+    The key is written and fsynced under a temporary name and then linked
+    into place, so no worker can see a partial file; a key file shorter than
+    KEY_BYTES (left by an older version or edited by hand) is retried until
+    timeout and then refused.
+    """
+    env_key = os.environ.get('AUTH_TOKEN_KEY')
+    if env_key:
+        return env_key.encode()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(path, 'rb') as f:
+                key = f.read()
+        except FileNotFoundError:
+            key = _create_key(path)
+            if key is None:
+                continue  # Another worker linked its key first; read that one
+        if len(key) >= KEY_BYTES:
+            return key
+        if time.monotonic() >= deadline:
+            raise ValueError(f"Token signing key {path} is shorter than {KEY_BYTES} bytes")
+        time.sleep(0.05)
+
+
+def _create_key(path: str) -> Optional[bytes]:
+    """Publish a new random key at path; None if one already exists"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    key = secrets.token_bytes(KEY_BYTES)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            return None
+    finally:
+        os.unlink(tmp)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return key
+
+
+class RevocationList:
+    """Shared list of revoked token ids, backed by an append-only file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._revoked: Dict[str, float] = {}   # jti -> token expiry
+        self._signature = None
+        self._offset = 0
+        self._lines = 0                        # Lines in the file, live or expired
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature is None:
+                self._revoked = {}
+                self._offset = 0
+                self._lines = 0
+                self._signature = None
+                return
+            # Same file grown: read only the new tail; otherwise start over
+            if self._signature is None or signature[2] != self._signature[2] or signature[1] < self._offset:
+                revoked, offset, lines = {}, 0, 0
+            else:
+                revoked, offset, lines = dict(self._revoked), self._offset, self._lines
+            with open(self.path, 'r') as f:
+                f.seek(offset)
+                data = f.read()
+            complete = data[:data.rfind("\n") + 1]   # Ignore a partially written line
+            now = time.time()
+            for line in complete.splitlines():
+                lines += 1
+                parts = line.split()
+                if len(parts) == 2:
+                    try:
+                        expiry = float(parts[1])
+                    except ValueError:
+                        continue
+                    if expiry > now:
+                        revoked[parts[0]] = expiry
+            self._revoked = {jti: exp for jti, exp in revoked.items() if exp > now}
+            self._offset = offset + len(complete.encode())
+            self._lines = lines
+            self._signature = signature
+
+    def _open_locked(self) -> int:
+        """Open the current file for appending with an exclusive flock held"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            # Replaced by a compaction while we waited: retry on the new file
+            os.close(fd)
+
+    def revoke(self, jti: str, expires_at: float):
+        fd = self._open_locked()
+        try:
+            os.write(fd, f"{jti} {expires_at:.0f}\n".encode())
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        self._refresh()
+        return jti in self._revoked
+
+    def needs_compaction(self) -> bool:
+        self._refresh()
+        return self._lines > 2 * len(self._revoked) + 1024
+
+    def compact(self):
+        """Rewrite the file without expired entries"""
+        fd = self._open_locked()
+        try:
+            self._refresh()
+            with self._lock:
+                temp_path = self.path + ".tmp"
+                with open(temp_path, 'w') as f:
+                    for jti, expiry in self._revoked.items():
+                        f.write(f"{jti} {expiry:.0f}\n")
+                os.replace(temp_path, self.path)
+                self._signature = None
+        finally:
+            os.close(fd)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._revoked)
+
+
+class TokenSigner:
+    """Issues and verifies signed session tokens"""
+
+    def __init__(self, key: bytes, revocations: RevocationList, max_age: float):
+        self.key = key
+        self.revocations = revocations
+        self.max_age = max_age
+
+    def _sign(self, message: bytes) -> str:
+        return _b64encode(hmac.new(self.key, message, hashlib.sha256).digest())
+
+    def issue(self, username: str, role: str, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        payload = {
+            "u": username,
+            "r": role,
+            "iat": int(now),
+            "exp": int(now + self.max_age),
+            "jti": secrets.token_urlsafe(12),
+        }
+        body = TOKEN_PREFIX + _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        return body + "." + self._sign(body.encode())
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[Dict]:
+        """Return the payload of a valid, unexpired, unrevoked token"""
+        if not token.startswith(TOKEN_PREFIX):
+            return None
+        body, _, signature = token.rpartition(".")
+        if not body or not hmac.compare_digest(signature.encode(), self._sign(body.encode()).encode()):
+            return None
+        try:
+            payload = json.loads(_b64decode(body[len(TOKEN_PREFIX):]))
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        now = time.time() if now is None else now
+        if now >= payload.get("exp", 0):
+            return None
+        if self.revocations.is_revoked(payload.get("jti", "")):
+            return None
+        return payload
+
+    def revoke(self, token: str) -> bool:
+        payload = self.verify(token)
+        if payload is None:
+            return False
+        self.revocations.revoke(payload["jti"], payload["exp"])
+        return True
+
+    @staticmethod
+    def is_signed(token: str) -> bool:
+        return token.startswith(TOKEN_PREFIX)
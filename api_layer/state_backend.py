@@ -0,0 +1,322 @@
+"""
+Shared State Backends
+Storage for the mutable state of AuthManager and SecurityManager (sessions,
+IP blocks, failure counters, security events, active writers)
+
+- MemoryBackend   per-process dicts (default; single API process)
+- SQLiteBackend   one SQLite database in WAL mode shared by every API worker
+                  process on the host; counters are atomic UPSERTs
+- CachedBackend   wraps a shared backend and caches reads for a short TTL in
+                  each worker, so hot lookups (session validation, block
+                  checks) rarely touch the database
+
+Data model: namespaced keys with JSON values and an optional absolute expiry
+(epoch seconds; expired keys read as missing), plus append-only event lists.
+
+Selected with STATE_BACKEND=memory|sqlite, STATE_DB_PATH and STATE_CACHE_TTL.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+STATE_DB_PATH = os.path.join(os.environ.get('AUTH_STATE_DIR', os.path.join(PROJECT_ROOT, "auth")), "state.db")
+
+
+class MemoryBackend:
+    """Process-local state (the original behaviour)"""
+
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._expiry: Dict[str, Dict[str, float]] = {}
+        self._lists: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, ns: str, key: str, now: float) -> bool:
+        expires = self._expiry.get(ns, {}).get(key)
+        if expires is not None and now >= expires:
+            self._data[ns].pop(key, None)
+            self._expiry[ns].pop(key, None)
+            return False
+        return key in self._data.get(ns, {})
+
+    def get(self, ns: str, key: str, default=None):
+        with self._lock:
+            if self._live(ns, key, time.time()):
+                return self._data[ns][key]
+            return default
+
+    def set(self, ns: str, key: str, value, expires_at: Optional[float] = None):
+        with self._lock:
+            self._data.setdefault(ns, {})[key] = value
+            if expires_at is None:
+                self._expiry.get(ns, {}).pop(key, None)
+            else:
+                self._expiry.setdefault(ns, {})[key] = expires_at
+
+    def delete(self, ns: str, key: str) -> bool:
+        with self._lock:
+            self._expiry.get(ns, {}).pop(key, None)
+            return self._data.get(ns, {}).pop(key, None) is not None
+
+    def incr(self, ns: str, key: str, amount: int = 1, expires_at: Optional[float] = None) -> int:
+        with self._lock:
+            value = (self._data[ns][key] if self._live(ns, key, time.time()) else 0) + amount
+            self._data.setdefault(ns, {})[key] = value
+            if expires_at is not None:
+                self._expiry.setdefault(ns, {})[key] = expires_at
+            return value
+
+    def items(self, ns: str, prefix: str = "") -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            return {key: value for key, value in list(self._data.get(ns, {}).items())
+                    if key.startswith(prefix) and self._live(ns, key, now)}
+
+    def count(self, ns: str) -> int:
+        return len(self.items(ns))
+
+    def purge_expired(self, ns: str, now: Optional[float] = None) -> List[str]:
+        """Drop expired keys of a namespace; returns the dropped keys"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [key for key, expires in self._expiry.get(ns, {}).items() if now >= expires]
+            for key in expired:
+                self._data[ns].pop(key, None)
+                self._expiry[ns].pop(key, None)
+            return expired
+
+    def append(self, ns: str, value, max_items: Optional[int] = None):
+        with self._lock:
+            events = self._lists.get(ns)
+            if events is None or events.maxlen != max_items:
+                events = self._lists[ns] = deque(events or (), maxlen=max_items)
+            events.append(value)
+
+    def tail(self, ns: str, limit: Optional[int] = None) -> List:
+        with self._lock:
+            events = list(self._lists.get(ns, ()))
+        return events if limit is None else events[-limit:] if limit > 0 else []
+
+    def length(self, ns: str) -> int:
+        with self._lock:
+            return len(self._lists.get(ns, ()))
+
+
+class SQLiteBackend:
+    """State shared by all worker processes through one WAL-mode database"""
+
+    shared = True
+
+    def __init__(self, path: str = STATE_DB_PATH, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS kv ("
+                         "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL, "
+                         "PRIMARY KEY (ns, key)) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_expires ON kv (ns, expires)")
+            conn.execute("CREATE TABLE IF NOT EXISTS events ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, ns TEXT NOT NULL, value TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS events_ns ON events (ns, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, ns: str, key: str, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires IS NULL OR expires > ?)",
+            (ns, key, time.time())).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, ns: str, key: str, value, expires_at: Optional[float] = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+            (ns, key, json.dumps(value, separators=(',', ':')), expires_at))
+
+    def delete(self, ns: str, key: str) -> bool:
+        cursor = self._conn().execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+        return cursor.rowcount > 0
+
+    def incr(self, ns: str, key: str, amount: int = 1, expires_at: Optional[float] = None) -> int:
+        # Single statement: atomic across processes; an expired counter restarts
+        row = self._conn().execute(
+            "INSERT INTO kv (ns, key, value, expires) VALUES (:ns, :key, :amount, :expires) "
+            "ON CONFLICT (ns, key) DO UPDATE SET "
+            "value = CASE WHEN kv.expires <= :now THEN :amount "
+            "ELSE CAST(kv.value AS INTEGER) + :amount END, "
+            "expires = CASE WHEN kv.expires <= :now THEN :expires "
+            "ELSE COALESCE(:expires, kv.expires) END "
+            "RETURNING value",
+            {"ns": ns, "key": key, "amount": amount, "expires": expires_at, "now": time.time()}).fetchone()
+        return int(row[0])
+
+    def items(self, ns: str, prefix: str = "") -> Dict[str, Any]:
+        rows = self._conn().execute(
+            "SELECT key, value FROM kv WHERE ns = ? AND key >= ? AND key < ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (ns, prefix, prefix + "\U0010ffff", time.time())).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def count(self, ns: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM kv WHERE ns = ? AND (expires IS NULL OR expires > ?)",
+            (ns, time.time())).fetchone()[0]
+
+    def purge_expired(self, ns: str, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        rows = self._conn().execute(
+            "DELETE FROM kv WHERE ns = ? AND expires IS NOT NULL AND expires <= ? RETURNING key",
+            (ns, now)).fetchall()
+        return [row[0] for row in rows]
+
+    def append(self, ns: str, value, max_items: Optional[int] = None):
+        conn = self._conn()
+        cursor = conn.execute("INSERT INTO events (ns, value) VALUES (?, ?)",
+                              (ns, json.dumps(value, separators=(',', ':'))))
+        # Trim occasionally rather than on every insert
+        if max_items and cursor.lastrowid % 256 == 0:
+            conn.execute("DELETE FROM events WHERE ns = ? AND id <= ("
+                         "SELECT id FROM events WHERE ns = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                         (ns, ns, max_items))
+
+    def tail(self, ns: str, limit: Optional[int] = None) -> List:
+        rows = self._conn().execute(
+            "SELECT value FROM events WHERE ns = ? ORDER BY id DESC LIMIT ?",
+            (ns, -1 if limit is None else limit)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def length(self, ns: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM events WHERE ns = ?", (ns,)).fetchone()[0]
+
+
+class CachedBackend:
+    """Short-TTL read cache in front of a shared backend
+
+    Reads may lag writes made by other workers by up to `ttl` seconds; this
+    worker's own writes invalidate its cached entries immediately.
+    """
+
+    MAX_ENTRIES = 65536
+
+    def __init__(self, backend, ttl: float = 0.5):
+        self.backend = backend
+        self.ttl = ttl
+        self.shared = backend.shared
+        self._gets: Dict[str, Dict[str, tuple]] = {}        # ns -> key -> (expires, value)
+        self._aggregates: Dict[str, Dict[tuple, tuple]] = {} # ns -> (op, arg) -> (expires, value)
+        self._entries = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, table: Dict, ns: str, cache_key, load):
+        now = time.monotonic()
+        entry = table.get(ns, {}).get(cache_key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = load()
+        with self._lock:
+            if self._entries >= self.MAX_ENTRIES:
+                self._gets.clear()
+                self._aggregates.clear()
+                self._entries = 0
+            table.setdefault(ns, {})[cache_key] = (now + self.ttl, value)
+            self._entries += 1
+        return value
+
+    def _invalidate(self, ns: str, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._gets.pop(ns, None)
+            else:
+                self._gets.get(ns, {}).pop(key, None)
+            self._aggregates.pop(ns, None)
+
+    def get(self, ns: str, key: str, default=None):
+        value = self._cached(self._gets, ns, key, lambda: self.backend.get(ns, key))
+        return default if value is None else value
+
+    def items(self, ns: str, prefix: str = "") -> Dict[str, Any]:
+        return dict(self._cached(self._aggregates, ns, ("items", prefix),
+                                 lambda: self.backend.items(ns, prefix)))
+
+    def count(self, ns: str) -> int:
+        return self._cached(self._aggregates, ns, ("count", None), lambda: self.backend.count(ns))
+
+    def tail(self, ns: str, limit: Optional[int] = None) -> List:
+        return list(self._cached(self._aggregates, ns, ("tail", limit),
+                                 lambda: self.backend.tail(ns, limit)))
+
+    def length(self, ns: str) -> int:
+        return self._cached(self._aggregates, ns, ("length", None), lambda: self.backend.length(ns))
+
+    def set(self, ns: str, key: str, value, expires_at: Optional[float] = None):
+        self.backend.set(ns, key, value, expires_at)
+        self._invalidate(ns, key)
+
+    def delete(self, ns: str, key: str) -> bool:
+        deleted = self.backend.delete(ns, key)
+        self._invalidate(ns, key)
+        return deleted
+
+    def incr(self, ns: str, key: str, amount: int = 1, expires_at: Optional[float] = None) -> int:
+        value = self.backend.incr(ns, key, amount, expires_at)
+        self._invalidate(ns, key)
+        return value
+
+    def purge_expired(self, ns: str, now: Optional[float] = None) -> List[str]:
+        expired = self.backend.purge_expired(ns, now)
+        if expired:
+            self._invalidate(ns)
+        return expired
+
+    def append(self, ns: str, value, max_items: Optional[int] = None):
+        self.backend.append(ns, value, max_items)
+        self._invalidate(ns)
+
+
+_default_backend = None
+_default_lock = threading.Lock()
+
+
+def create_backend(kind: Optional[str] = None, path: Optional[str] = None,
+                   cache_ttl: Optional[float] = None):
+    """Build a backend from arguments or the STATE_* environment variables"""
+    kind = kind or os.environ.get('STATE_BACKEND', 'memory')
+    if kind == 'memory':
+        return MemoryBackend()
+    if kind == 'sqlite':
+        backend = SQLiteBackend(path or os.environ.get('STATE_DB_PATH', STATE_DB_PATH))
+        ttl = float(os.environ.get('STATE_CACHE_TTL', '0.5')) if cache_ttl is None else cache_ttl
+        return CachedBackend(backend, ttl) if ttl > 0 else backend
+    raise ValueError(f"Unknown state backend: {kind}")
+
+
+def get_default_backend():
+    """Backend shared by the global auth and security managers"""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = create_backend()
+        return _default_backend
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+API State Backend Scaling Benchmark
+Runs 1..N worker processes that each execute a request-shaped loop against
+AuthManager/SecurityManager (token validation + IP block check on every
+request, a tracked file operation on every 10th, a login on every 100th) and
+reports aggregate requests/s per backend and worker count.
+
+- memory: every worker has private state (the original design; tokens are
+          only valid in the worker that issued them)
+- sqlite: all workers share one WAL-mode database, with and without the
+          per-worker read cache (STATE_CACHE_TTL)
+
+Usage:
+  python3 benchmarks/bench_api_state.py [--workers 1,2,4,8] [--duration 3]
+                                        [--cache-ttl 0.5] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from common import PROJECT_ROOT
+
+# Keep the module-level managers created on import away from the repo's auth/ files
+_SCRATCH = tempfile.mkdtemp(prefix='bench_api_state_')
+os.environ['STATE_BACKEND'] = 'sqlite'
+os.environ['STATE_DB_PATH'] = os.path.join(_SCRATCH, 'import.db')
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'api_layer'))
+
+from auth import AuthManager  # noqa: E402
+from security import SecurityManager  # noqa: E402
+from state_backend import create_backend  # noqa: E402
+
+USERNAME, PASSWORD = 'bench', 'bench-password'
+
+
+def make_managers(kind, workdir, cache_ttl):
+    state = create_backend(kind, os.path.join(workdir, 'state.db'), cache_ttl)
+    auth = AuthManager(users_path=os.path.join(workdir, 'users.db'),
+                       sessions_path=os.path.join(workdir, f'sessions-{os.getpid()}.json'),
+                       sweep_interval=0, state=state)
+    return auth, SecurityManager(state=state, log_dir=os.path.join(workdir, f'events-{os.getpid()}'))
+
+
+def worker(kind, workdir, cache_ttl, token, duration, results):
+    auth, security = make_managers(kind, workdir, cache_ttl)
+    if token is None:
+        _, _, token = auth.authenticate(USERNAME, PASSWORD, '127.0.0.1')
+
+    requests = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        valid, session = auth.validate_token(token)
+        if not valid:
+            raise RuntimeError('token rejected')
+        security.is_ip_blocked('127.0.0.1')
+        if requests % 10 == 0:
+            name = f"{os.getpid()}-{requests % 50}.txt"
+            security.check_concurrent_access(name, session.username, 'WRITE')
+            security.track_file_operation(name, session.username, 'WRITE')
+            security.release_file_operation(name, session.username, 'WRITE')
+        if requests % 100 == 0:
+            auth.authenticate(USERNAME, PASSWORD, '127.0.0.1')
+        requests += 1
+    results.put(requests)
+
+
+def bench(kind, workers, duration, cache_ttl):
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, 'users.db'), 'w') as f:
+            f.write(f"{USERNAME}:{AuthManager.hash_password(PASSWORD)}:user\n")
+
+        token = None
+        if kind != 'memory':
+            auth, _ = make_managers(kind, workdir, cache_ttl)
+            _, _, token = auth.authenticate(USERNAME, PASSWORD, '127.0.0.1')
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(kind, workdir, cache_ttl, token, duration, results))
+                 for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        total = sum(results.get() for _ in procs)
+        for proc in procs:
+            proc.join()
+
+    return {'backend': kind if kind == 'memory' else f"{kind} (cache {cache_ttl}s)",
+            'workers': workers, 'requests': total, 'requests_per_sec': round(total / duration)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--cache-ttl', type=float, default=0.5)
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    configs = [('memory', 0), ('sqlite', 0), ('sqlite', args.cache_ttl)]
+    results = [bench(kind, int(n), args.duration, ttl)
+               for kind, ttl in configs for n in args.workers.split(',')]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.duration}s per run, {os.cpu_count()} CPUs")
+    print(f"{'backend':<22}{'workers':>8}{'req/s':>12}{'per worker':>12}")
+    for r in results:
+        print(f"{r['backend']:<22}{r['workers']:>8}{r['requests_per_sec']:>12}"
+              f"{r['requests_per_sec'] // r['workers']:>12}")
+
+
+if __name__ == '__main__':
+    main()
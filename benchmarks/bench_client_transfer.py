@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Client Transfer Benchmark
+Uploads and downloads one file of each size through FileClient and through
+the client's previous transfer loops (4 KB sendall/recv chunks, a progress
+line after every chunk, a fixed 0.1 s sleep before the upload response) and
+reports MB/s for both. Progress output goes to /dev/null, so the numbers
+include formatting cost but not terminal speed.
+
+Usage:
+  python3 benchmarks/bench_client_transfer.py [--sizes-mb 1,16,64] [--repeat 3]
+                                              [--binary build/file_server] [--json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from common import AUTH_TOKEN, DEFAULT_BINARY, PROJECT_ROOT, ServerProcess
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'client'))
+
+from client import FileClient  # noqa: E402
+
+LEGACY_CHUNK = 4096
+
+
+def legacy_upload(port, path):
+    """The upload loop FileClient used before the transfer engine"""
+    filesize = os.path.getsize(path)
+    with FileClient(port=port).connect() as sock:
+        sock.sendall(f"AUTH {AUTH_TOKEN}\nUPLOAD {os.path.basename(path)} {filesize}\n".encode())
+        sock.recv(LEGACY_CHUNK)
+        with open(path, 'rb') as f:
+            total_sent = 0
+            while total_sent < filesize:
+                chunk = f.read(LEGACY_CHUNK)
+                if not chunk:
+                    break
+                sock.sendall(chunk)
+                total_sent += len(chunk)
+                print(f"\r[UPLOAD] Progress: {total_sent / filesize * 100:.1f}% ({total_sent}/{filesize} bytes)", end='')
+        print()
+        time.sleep(0.1)
+        return "SUCCESS" in sock.recv(LEGACY_CHUNK).decode()
+
+
+def legacy_download(port, name, save_path):
+    """The download loop FileClient used before the transfer engine"""
+    with FileClient(port=port).connect() as sock:
+        sock.sendall(f"AUTH {AUTH_TOKEN}\nDOWNLOAD {name}\n".encode())
+        header = b""
+        while not header.endswith(b"\n"):   # Header byte by byte so no file data is lost
+            header += sock.recv(1)
+        filesize = int(header.split()[1])
+        with open(save_path, 'wb') as f:
+            total_received = 0
+            while total_received < filesize:
+                chunk = sock.recv(min(LEGACY_CHUNK, filesize - total_received))
+                if not chunk:
+                    break
+                f.write(chunk)
+                total_received += len(chunk)
+                print(f"\r[DOWNLOAD] Progress: {total_received / filesize * 100:.1f}% "
+                      f"({total_received}/{filesize} bytes)", end='')
+        print()
+        return total_received == filesize
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            ok = fn()
+        if not ok:
+            raise RuntimeError(f"{fn} failed")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-mb', default='1,16,64')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (best is reported)')
+    parser.add_argument('--binary', default=DEFAULT_BINARY)
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    results = []
+    with ServerProcess(args.binary) as server, tempfile.TemporaryDirectory() as workdir:
+        client = FileClient(port=server.port)
+        client.cache = None     # Measure transfers, not the content cache
+        for size_mb in (int(s) for s in args.sizes_mb.split(',')):
+            name = f"bench_{size_mb}mb.bin"
+            path = os.path.join(workdir, name)
+            with open(path, 'wb') as f:
+                f.write(os.urandom(size_mb * 1024 * 1024))
+            save_path = os.path.join(workdir, 'download.bin')
+
+            runs = {
+                'legacy upload': lambda: legacy_upload(server.port, path),
+                'engine upload': lambda: client.upload_file(path),
+                'legacy download': lambda: legacy_download(server.port, name, save_path),
+                'engine download': lambda: client.download_file(name, save_path),
+            }
+            for label, fn in runs.items():
+                seconds = timed(fn, args.repeat)
+                results.append({'size_mb': size_mb, 'transfer': label, 'seconds': round(seconds, 4),
+                                'mb_per_sec': round(size_mb / seconds, 1)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"best of {args.repeat} runs")
+    print(f"{'size':>8}  {'transfer':<18}{'seconds':>10}{'MB/s':>10}")
+    for r in results:
+        print(f"{r['size_mb']:>6}MB  {r['transfer']:<18}{r['seconds']:>10}{r['mb_per_sec']:>10}")
+
+
+if __name__ == '__main__':
+    main()
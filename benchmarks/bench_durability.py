@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Durability Policy Benchmark
+Uploads many small files with N concurrent clients against a fresh server
+for each FILE_SERVER_DURABILITY mode and reports throughput and tail latency.
+
+Usage:
+  python3 benchmarks/bench_durability.py [--files 400] [--size 4096] [--clients 16]
+                                         [--group-ms 5] [--json]
+"""
+
+import argparse
+import json
+import os
+
+from common import DEFAULT_BINARY, ServerProcess, command, parse_stats, run_timed, summarize, upload
+
+MODES = ['none', 'per-file', 'group-commit']
+
+
+def bench_mode(binary, mode, files, size, clients, group_ms):
+    env = {'FILE_SERVER_DURABILITY': mode, 'FILE_SERVER_GROUP_COMMIT_MS': group_ms,
+           'FILE_SERVER_COLD_AFTER': 0}
+    payload = os.urandom(size)
+
+    with ServerProcess(binary, env=env) as server:
+        def make_job(i):
+            def job():
+                status = upload(server.port, f"bench/file_{i}.bin", payload)
+                if not status.startswith("SUCCESS"):
+                    raise RuntimeError(status)
+            return job
+
+        latencies, errors, elapsed = run_timed([make_job(i) for i in range(files)], clients)
+        stats = parse_stats(command(server.port, "STATS"))
+
+    result = summarize(latencies, elapsed)
+    result.update({
+        'mode': mode,
+        'errors': len(errors),
+        'fsync_calls': int(stats.get('fsync_calls', 0)),
+        'group_commits': int(stats.get('group_commits', 0)),
+        'avg_batch': float(stats.get('group_commit_avg_batch', 0)),
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--binary', default=DEFAULT_BINARY)
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--size', type=int, default=4096)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--group-ms', type=int, default=5)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    results = [bench_mode(args.binary, mode, args.files, args.size, args.clients, args.group_ms)
+               for mode in args.modes.split(',')]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.files} uploads x {args.size} bytes, {args.clients} concurrent clients")
+    print(f"{'mode':<14}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fsyncs':>10}{'batch':>8}{'errors':>8}")
+    for r in results:
+        print(f"{r['mode']:<14}{r['ops_per_sec']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['fsync_calls']:>10}{r['avg_batch']:>8.1f}{r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Large-File I/O Benchmark (mixed small/large workload)
+While a few clients repeatedly upload and download large files, other clients
+download small hot files. Each configuration runs on a fresh server and the
+script reports large-transfer MB/s next to small-file latency, which shows
+both raw streaming speed and how much the large transfers disturb everyone else.
+
+Configurations vary FILE_SERVER_IO_BUFFER_KB and the large-file mode
+(FILE_SERVER_LARGE_FILE_MB=0 disables preallocation and cache hints).
+
+Usage:
+  python3 benchmarks/bench_large_io.py [--large-mb 64] [--large-clients 2]
+                                       [--small-files 50] [--small-clients 8]
+                                       [--duration 10] [--json]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from common import DEFAULT_BINARY, ServerProcess, command, download, parse_stats, summarize, upload
+
+CONFIGS = [
+    ('4KB buffer, hints off', {'FILE_SERVER_IO_BUFFER_KB': 4, 'FILE_SERVER_LARGE_FILE_MB': 0}),
+    ('64KB buffer, hints off', {'FILE_SERVER_IO_BUFFER_KB': 64, 'FILE_SERVER_LARGE_FILE_MB': 0}),
+    ('64KB buffer, large mode', {'FILE_SERVER_IO_BUFFER_KB': 64, 'FILE_SERVER_LARGE_FILE_MB': 8}),
+    ('1MB buffer, large mode', {'FILE_SERVER_IO_BUFFER_KB': 1024, 'FILE_SERVER_LARGE_FILE_MB': 8}),
+]
+
+
+def bench_config(binary, env, args):
+    env = dict(env, FILE_SERVER_COLD_AFTER=0)
+    large_payload = os.urandom(args.large_mb * 1024 * 1024)
+    small_payload = os.urandom(args.small_size)
+
+    with ServerProcess(binary, env=env) as server:
+        for i in range(args.small_files):
+            upload(server.port, f"hot/small_{i}.bin", small_payload)
+        for i in range(args.large_clients):
+            upload(server.port, f"bulk/large_{i}.bin", large_payload)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        large_bytes = [0]
+        small_latencies = []
+        errors = []
+
+        def large_worker(i):
+            name = f"bulk/large_{i}.bin"
+            toggle = 0
+            while not stop.is_set():
+                try:
+                    if toggle % 2 == 0:
+                        download(server.port, name, bufsize=1024 * 1024)
+                    else:
+                        status = upload(server.port, name, large_payload)
+                        if not status.startswith("SUCCESS"):
+                            raise RuntimeError(status)
+                    with lock:
+                        large_bytes[0] += len(large_payload)
+                except Exception as e:
+                    errors.append(str(e))
+                toggle += 1
+
+        def small_worker(i):
+            n = i
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    download(server.port, f"hot/small_{n % args.small_files}.bin")
+                    with lock:
+                        small_latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    errors.append(str(e))
+                n += 1
+
+        threads = [threading.Thread(target=large_worker, args=(i,)) for i in range(args.large_clients)]
+        threads += [threading.Thread(target=small_worker, args=(i,)) for i in range(args.small_clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stats = parse_stats(command(server.port, "STATS"))
+
+    small = summarize(small_latencies, elapsed)
+    return {
+        'large_mb_per_sec': round(large_bytes[0] / elapsed / (1024 * 1024), 1),
+        'small_ops_per_sec': small['ops_per_sec'],
+        'small_p50_ms': small['p50_ms'],
+        'small_p99_ms': small['p99_ms'],
+        'large_uploads': int(stats.get('large_uploads', 0)),
+        'large_downloads': int(stats.get('large_downloads', 0)),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--binary', default=DEFAULT_BINARY)
+    parser.add_argument('--large-mb', type=int, default=64)
+    parser.add_argument('--large-clients', type=int, default=2)
+    parser.add_argument('--small-files', type=int, default=50)
+    parser.add_argument('--small-size', type=int, default=8192)
+    parser.add_argument('--small-clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    results = []
+    for label, env in CONFIGS:
+        result = bench_config(args.binary, env, args)
+        result['config'] = label
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.large_clients} x {args.large_mb} MB streams + {args.small_clients} small-file readers, "
+          f"{args.duration:.0f}s per config")
+    print(f"{'config':<26}{'large MB/s':>12}{'small ops/s':>13}{'small p50':>11}{'small p99':>11}{'errors':>8}")
+    for r in results:
+        print(f"{r['config']:<26}{r['large_mb_per_sec']:>12}{r['small_ops_per_sec']:>13}"
+              f"{r['small_p50_ms']:>11}{r['small_p99_ms']:>11}{r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Load Generator
+Drives a weighted mix of UPLOAD / DOWNLOAD / LIST / DELETE / LOCKS from N
+concurrent clients against the C server (directly, over the wire protocol)
+or the Flask API, and reports throughput, latency percentiles, lock-conflict
+rates and an error breakdown as JSON.
+
+- target c:   uses aioclient; starts an isolated server from --binary unless
+              --port is given
+- target api: HTTP via urllib on a thread pool of --clients threads; logs in
+              with --username/--password unless --token is given
+- --rate R:   open loop, operation i is due at start + i/R and latency is
+              measured from that due time (queueing delay included);
+              0 (default) = closed loop, each client issues back to back
+- sizes:      weighted upload sizes, e.g. "1k:60,64k:30,1m:10"
+- files:      operations pick names from a pool of --files names, so a
+              smaller pool means more lock conflicts
+
+Usage:
+  python3 benchmarks/bench_load.py [--target c|api] [--clients 32] [--duration 10]
+                                   [--mix upload=30,download=50,list=10,delete=5,locks=5]
+                                   [--sizes 4k:70,64k:25,1m:5] [--files 200] [--rate 0]
+                                   [--binary build/file_server | --port 8888]
+                                   [--url http://127.0.0.1:5000] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from common import DEFAULT_BINARY, PROJECT_ROOT, ServerProcess, summarize
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'client'))
+
+from aioclient import AsyncFileClient, FileLockedError, ServerError  # noqa: E402
+from aioclient.protocol import LOCKED_MARKERS  # noqa: E402
+
+OPERATIONS = ('upload', 'download', 'list', 'delete', 'locks')
+DEFAULT_MIX = 'upload=30,download=50,list=10,delete=5,locks=5'
+DEFAULT_SIZES = '4k:70,64k:25,1m:5'
+UNITS = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 * 1024}
+
+
+class LockConflict(Exception):
+    """Operation refused because another client holds the file's lock"""
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    unit = text[-1] if text[-1] in UNITS else ''
+    return int(float(text[:len(text) - len(unit)]) * UNITS[unit])
+
+
+def parse_weights(spec, convert=str):
+    """"a=1,b=2" or "a:1,b:2" -> ([a, b], [1, 2])"""
+    keys, weights = [], []
+    for part in spec.split(','):
+        key, _, weight = part.replace(':', '=').partition('=')
+        keys.append(convert(key.strip()))
+        weights.append(float(weight or 1))
+    return keys, weights
+
+
+class CTarget:
+    """Operations against the C server through AsyncFileClient"""
+
+    def __init__(self, host, port, clients, timeout):
+        self.client = AsyncFileClient(host, port, timeout=timeout, max_connections=clients)
+
+    async def run(self, op, name, data):
+        try:
+            if op == 'upload':
+                await self.client.upload(name, data)
+                return len(data)
+            if op == 'download':
+                return len(await self.client.download(name))
+            if op == 'list':
+                await self.client.list()
+            elif op == 'delete':
+                await self.client.delete(name)
+            elif op == 'locks':
+                await self.client.locks()
+            return 0
+        except FileLockedError as e:
+            raise LockConflict(e.message)
+
+    def close(self):
+        pass
+
+
+class ApiTarget:
+    """Operations against the Flask API (blocking urllib on a thread pool)"""
+
+    def __init__(self, url, token, clients, timeout):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=clients)
+
+    @classmethod
+    def login(cls, url, username, password):
+        body = json.dumps({'username': username, 'password': password}).encode()
+        request = urllib.request.Request(url.rstrip('/') + '/api/login', data=body,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.load(response)['token']
+
+    def _request(self, method, path, body=None, content_type=None):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if content_type:
+            headers['Content-Type'] = content_type
+        request = urllib.request.Request(self.url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error') or f"HTTP {e.code}"
+            except ValueError:
+                message = f"HTTP {e.code}"
+            message = str(message).strip()
+            if any(marker in message.lower() for marker in LOCKED_MARKERS):
+                raise LockConflict(message)
+            raise RuntimeError(message)
+
+    def _call(self, op, name, data):
+        if op == 'upload':
+            boundary = uuid.uuid4().hex
+            body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                    f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+            self._request('POST', '/api/upload', body, f'multipart/form-data; boundary={boundary}')
+            return len(data)
+        if op == 'download':
+            return len(self._request('GET', f'/api/download/{name}'))
+        if op == 'list':
+            self._request('GET', '/api/list')
+        elif op == 'delete':
+            self._request('DELETE', f'/api/delete/{name}')
+        elif op == 'locks':
+            self._request('GET', '/api/locks')
+        return 0
+
+    async def run(self, op, name, data):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, self._call, op, name, data)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+
+class Recorder:
+    """Per-operation latencies, bytes, lock conflicts and error messages"""
+
+    def __init__(self):
+        self.latencies = {op: [] for op in OPERATIONS}
+        self.bytes = Counter()
+        self.conflicts = Counter()
+        self.errors = {op: Counter() for op in OPERATIONS}
+
+    def record(self, op, started, outcome, nbytes=0):
+        elapsed = time.perf_counter() - started
+        if outcome is None:
+            self.latencies[op].append(elapsed)
+            self.bytes[op] += nbytes
+        elif isinstance(outcome, LockConflict):
+            self.conflicts[op] += 1
+        else:
+            self.errors[op][classify(outcome)] += 1
+
+    def report(self, elapsed):
+        by_op = {}
+        for op in OPERATIONS:
+            attempts = len(self.latencies[op]) + self.conflicts[op] + sum(self.errors[op].values())
+            if not attempts:
+                continue
+            stats = summarize(self.latencies[op], elapsed)
+            stats.update({
+                'attempts': attempts,
+                'lock_conflicts': self.conflicts[op],
+                'lock_conflict_rate': round(self.conflicts[op] / attempts, 4),
+                'errors': sum(self.errors[op].values()),
+                'error_rate': round(sum(self.errors[op].values()) / attempts, 4),
+                'mb_per_sec': round(self.bytes[op] / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0.0,
+            })
+            by_op[op] = stats
+        everything = [value for values in self.latencies.values() for value in values]
+        total = summarize(everything, elapsed)
+        attempts = sum(stats['attempts'] for stats in by_op.values())
+        conflicts = sum(self.conflicts.values())
+        total.update({
+            'attempts': attempts,
+            'lock_conflicts': conflicts,
+            'lock_conflict_rate': round(conflicts / attempts, 4) if attempts else 0.0,
+            'errors': sum(stats['errors'] for stats in by_op.values()),
+            'mb_per_sec': round(sum(self.bytes.values()) / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0.0,
+        })
+        errors = Counter()
+        for op, counts in self.errors.items():
+            for message, count in counts.items():
+                errors[f"{op}: {message}"] += count
+        return {'total': total, 'by_operation': by_op, 'errors': dict(errors.most_common())}
+
+
+def classify(error):
+    """Stable error key: exception type plus the server's message"""
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(error, ServerError):
+        return error.message or error.status
+    if isinstance(error, (ConnectionError, OSError)):
+        return f"{type(error).__name__}: {error}"
+    return str(error) or type(error).__name__
+
+
+async def run_load(target, args, recorder):
+    ops, op_weights = parse_weights(args.mix)
+    unknown = set(ops) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    sizes, size_weights = parse_weights(args.sizes, parse_size)
+    names = [f"{args.prefix}{i}.bin" for i in range(args.files)]
+    payload = os.urandom(max(sizes))
+    rng = random.Random(args.seed)
+
+    if args.preload:
+        for batch in range(0, len(names), args.clients):
+            await asyncio.gather(*(target.run('upload', name, payload[:sizes[0]])
+                                   for name in names[batch:batch + args.clients]), return_exceptions=True)
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    issued = 0
+
+    async def client():
+        nonlocal issued
+        while True:
+            index = issued
+            if (args.requests and index >= args.requests) or time.perf_counter() >= deadline:
+                return
+            issued += 1
+            op = rng.choices(ops, op_weights)[0]
+            name = rng.choice(names)
+            data = payload[:rng.choices(sizes, size_weights)[0]] if op == 'upload' else None
+            started = time.perf_counter()
+            if args.rate:
+                due = start + index / args.rate
+                if due > started:
+                    await asyncio.sleep(due - started)
+                started = due
+            try:
+                nbytes = await target.run(op, name, data)
+                recorder.record(op, started, None, nbytes)
+            except Exception as e:
+                recorder.record(op, started, e)
+
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('c', 'api'), default='c')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='stop after this many operations (0 = duration only)')
+    parser.add_argument('--rate', type=float, default=0.0, help='target operations/s (0 = closed loop)')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='weighted upload sizes')
+    parser.add_argument('--files', type=int, default=200, help='size of the file name pool')
+    parser.add_argument('--prefix', default='load_', help='file name prefix')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='skip uploading every pool file before the run')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-operation timeout (seconds)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--binary', default=DEFAULT_BINARY, help='server to start for --target c')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='use a running C server instead of --binary')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API base URL for --target api')
+    parser.add_argument('--token', default=None, help='API session token (skips login)')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--output', default=None, help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    server = None
+    if args.target == 'c':
+        if args.port is None:
+            server = ServerProcess(args.binary).__enter__()
+            port = server.port
+        else:
+            port = args.port
+        target = CTarget(args.host, port, args.clients, args.timeout)
+    else:
+        token = args.token or ApiTarget.login(args.url, args.username, args.password)
+        target = ApiTarget(args.url, token, args.clients, args.timeout)
+
+    recorder = Recorder()
+    try:
+        elapsed = asyncio.run(run_load(target, args, recorder))
+    finally:
+        target.close()
+        if server:
+            server.__exit__(None, None, None)
+
+    report = {
+        'config': {key: getattr(args, key) for key in
+                   ('target', 'clients', 'duration', 'requests', 'rate', 'mix', 'sizes', 'files', 'seed')},
+        'elapsed_sec': round(elapsed, 3),
+    }
+    report.update(recorder.report(elapsed))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Shared helpers for the C server benchmarks
+Starts an isolated file_server (own temp directory and port), optionally the
+Flask API in front of it, and provides minimal blocking protocol helpers plus
+latency statistics.
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_BINARY = os.path.join(PROJECT_ROOT, "build", "file_server")
+AUTH_TOKEN = os.environ.get('FILE_SERVER_AUTH', 'os-core-token')
+
+
+def free_port():
+    """Ask the kernel for an unused TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """Run file_server in a throw-away working directory on a free port"""
+
+    def __init__(self, binary=DEFAULT_BINARY, env=None, workdir=None):
+        self.binary = os.path.abspath(binary)
+        self.extra_env = env or {}
+        self.workdir = workdir
+        self.owns_workdir = workdir is None
+        self.port = None
+        self.process = None
+
+    def __enter__(self):
+        if not os.path.exists(self.binary):
+            raise FileNotFoundError(f"{self.binary} not found - run 'make build' first")
+        if self.owns_workdir:
+            self.workdir = tempfile.mkdtemp(prefix="fs_bench_")
+        self.port = free_port()
+        env = dict(os.environ)
+        env.update({k: str(v) for k, v in self.extra_env.items()})
+        env['FILE_SERVER_PORT'] = str(self.port)
+        self.process = subprocess.Popen([self.binary], cwd=self.workdir, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.05)
+        self.__exit__(None, None, None)
+        raise RuntimeError("file_server did not start")
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        if self.owns_workdir and self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class ApiProcess:
+    """Run api_layer/app.py against a ServerProcess, sharing its working directory
+
+    The API reads ../logs, ../storage and ../metadata relative to its working
+    directory, so it runs in <workdir>/api_layer. Auth state (users.db,
+    sessions, security state) lives in <workdir>/auth via AUTH_STATE_DIR.
+    """
+
+    def __init__(self, server, env=None):
+        self.server = server
+        self.extra_env = env or {}
+        self.port = None
+        self.process = None
+
+    def __enter__(self):
+        cwd = os.path.join(self.server.workdir, 'api_layer')
+        os.makedirs(cwd, exist_ok=True)
+        os.makedirs(os.path.join(self.server.workdir, 'auth'), exist_ok=True)
+        self.port = free_port()
+        env = dict(os.environ)
+        env.update({
+            'FILE_SERVER_PORT': str(self.server.port),
+            'API_PORT': str(self.port),
+            'API_DEBUG': '0',
+            'AUTH_STATE_DIR': os.path.join(self.server.workdir, 'auth'),
+            'SECURITY_EVENT_LOG_DIR': '',
+        })
+        env.update({k: str(v) for k, v in self.extra_env.items()})
+        self.process = subprocess.Popen([sys.executable, os.path.join(PROJECT_ROOT, 'api_layer', 'app.py')],
+                                        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError("api_layer/app.py did not start")
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+
+def _open(port, command):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=30)
+    sock.sendall(f"AUTH {AUTH_TOKEN}\n{command}\n".encode())
+    return sock
+
+
+def _read_line(sock):
+    line = b""
+    while not line.endswith(b"\n"):
+        chunk = sock.recv(1)
+        if not chunk:
+            break
+        line += chunk
+    return line.decode().strip()
+
+
+def upload(port, name, data):
+    """UPLOAD name; returns the final server status line"""
+    with _open(port, f"UPLOAD {name} {len(data)}") as sock:
+        ready = _read_line(sock)
+        if not ready.startswith("READY"):
+            return ready
+        sock.sendall(data)
+        return _read_line(sock)
+
+
+def download(port, name, bufsize=65536):
+    """DOWNLOAD name; returns the received byte count (or raises on error)"""
+    with _open(port, f"DOWNLOAD {name}") as sock:
+        header = _read_line(sock)
+        if not header.startswith("SUCCESS"):
+            raise RuntimeError(header)
+        remaining = int(header.split()[1])
+        buf = bytearray(bufsize)
+        view = memoryview(buf)
+        while remaining > 0:
+            n = sock.recv_into(view, min(bufsize, remaining))
+            if n == 0:
+                break
+            remaining -= n
+        return int(header.split()[1]) - remaining
+
+
+def command(port, text):
+    """Send a single-response command (LIST, STATS, ...) and return the text"""
+    with _open(port, text) as sock:
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks).decode(errors='replace')
+
+
+def parse_stats(text):
+    """Parse STATS output into {counter: value}"""
+    stats = {}
+    for line in text.splitlines():
+        if ':' in line and line.startswith('  '):
+            key, val = line.strip().split(':', 1)
+            stats[key] = val.strip()
+    return stats
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (milliseconds)"""
+    values = sorted(latencies)
+    return {
+        'ops': len(values),
+        'ops_per_sec': round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def run_timed(jobs, concurrency):
+    """Run callables on a thread pool; returns (latencies, errors, elapsed)"""
+    latencies, errors = [], []
+
+    def timed(job):
+        start = time.perf_counter()
+        try:
+            job()
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, jobs))
+    return latencies, errors, time.perf_counter() - start
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+API Hot-Path Microbenchmarks
+Times the per-request Python work of the API layer on synthetic inputs at
+realistic scale and compares it against a stored JSON baseline.
+
+  validate_token          AuthManager.validate_token over 10k live sessions
+                          (what require_auth does for every request)
+  validate_token_signed   the same with AUTH_TOKEN_MODE=signed tokens
+  parse_audit_log_line    1M audit.log lines       (/api/logs)
+  parse_security_log_line 1M security.log lines    (/api/security)
+  parse_event_line        1M events.log lines      (/api/events)
+  parse_list_response     a 50k-file LIST reply    (/api/list, /api/status)
+  format_bytes            50k sizes                (/api/list rows)
+  check_path_traversal    100k file names, 10% hostile
+  metrics_request         100k requests recorded in api_layer/metrics.py
+                          (route gauge/counter/histogram + one C server call)
+
+Each benchmark runs one warm-up pass, then --repeat timed passes with the
+garbage collector disabled (like timeit); the best pass is the headline
+number (ns per item), the median and spread show how noisy the run was.
+One extra pass under tracemalloc records peak allocated bytes.
+
+Usage:
+  python3 benchmarks/microbench.py [--scale 1.0] [--repeat 5] [--only parse_]
+  python3 benchmarks/microbench.py --save [benchmarks/baselines/microbench.json]
+  python3 benchmarks/microbench.py --compare [benchmarks/baselines/microbench.json]
+                                   [--threshold 0.15]   # exit 1 on regression
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import PROJECT_ROOT
+
+# Keep the module-level managers created on import away from the repo's auth/ files
+_SCRATCH = tempfile.mkdtemp(prefix='microbench_')
+os.environ['STATE_BACKEND'] = 'sqlite'
+os.environ['STATE_DB_PATH'] = os.path.join(_SCRATCH, 'import.db')
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'api_layer'))
+
+from auth import AuthManager  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from parsers import (format_bytes, parse_audit_log_line, parse_event_line,  # noqa: E402
+                     parse_list_response, parse_security_log_line)
+from security import SecurityManager  # noqa: E402
+from session_store import Session  # noqa: E402
+from state_backend import MemoryBackend  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, 'benchmarks', 'baselines', 'microbench.json')
+DEFAULT_THRESHOLD = 0.15
+
+OPERATIONS = ['UPLOAD', 'DOWNLOAD', 'DELETE', 'LOCK_ACQUIRED', 'LOCK_DENIED', 'LIST']
+EVENTS = ['AUTH_FAIL', 'ACCESS_VIOLATION', 'BLOCKED_CLIENT', 'PATH_TRAVERSAL']
+
+
+def timestamps(rng, count):
+    base = 1_767_225_600
+    return [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base + i + rng.randrange(3))) for i in range(count)]
+
+
+def names(rng, count):
+    return [f"user{rng.randrange(50)}/file_{i:06d}.{rng.choice(['txt', 'bin', 'pdf', 'csv'])}" for i in range(count)]
+
+
+# -- benchmark setups: scale -> (function, items) ---------------------------
+
+def bench_validate_token(scale, signed=False):
+    workdir = tempfile.mkdtemp(dir=_SCRATCH)
+    auth = AuthManager(users_path=os.path.join(workdir, 'users.db'),
+                       sessions_path=os.path.join(workdir, 'sessions.json'),
+                       sweep_interval=0, state=MemoryBackend(),
+                       token_mode='signed' if signed else 'session',
+                       token_key_path=os.path.join(workdir, 'token.key'),
+                       revoked_path=os.path.join(workdir, 'revoked_tokens'))
+    count = max(1, int(10_000 * scale))
+    tokens = []
+    for i in range(count):
+        if signed:
+            tokens.append(auth.token_signer.issue(f"user{i}", 'user'))
+        else:
+            token = secrets.token_urlsafe(32)
+            auth.sessions.add(Session(token, f"user{i}", 'user', '127.0.0.1', time.time()))
+            tokens.append(token)
+    random.Random(1).shuffle(tokens)
+    validate = auth.validate_token
+
+    def run():
+        for token in tokens:
+            if not validate(token)[0]:
+                raise RuntimeError('token rejected')
+    return run, count
+
+
+def bench_validate_token_signed(scale):
+    return bench_validate_token(scale, signed=True)
+
+
+def bench_parse_audit_log_line(scale):
+    rng = random.Random(2)
+    count = max(1, int(1_000_000 * scale))
+    lines = [f"[{ts}] OPERATION={rng.choice(OPERATIONS)} FILE={name} STATUS={rng.choice(['SUCCESS', 'FAILED'])} "
+             f"DETAILS=Transferred {rng.randrange(1 << 20)} bytes"
+             for ts, name in zip(timestamps(rng, count), names(rng, count))]
+    return (lambda: [parse_audit_log_line(line) for line in lines]), count
+
+
+def bench_parse_security_log_line(scale):
+    rng = random.Random(3)
+    count = max(1, int(1_000_000 * scale))
+    lines = [f"[{ts}] EVENT={rng.choice(EVENTS)} IP=10.0.{rng.randrange(256)}.{rng.randrange(256)} "
+             f"FILE={name} DETAILS=Wrong token"
+             for ts, name in zip(timestamps(rng, count), names(rng, count))]
+    return (lambda: [parse_security_log_line(line) for line in lines]), count
+
+
+def bench_parse_event_line(scale):
+    rng = random.Random(4)
+    count = max(1, int(1_000_000 * scale))
+    lines = [f"[{ts}] {rng.choice(['LOCK_ACQUIRED', 'LOCK_RELEASED', 'LOCK_WAIT'])} {name} "
+             f"{rng.choice(['READ', 'WRITE'])} {rng.randrange(1, 1 << 16)} user{rng.randrange(50)} "
+             f"{rng.choice(['GRANTED', 'DENIED'])}"
+             for ts, name in zip(timestamps(rng, count), names(rng, count))]
+    return (lambda: [parse_event_line(line) for line in lines]), count
+
+
+def bench_parse_list_response(scale):
+    rng = random.Random(5)
+    count = max(1, int(50_000 * scale))
+    response = "SUCCESS\nFiles:\n" + "".join(f"{name} ({rng.randrange(1 << 24)} bytes)\n"
+                                            for name in names(rng, count))
+    return (lambda: parse_list_response(response)), count
+
+
+def bench_format_bytes(scale):
+    rng = random.Random(6)
+    count = max(1, int(50_000 * scale))
+    sizes = [rng.randrange(1 << rng.randrange(1, 40)) for _ in range(count)]
+    return (lambda: [format_bytes(size) for size in sizes]), count
+
+
+def bench_check_path_traversal(scale):
+    rng = random.Random(7)
+    count = max(1, int(100_000 * scale))
+    hostile = ['../../etc/passwd', '..\\windows\\system32', '~/.ssh/id_rsa', '/etc/shadow', 'C:\\boot.ini']
+    candidates = [rng.choice(hostile) if rng.random() < 0.1 else name for name in names(rng, count)]
+    security = SecurityManager(state=MemoryBackend(), log_dir="")
+    check = security.check_path_traversal
+    return (lambda: [check(name) for name in candidates]), count
+
+
+def bench_metrics_request(scale):
+    rng = random.Random(8)
+    count = max(1, int(100_000 * scale))
+    routes = ['/api/list', '/api/locks', '/api/status', '/api/download/<filename>', '/api/upload']
+    requests = [(rng.choice(routes), rng.choice(['LIST', 'LOCKS', 'DOWNLOAD']), rng.random() * 0.05)
+                for _ in range(count)]
+    metrics = Metrics()
+
+    def run():
+        for route, command, seconds in requests:
+            metrics.request_started(route)
+            with metrics.c_server_call(command) as call:
+                call.sent = 64
+            metrics.request_finished(route, 'GET', 200, seconds)
+    return run, count
+
+
+BENCHMARKS = {
+    'validate_token': bench_validate_token,
+    'validate_token_signed': bench_validate_token_signed,
+    'parse_audit_log_line': bench_parse_audit_log_line,
+    'parse_security_log_line': bench_parse_security_log_line,
+    'parse_event_line': bench_parse_event_line,
+    'parse_list_response': bench_parse_list_response,
+    'format_bytes': bench_format_bytes,
+    'check_path_traversal': bench_check_path_traversal,
+    'metrics_request': bench_metrics_request,
+}
+
+
+# -- measurement -------------------------------------------------------------
+
+def measure(setup, scale, repeat):
+    run, items = setup(scale)
+    run()   # Warm-up: caches, first-touch journaling, lazy imports
+
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best, median = min(times), statistics.median(times)
+    return {
+        'items': items,
+        'best_ns_per_item': round(best / items * 1e9, 1),
+        'median_ns_per_item': round(median / items * 1e9, 1),
+        'spread_pct': round((max(times) - best) / best * 100, 1) if best else 0.0,
+        'best_run_ms': round(best * 1000, 2),
+        'peak_alloc_bytes': peak,
+        'peak_alloc_bytes_per_item': round(peak / items, 1),
+    }
+
+
+def compare(results, baseline, threshold):
+    """-> (rows, regressions); a regression is > threshold slower or larger"""
+    rows, regressions = [], []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            rows.append((name, None, current['best_ns_per_item'], None, 'new'))
+            continue
+        ratio = current['best_ns_per_item'] / base['best_ns_per_item'] if base['best_ns_per_item'] else 1.0
+        alloc_ratio = (current['peak_alloc_bytes_per_item'] / base['peak_alloc_bytes_per_item']
+                       if base['peak_alloc_bytes_per_item'] else 1.0)
+        status = 'ok'
+        if ratio > 1 + threshold:
+            status = 'SLOWER'
+        elif alloc_ratio > 1 + threshold:
+            status = 'MORE MEMORY'
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        if status in ('SLOWER', 'MORE MEMORY'):
+            regressions.append(name)
+        rows.append((name, base['best_ns_per_item'], current['best_ns_per_item'], ratio, status))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='input size multiplier (0.1 for a quick run)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed passes per benchmark')
+    parser.add_argument('--only', default='', help='run benchmarks whose name contains this text')
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, help='write results as the baseline')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help='compare against a baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown (or allocation growth) counted as a regression')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.only in name:
+            results[name] = measure(setup, args.scale, args.repeat)
+            if not args.json:
+                r = results[name]
+                print(f"{name:<26}{r['best_ns_per_item']:>10.1f} ns/item  (median {r['median_ns_per_item']:.1f}, "
+                      f"spread {r['spread_pct']}%, {r['items']} items, peak {r['peak_alloc_bytes'] // 1024} KB)",
+                      flush=True)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.save}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale:
+            print(f"[WARN] baseline scale {baseline.get('scale')} != {args.scale}; per-item numbers may differ",
+                  file=sys.stderr)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(f"\n{'benchmark':<26}{'baseline':>12}{'current':>12}{'ratio':>8}  status  (ns/item)")
+        for name, base, current, ratio, status in rows:
+            base_text = f"{base:.1f}" if base is not None else '-'
+            ratio_text = f"{ratio:.2f}" if ratio is not None else '-'
+            print(f"{name:<26}{base_text:>12}{current:>12.1f}{ratio_text:>8}  {status}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
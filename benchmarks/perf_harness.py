@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+End-to-End Performance Harness
+Builds file_server, starts it (and the Flask API when Flask is installed) on
+ephemeral ports in a throw-away directory with its own storage/, metadata/,
+logs/ and auth/, runs scripted scenarios and compares the results against a
+stored baseline.
+
+  small_file_storm     --storm-files 1-4 KB uploads then downloads from
+                       --clients concurrent clients
+  large_transfer       one --large-mb file uploaded and downloaded
+  one_file_writers     --writers clients overwriting the same file (lock
+                       conflicts retried); the final content must be intact
+  dashboard_polling    --pollers dashboard clients polling the API status,
+                       list, locks, logs, events and security endpoints
+                       while uploads run in the background (needs Flask)
+
+Each scenario runs --runs times on a fresh server; timing metrics keep their
+best value across runs.
+
+Usage:
+  python3 benchmarks/perf_harness.py                      # build, run, print JSON
+  python3 benchmarks/perf_harness.py --save               # record benchmarks/baselines/perf_harness.json
+  python3 benchmarks/perf_harness.py --compare [--threshold 0.25]   # exit 1 on regression
+  python3 benchmarks/perf_harness.py --only storm,large --binary build/file_server
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from common import PROJECT_ROOT, ApiProcess, ServerProcess, summarize
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'client'))
+
+from aioclient import AsyncFileClient, FileLockedError  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, 'benchmarks', 'baselines', 'perf_harness.json')
+DEFAULT_THRESHOLD = 0.25
+CFLAGS = ['-Wall', '-Wextra', '-pthread', '-O2']
+LIBS = ['-lcrypto', '-lz']
+DASHBOARD_ENDPOINTS = ['/api/status', '/api/list', '/api/locks', '/api/logs', '/api/events',
+                       '/api/security/summary']
+API_USER, API_PASSWORD = 'perf', 'perf-password'
+
+
+def build_server(out_dir):
+    """Compile server/file_server.c with the Makefile's flags"""
+    binary = os.path.join(out_dir, 'file_server')
+    subprocess.run(['gcc', *CFLAGS, os.path.join(PROJECT_ROOT, 'server', 'file_server.c'), '-o', binary, *LIBS],
+                   check=True, stderr=subprocess.DEVNULL)
+    return binary
+
+
+def latency_stats(latencies, elapsed):
+    stats = summarize(latencies, elapsed)
+    stats.pop('ops')
+    return stats
+
+
+# -- scenarios: (server, args) -> {metric: value} ----------------------------
+
+async def small_file_storm(server, args):
+    client = AsyncFileClient(port=server.port, max_connections=args.clients)
+    rng = random.Random(1)
+    payloads = {f"storm/f{i:05d}.txt": os.urandom(rng.randint(1024, 4096)) for i in range(args.storm_files)}
+    metrics = {}
+    for phase in ('upload', 'download'):
+        latencies = []
+
+        async def one(name, data):
+            start = time.perf_counter()
+            if phase == 'upload':
+                await client.upload(name, data)
+            elif await client.download(name) != data:
+                raise RuntimeError(f"{name}: content mismatch")
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(name, data) for name, data in payloads.items()))
+        elapsed = time.perf_counter() - start
+        for key, value in latency_stats(latencies, elapsed).items():
+            metrics[f"{phase}_{key}"] = value
+    return metrics
+
+
+async def large_transfer(server, args):
+    client = AsyncFileClient(port=server.port, timeout=300)
+    size = args.large_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'large.bin')
+        digest = hashlib.sha256()
+        with open(source, 'wb') as f:
+            for _ in range(args.large_mb):
+                chunk = os.urandom(1024 * 1024)
+                digest.update(chunk)
+                f.write(chunk)
+
+        start = time.perf_counter()
+        await client.upload_file(source, 'large.bin')
+        upload_sec = time.perf_counter() - start
+
+        target = os.path.join(workdir, 'large.out')
+        start = time.perf_counter()
+        await client.download_to('large.bin', target)
+        download_sec = time.perf_counter() - start
+
+        check = hashlib.sha256()
+        with open(target, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                check.update(chunk)
+        if check.hexdigest() != digest.hexdigest():
+            raise RuntimeError("large.bin: downloaded content differs")
+    return {
+        'upload_sec': round(upload_sec, 3),
+        'upload_mb_per_sec': round(args.large_mb / upload_sec, 1),
+        'download_sec': round(download_sec, 3),
+        'download_mb_per_sec': round(args.large_mb / download_sec, 1),
+    }
+
+
+async def one_file_writers(server, args):
+    client = AsyncFileClient(port=server.port, max_connections=args.writers)
+    payloads = [bytes([i]) * 65536 for i in range(args.writers)]
+    latencies, conflicts = [], 0
+
+    async def writer(index):
+        nonlocal conflicts
+        for _ in range(args.writer_rounds):
+            start = time.perf_counter()
+            while True:
+                try:
+                    await client.upload('shared.bin', payloads[index])
+                    break
+                except FileLockedError:
+                    conflicts += 1
+                    await asyncio.sleep(random.uniform(0.001, 0.01))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(i) for i in range(args.writers)))
+    elapsed = time.perf_counter() - start
+    if await client.download('shared.bin') not in payloads:
+        raise RuntimeError("shared.bin: final content is not one writer's complete payload")
+    writes = len(latencies)
+    metrics = latency_stats(latencies, elapsed)
+    metrics.update({'writes': writes, 'lock_conflicts': conflicts,
+                    'conflicts_per_write': round(conflicts / writes, 2) if writes else 0.0})
+    return metrics
+
+
+def dashboard_polling(server, args):
+    os.makedirs(os.path.join(server.workdir, 'auth'), exist_ok=True)
+    with open(os.path.join(server.workdir, 'auth', 'users.db'), 'w') as f:
+        f.write(f"{API_USER}:{hashlib.sha256(API_PASSWORD.encode()).hexdigest()}:admin\n")
+    with ApiProcess(server, env={'PASSWORD_WORKERS': '0'}) as api:
+        login = urllib.request.Request(api.url + '/api/login', headers={'Content-Type': 'application/json'},
+                                       data=json.dumps({'username': API_USER, 'password': API_PASSWORD}).encode())
+        with urllib.request.urlopen(login, timeout=10) as response:
+            token = json.load(response)['token']
+
+        stop = threading.Event()
+
+        def background_uploads():
+            async def run():
+                client = AsyncFileClient(port=server.port, max_connections=4)
+                i = 0
+                while not stop.is_set():
+                    await asyncio.gather(*(client.upload(f"{API_USER}/bg{(i + n) % 100}.txt", b"x" * 4096)
+                                           for n in range(4)), return_exceptions=True)
+                    i += 4
+            asyncio.run(run())
+
+        latencies, errors = [], 0
+        lock = threading.Lock()
+
+        def poller(index):
+            nonlocal errors
+            deadline = time.perf_counter() + args.poll_seconds
+            n = index
+            while time.perf_counter() < deadline:
+                path = DASHBOARD_ENDPOINTS[n % len(DASHBOARD_ENDPOINTS)]
+                n += 1
+                request = urllib.request.Request(api.url + path, headers={'Authorization': f'Bearer {token}'})
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        response.read()
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+                except OSError:
+                    with lock:
+                        errors += 1
+
+        uploader = threading.Thread(target=background_uploads, daemon=True)
+        uploader.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.pollers) as pool:
+            list(pool.map(poller, range(args.pollers)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        uploader.join(timeout=10)
+
+    metrics = latency_stats(latencies, elapsed)
+    metrics['errors'] = errors
+    return metrics
+
+
+SCENARIOS = {
+    'small_file_storm': small_file_storm,
+    'large_transfer': large_transfer,
+    'one_file_writers': one_file_writers,
+    'dashboard_polling': dashboard_polling,
+}
+
+
+def run_scenario(name, binary, args):
+    """Run a scenario --runs times, each on a fresh server and directory tree
+
+    Every timing metric keeps its best value across runs (highest
+    throughput, lowest latency), which is far less noisy than one run.
+    """
+    scenario = SCENARIOS[name]
+    best = {}
+    for _ in range(args.runs):
+        with ServerProcess(binary) as server:
+            start = time.perf_counter()
+            if asyncio.iscoroutinefunction(scenario):
+                metrics = asyncio.run(scenario(server, args))
+            else:
+                metrics = scenario(server, args)
+            metrics['wall_sec'] = round(time.perf_counter() - start, 3)
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            if metric not in best or not sign or (value - best[metric]) * sign > 0:
+                best[metric] = value
+    return best
+
+
+# -- baseline comparison -----------------------------------------------------
+
+def direction(metric):
+    """+1 if higher is better, -1 if lower is better, 0 if informational"""
+    if metric.endswith('_per_sec'):
+        return 1
+    if metric.endswith('_ms') or metric.endswith('_sec'):
+        return -1
+    return 0
+
+
+def compare(results, baseline, threshold):
+    rows, regressions = [], []
+    for scenario, metrics in results.items():
+        base_metrics = baseline.get('results', {}).get(scenario)
+        if not base_metrics or 'skipped' in metrics or 'skipped' in base_metrics:
+            continue
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            base = base_metrics.get(metric)
+            if not sign or not base or metric == 'wall_sec' or metric.startswith('max_') or '_max_' in metric:
+                continue
+            change = (value - base) / base * sign   # > 0 is an improvement
+            status = 'ok'
+            if change < -threshold:
+                status = 'REGRESSION'
+                regressions.append(f"{scenario}.{metric}")
+            elif change > threshold:
+                status = 'better'
+            rows.append((f"{scenario}.{metric}", base, value, change, status))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--binary', default=None, help='use this file_server instead of building one')
+    parser.add_argument('--only', default='', help='comma-separated scenario name fragments')
+    parser.add_argument('--runs', type=int, default=3, help='runs per scenario; the best values are kept')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent clients in the storm')
+    parser.add_argument('--storm-files', type=int, default=2000)
+    parser.add_argument('--large-mb', type=int, default=100, help='large transfer size (server max 100)')
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--writer-rounds', type=int, default=20)
+    parser.add_argument('--pollers', type=int, default=8)
+    parser.add_argument('--poll-seconds', type=float, default=10.0)
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, help='write results as the baseline')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help='compare against a baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    selected = [name for name in SCENARIOS
+                if not args.only or any(part and part in name for part in args.only.split(','))]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='perf_harness_') as build_dir:
+        binary = args.binary or build_server(build_dir)
+        for name in selected:
+            if name == 'dashboard_polling' and importlib.util.find_spec('flask') is None:
+                results[name] = {'skipped': 'Flask is not installed'}
+            else:
+                print(f"[HARNESS] {name} ...", file=sys.stderr, flush=True)
+                results[name] = run_scenario(name, binary, args)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {key: getattr(args, key) for key in
+                   ('runs', 'clients', 'storm_files', 'large_mb', 'writers', 'writer_rounds', 'pollers', 'poll_seconds')},
+        'results': results,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.save}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print("[WARN] baseline was recorded with different options", file=sys.stderr)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>9}  status", file=sys.stderr)
+        for metric, base, value, change, status in rows:
+            print(f"{metric:<44}{base:>12}{value:>12}{change * 100:>8.1f}%  {status}", file=sys.stderr)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%: {', '.join(regressions)}",
+                  file=sys.stderr)
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold * 100:.0f}%", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Workload Capture & Replay
+Turns recorded production traffic into a timed workload and replays it
+against a test instance, so server changes can be benchmarked against the
+real traffic shape instead of a synthetic mix (bench_load.py)
+
+Sources (detected from the file contents):
+- logs/audit.log         written by the C server; one-second timestamps, so
+                         operations within the same second are spread evenly
+                         across it; sizes come from "Size: N bytes"
+- API request trace      JSON lines written by the API when API_TRACE_LOG is
+                         set (api_layer/request_trace.py); sub-second
+                         timestamps and payload sizes
+- extracted workload     the output of --extract (same format as the trace)
+
+Replay:
+- operation i is due at start + (t_i - t_0) / --speed and latency is measured
+  from that due time (open loop, as bench_load --rate); --speed 0 issues
+  everything back to back, bounded by --clients, keeping operations on the
+  same file in recorded order
+- file contents are synthesized at the recorded sizes (capped at the
+  server's 100 MiB upload limit); files the trace reads or deletes before
+  uploading are preloaded at their recorded size first
+- only successful operations are replayed unless --include-failed is given
+  (failed uploads have no recorded size and reuse the last known one)
+- target c:   AsyncFileClient against --port or an isolated --binary server
+- target api: the Flask API; names are reduced to their basename because the
+              API adds the session's username directory itself
+
+Usage:
+  python3 benchmarks/replay.py logs/audit.log [--speed 1] [--clients 64]
+                               [--target c|api] [--binary build/file_server | --port 8888]
+                               [--limit N] [--include-failed] [--output report.json]
+  python3 benchmarks/replay.py logs/audit.log --extract workload.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+from bench_load import OPERATIONS, ApiTarget, CTarget, Recorder
+from common import DEFAULT_BINARY, PROJECT_ROOT, ServerProcess
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'api_layer'))
+
+from parsers import parse_audit_log_line  # noqa: E402
+
+MAX_UPLOAD = 100 * 1024 * 1024      # file_server rejects larger uploads
+DEFAULT_SIZE = 4096                 # for uploads whose size was never recorded
+SIZE_PATTERN = re.compile(r'Size: (\d+) bytes')
+OK_STATUSES = ('SUCCESS', 'NOT_MODIFIED')
+FILE_OPERATIONS = ('upload', 'download', 'delete')     # the others log a username or N/A as FILE
+
+
+def load_audit(lines, include_failed=False):
+    """audit.log lines -> [{'ts', 'op', 'file', 'bytes'}] in log order"""
+    events = []
+    for line in lines:
+        entry = parse_audit_log_line(line.rstrip('\n'))
+        op = entry['operation'].lower()
+        if op not in OPERATIONS or (entry['status'] not in OK_STATUSES and not include_failed):
+            continue
+        try:
+            second = datetime.strptime(entry['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+        except ValueError:
+            continue
+        match = SIZE_PATTERN.search(entry['details'])
+        events.append({'ts': second, 'op': op, 'file': entry['file'],
+                       'bytes': int(match.group(1)) if match else 0})
+
+    # Spread operations sharing a one-second timestamp evenly over that second
+    start = 0
+    while start < len(events):
+        end = start
+        while end < len(events) and events[end]['ts'] == events[start]['ts']:
+            end += 1
+        for i in range(start, end):
+            events[i]['ts'] += (i - start) / (end - start)
+        start = end
+    return events
+
+
+def load_trace(lines, include_failed=False):
+    """API trace / extracted workload JSON lines -> events sorted by time"""
+    events = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('op') not in OPERATIONS:
+            continue
+        if record.get('status', 200) >= 400 and not include_failed:
+            continue
+        events.append({'ts': float(record['ts']), 'op': record['op'],
+                       'file': record.get('file') or 'N/A', 'bytes': int(record.get('bytes') or 0)})
+    events.sort(key=lambda event: event['ts'])
+    return events
+
+
+def load_workload(path, include_failed=False):
+    with open(path, 'r', errors='replace') as f:
+        lines = f.readlines()
+    first = next((line for line in lines if line.strip()), '')
+    loader = load_trace if first.lstrip().startswith('{') else load_audit
+    return loader(lines, include_failed)
+
+
+def plan(events):
+    """
+    Fill in upload sizes and find files that must exist before replay starts.
+    Returns (events, {name: size}) with every upload sized 1..MAX_UPLOAD.
+    """
+    known = {}
+    preload = {}
+    for event in events:
+        name, size = event['file'], event['bytes']
+        if event['op'] == 'upload':
+            size = size or known.get(name, DEFAULT_SIZE)
+            event['bytes'] = min(max(size, 1), MAX_UPLOAD)
+            known[name] = event['bytes']
+        elif event['op'] in FILE_OPERATIONS and name not in known:
+            known[name] = preload[name] = min(max(size, 1), MAX_UPLOAD)
+    return events, preload
+
+
+async def replay(target, events, preload, speed, clients, recorder, target_name):
+    rename = os.path.basename if target_name == 'api' else str
+    largest = max([event['bytes'] for event in events if event['op'] == 'upload'] +
+                  list(preload.values()) + [1])
+    payload = memoryview(os.urandom(largest))
+
+    names = list(preload)
+    for batch in range(0, len(names), clients):
+        await asyncio.gather(*(target.run('upload', rename(name), payload[:preload[name]])
+                               for name in names[batch:batch + clients]), return_exceptions=True)
+
+    gate = asyncio.Semaphore(clients) if not speed else None
+    last = {}       # file -> its previous operation's task (kept in order when unpaced)
+    lag = 0.0
+
+    async def issue(event, due, previous):
+        data = payload[:event['bytes']] if event['op'] == 'upload' else None
+        try:
+            if previous:
+                await asyncio.wait([previous])
+            nbytes = await target.run(event['op'], rename(event['file']), data)
+            recorder.record(event['op'], due, None, nbytes)
+        except Exception as e:
+            recorder.record(event['op'], due, e)
+        finally:
+            if gate:
+                gate.release()
+
+    tasks = []
+    origin = events[0]['ts'] if events else 0.0
+    start = time.perf_counter()
+    for event in events:
+        if gate:
+            await gate.acquire()
+            due = time.perf_counter()
+        else:
+            due = start + (event['ts'] - origin) / speed
+            now = time.perf_counter()
+            if due > now:
+                await asyncio.sleep(due - now)
+            lag = max(lag, time.perf_counter() - due)
+        previous = last.get(event['file']) if gate and event['op'] in FILE_OPERATIONS else None
+        tasks.append(asyncio.create_task(issue(event, due, previous)))
+        last[event['file']] = tasks[-1]
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start, lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='audit.log, API trace (API_TRACE_LOG) or extracted workload')
+    parser.add_argument('--extract', default=None, metavar='PATH',
+                        help='write the normalized workload as JSON lines and exit')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='replay speed multiplier (1 = recorded pace, 0 = as fast as possible)')
+    parser.add_argument('--clients', type=int, default=64, help='max concurrent connections')
+    parser.add_argument('--limit', type=int, default=0, help='replay only the first N operations')
+    parser.add_argument('--include-failed', action='store_true', help='also replay operations that failed')
+    parser.add_argument('--target', choices=('c', 'api'), default='c')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-operation timeout (seconds)')
+    parser.add_argument('--binary', default=DEFAULT_BINARY, help='server to start for --target c')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='use a running C server instead of --binary')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API base URL for --target api')
+    parser.add_argument('--token', default=None, help='API session token (skips login)')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--output', default=None, help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    events = load_workload(args.source, args.include_failed)
+    if args.limit:
+        events = events[:args.limit]
+
+    if args.extract:
+        with open(args.extract, 'w') as f:
+            for event in events:
+                f.write(json.dumps({'ts': round(event['ts'], 6), 'op': event['op'], 'file': event['file'],
+                                    'bytes': event['bytes']}, separators=(',', ':')) + '\n')
+        print(f"{len(events)} operations written to {args.extract}")
+        return
+    if not events:
+        sys.exit(f"No replayable operations in {args.source}")
+
+    events, preload = plan(events)
+
+    server = None
+    if args.target == 'c':
+        if args.port is None:
+            server = ServerProcess(args.binary).__enter__()
+            port = server.port
+        else:
+            port = args.port
+        target = CTarget(args.host, port, args.clients, args.timeout)
+    else:
+        token = args.token or ApiTarget.login(args.url, args.username, args.password)
+        target = ApiTarget(args.url, token, args.clients, args.timeout)
+
+    recorder = Recorder()
+    try:
+        elapsed, lag = asyncio.run(replay(target, events, preload, args.speed, args.clients,
+                                          recorder, args.target))
+    finally:
+        target.close()
+        if server:
+            server.__exit__(None, None, None)
+
+    span = events[-1]['ts'] - events[0]['ts']
+    report = {
+        'config': {key: getattr(args, key) for key in
+                   ('source', 'target', 'speed', 'clients', 'limit', 'include_failed')},
+        'trace': {
+            'operations': len(events),
+            'by_operation': dict(Counter(event['op'] for event in events)),
+            'span_sec': round(span, 3),
+            'upload_bytes': sum(event['bytes'] for event in events if event['op'] == 'upload'),
+            'preloaded_files': len(preload),
+        },
+        'elapsed_sec': round(elapsed, 3),
+        'max_schedule_lag_ms': round(lag * 1000, 3),
+    }
+    report.update(recorder.report(elapsed))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
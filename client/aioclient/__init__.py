@@ -0,0 +1,20 @@
+"""
+aioclient - asyncio client library for the C file server protocol
+
+    import asyncio
+    from aioclient import AsyncFileClient
+
+    async def main():
+        client = AsyncFileClient(port=8888, max_connections=100)
+        await asyncio.gather(*(client.upload(f"f{i}.txt", b"data") for i in range(500)))
+        print(await client.list())
+
+    asyncio.run(main())
+
+Importable with client/ on sys.path (the CLI's own directory).
+"""
+
+from .client import AUTH_TOKEN, AsyncFileClient
+from .protocol import FileLockedError, ServerError
+
+__all__ = ["AUTH_TOKEN", "AsyncFileClient", "FileLockedError", "ServerError"]
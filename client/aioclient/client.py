@@ -0,0 +1,178 @@
+"""
+AsyncFileClient - asyncio client for the C file server
+
+One connection per command (the server closes after each reply), opened
+inside a semaphore so at most `max_connections` are in flight no matter how
+many coroutines are waiting. Each operation runs under one timeout; on
+timeout or cancellation the connection is closed before the error
+propagates, so abandoned operations never leave sockets behind.
+"""
+
+import asyncio
+import os
+
+from .protocol import (LINE_LIMIT, ServerError, encode_command, parse_hashes, parse_list,
+                       parse_stats, parse_status, raise_for_status)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8888
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_CONNECTIONS = 64
+CHUNK_SIZE = 1024 * 1024
+AUTH_TOKEN = os.environ.get('FILE_SERVER_AUTH', 'os-core-token')
+
+
+class AsyncFileClient:
+    """Coroutine API for UPLOAD/DOWNLOAD/LIST/DELETE/LOCKS/LOGS/STATS/STAT/HASHES"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, token=AUTH_TOKEN,
+                 timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _run(self, command, handler):
+        """Open a connection, send AUTH + command, and let handler read the reply"""
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await asyncio.wait_for(self._exchange(command, handler), self.timeout)
+            finally:
+                self.in_flight -= 1
+
+    async def _exchange(self, command, handler):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+        try:
+            writer.write(encode_command(self.token, command))
+            await writer.drain()
+            return await handler(reader, writer)
+        finally:
+            writer.close()
+
+    async def _text(self, command):
+        """Commands whose reply is "SUCCESS" plus a body ending at EOF"""
+        async def handler(reader, writer):
+            reply = (await reader.read()).decode(errors='replace')
+            first, _, body = reply.partition("\n")
+            status, message = parse_status(first.encode())
+            raise_for_status(status, message)
+            return body
+        return await self._run(command, handler)
+
+    async def _status(self, command, expected=("SUCCESS",)):
+        """Commands answered by a single status line"""
+        async def handler(reader, writer):
+            status, message = parse_status(await reader.readline())
+            raise_for_status(status, message, expected)
+            return status, message
+        return await self._run(command, handler)
+
+    # -- transfers ---------------------------------------------------------
+
+    async def upload(self, name, data):
+        """UPLOAD bytes as `name`; returns the server's success message"""
+        async def send(writer):
+            writer.write(data)
+            await writer.drain()
+        return await self._upload(name, len(data), send)
+
+    async def upload_file(self, path, name=None):
+        """UPLOAD a local file (sent with loop.sendfile where supported)"""
+        size = os.path.getsize(path)
+
+        async def send(writer):
+            with open(path, 'rb') as f:
+                await asyncio.get_running_loop().sendfile(writer.transport, f, 0, size)
+        return await self._upload(name or os.path.basename(path), size, send)
+
+    async def _upload(self, name, size, send):
+        async def handler(reader, writer):
+            status, message = parse_status(await reader.readline())
+            raise_for_status(status, message, ("READY",))
+            await send(writer)
+            status, message = parse_status(await reader.readline())
+            raise_for_status(status, message)
+            return message
+        return await self._run(f"UPLOAD {name} {size}", handler)
+
+    async def download(self, name, offset=None, length=None):
+        """DOWNLOAD into memory; optional byte range"""
+        command = f"DOWNLOAD {name}" if offset is None else f"DOWNLOAD {name} {offset} {length or 0}"
+
+        async def handler(reader, writer):
+            size = await _read_size(reader)
+            return await _read_exactly(reader, size)
+        return await self._run(command, handler)
+
+    async def download_to(self, name, path):
+        """DOWNLOAD into a local file in CHUNK_SIZE pieces; returns the size"""
+        async def handler(reader, writer):
+            size = await _read_size(reader)
+            remaining = size
+            with open(path, 'wb') as f:
+                while remaining:
+                    chunk = await _read_exactly(reader, min(CHUNK_SIZE, remaining))
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            return size
+        return await self._run(f"DOWNLOAD {name}", handler)
+
+    async def download_if_none_match(self, name, sha256):
+        """Conditional DOWNLOAD: None if the server copy still has `sha256`"""
+        async def handler(reader, writer):
+            status, message = parse_status(await reader.readline())
+            if status == "NOT_MODIFIED":
+                return None
+            raise_for_status(status, message)
+            return await _read_exactly(reader, int(message.split()[0]))
+        return await self._run(f"DOWNLOAD_IF_NONE_MATCH {name} {sha256}", handler)
+
+    # -- metadata ----------------------------------------------------------
+
+    async def list(self, user=None):
+        """LIST [user] -> [(name, size)]"""
+        return parse_list(await self._text(f"LIST {user}" if user else "LIST"))
+
+    async def hashes(self, user=None):
+        """HASHES [user] -> {name: (size, sha256 or None)}"""
+        return parse_hashes(await self._text(f"HASHES {user}" if user else "HASHES"))
+
+    async def stat(self, name):
+        """STAT name -> (size, sha256 or None)"""
+        _, message = await self._status(f"STAT {name}")
+        size, sha = message.split()
+        return int(size), None if sha == "-" else sha
+
+    async def delete(self, name):
+        _, message = await self._status(f"DELETE {name}")
+        return message
+
+    async def locks(self):
+        return await self._text("LOCKS")
+
+    async def logs(self):
+        return await self._text("LOGS")
+
+    async def stats(self):
+        """STATS -> {counter: value string}"""
+        return parse_stats(await self._text("STATS"))
+
+
+async def _read_size(reader):
+    status, message = parse_status(await reader.readline())
+    raise_for_status(status, message)
+    try:
+        return int(message.split()[0])
+    except (IndexError, ValueError):
+        raise ServerError(status, f"Invalid size in reply: {message!r}")
+
+
+async def _read_exactly(reader, size):
+    try:
+        return await reader.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError(f"Incomplete download: {len(e.partial)}/{size} bytes")
@@ -0,0 +1,88 @@
+"""
+Wire protocol framing shared by AsyncFileClient
+
+Every connection carries exactly one command:
+
+    AUTH <token>\n<COMMAND>\n
+
+and the server closes the connection after its reply. Replies are framed as:
+
+- status line   "<STATUS> <message>\n" (SUCCESS, READY, NOT_MODIFIED, ERROR)
+- DOWNLOAD      "SUCCESS <size>\n" followed by exactly <size> bytes
+- UPLOAD        "READY ...\n", then the client sends <size> bytes, then a
+                final status line
+- LIST, HASHES, LOCKS, LOGS, STATS
+                "SUCCESS" and a text body that ends when the server closes
+"""
+
+import re
+
+LINE_LIMIT = 64 * 1024
+LOCKED_MARKERS = ("locked", "in use")
+
+_LIST_LINE = re.compile(r"^(\S+) \((\d+) bytes\)$")
+
+
+class ServerError(RuntimeError):
+    """The server answered with something other than the expected status"""
+
+    def __init__(self, status, message=""):
+        super().__init__(f"{status} {message}".strip())
+        self.status = status
+        self.message = message
+
+    @property
+    def locked(self):
+        """True for lock conflicts, which are worth retrying"""
+        return any(marker in self.message.lower() for marker in LOCKED_MARKERS)
+
+
+class FileLockedError(ServerError):
+    """The file (or the global upload lock) is held by another client"""
+
+
+def encode_command(token, command):
+    if "\n" in command:
+        raise ValueError("Commands must be a single line")
+    return f"AUTH {token}\n{command}\n".encode()
+
+
+def parse_status(line):
+    """b"SUCCESS 42\\n" -> ("SUCCESS", "42")"""
+    text = line.decode(errors='replace').strip()
+    status, _, message = text.partition(" ")
+    return status, message.strip()
+
+
+def raise_for_status(status, message, expected=("SUCCESS",)):
+    if status in expected:
+        return
+    error = ServerError(status or "EOF", message or "Connection closed by server")
+    if error.locked:
+        raise FileLockedError(error.status, error.message)
+    raise error
+
+
+def parse_list(body):
+    """LIST body -> [(name, size)]"""
+    return [(m.group(1), int(m.group(2))) for m in map(_LIST_LINE.match, body.splitlines()) if m]
+
+
+def parse_hashes(body):
+    """HASHES body -> {name: (size, sha256 or None)}"""
+    files = {}
+    for line in body.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[1].isdigit():
+            files[parts[0]] = (int(parts[1]), None if parts[2] == "-" else parts[2])
+    return files
+
+
+def parse_stats(body):
+    """STATS body -> {counter: value string}"""
+    stats = {}
+    for line in body.splitlines():
+        if line.startswith("  ") and ":" in line:
+            key, value = line.strip().split(":", 1)
+            stats[key] = value.strip()
+    return stats
@@ -0,0 +1,194 @@
+"""
+Bulk Transfers
+UPLOAD-DIR / DOWNLOAD-ALL for the CLI client: many files in one process over
+a bounded pool of worker threads (one connection per file, as the protocol
+requires)
+
+- a file the server reports as locked ("File is locked by another process",
+  "File is locked for writing", "File is currently in use") or a failed
+  connection is retried with exponential backoff plus jitter
+- one throttled progress line for the whole batch, then a summary with
+  files/s, MB/s, retries and the first failures
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from transfer import Progress, ResponseReader, recv_file, send_file
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.1       # Seconds before the first retry; doubles per attempt
+MAX_BACKOFF = 5.0
+RETRYABLE = ("locked", "in use", "connection failed")
+
+TransferResult = namedtuple("TransferResult", "name ok size attempts message")
+
+_LIST_LINE = re.compile(r"^(\S+) \((\d+) bytes\)$")
+
+
+def _retryable(message):
+    return any(marker in message.lower() for marker in RETRYABLE)
+
+
+def upload_one(client, path, remote_name):
+    """UPLOAD one file; returns (ok, server message)"""
+    size = os.path.getsize(path)
+    sock = client.connect()
+    if not sock:
+        return False, "Connection failed"
+    with sock:
+        client.send_command(sock, f"UPLOAD {remote_name} {size}")
+        reader = ResponseReader(sock)
+        response = reader.read_line()
+        if not response.startswith("READY"):
+            return False, response
+        with open(path, 'rb') as f:
+            send_file(sock, f, size)
+        response = reader.read_line()
+        return "SUCCESS" in response, response
+
+
+def download_one(client, remote_name, save_path):
+    """DOWNLOAD one file; returns (ok, server message)"""
+    sock = client.connect()
+    if not sock:
+        return False, "Connection failed"
+    with sock:
+        client.send_command(sock, f"DOWNLOAD {remote_name}")
+        reader = ResponseReader(sock)
+        response = reader.read_line()
+        if not response.startswith("SUCCESS"):
+            return False, response
+        size = int(response.split()[1])
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+        with open(save_path, 'wb') as f:
+            received = recv_file(sock, f, size, initial=reader.take_pending())
+        if received != size:
+            return False, f"Incomplete download: {received}/{size} bytes"
+        return True, response
+
+
+def fetch_listing(client, user=None):
+    """LIST (or LIST <user>) -> [(remote name, size)]"""
+    sock = client.connect()
+    if not sock:
+        raise ConnectionError("Cannot connect to server")
+    with sock:
+        client.send_command(sock, f"LIST {user}" if user else "LIST")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    lines = b"".join(chunks).decode(errors='replace').splitlines()
+    if not lines or not lines[0].startswith("SUCCESS"):
+        raise RuntimeError(lines[0] if lines else "Empty LIST response")
+    return [(m.group(1), int(m.group(2))) for m in map(_LIST_LINE.match, lines[1:]) if m]
+
+
+def run_batch(label, jobs, concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+              backoff=DEFAULT_BACKOFF):
+    """Run (name, size, fn) jobs on a worker pool; fn() -> (ok, message)
+
+    Prints a progress line while running and a summary at the end; returns
+    the list of TransferResults.
+    """
+    progress = Progress(label, sum(size for _, size, _ in jobs), interval=0.5)
+    lock = threading.Lock()
+
+    def attempt(job):
+        name, size, fn = job
+        for tries in range(1, retries + 2):
+            try:
+                ok, message = fn()
+            except OSError as e:
+                ok, message = False, f"Connection failed: {e}"
+            if ok or not _retryable(message) or tries > retries:
+                break
+            delay = min(MAX_BACKOFF, backoff * (2 ** (tries - 1)))
+            time.sleep(delay * random.uniform(0.5, 1.5))
+        with lock:
+            progress.update(size if ok else 0)
+        return TransferResult(name, ok, size, tries, message)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(attempt, jobs))
+    elapsed = time.perf_counter() - start
+    if jobs:
+        progress.finish()
+    print_summary(label, results, elapsed, concurrency)
+    return results
+
+
+def print_summary(label, results, elapsed, concurrency):
+    done = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    total_bytes = sum(r.size for r in done)
+    retries = sum(r.attempts - 1 for r in results)
+    elapsed = max(elapsed, 1e-9)
+    print(f"[{label}] {len(done)}/{len(results)} files, {total_bytes} bytes in {elapsed:.2f}s "
+          f"with {concurrency} workers")
+    print(f"[{label}] Throughput: {len(done) / elapsed:.1f} files/s, "
+          f"{total_bytes / elapsed / (1024 * 1024):.2f} MB/s, {retries} retries")
+    for r in failed[:10]:
+        print(f"[ERROR] {r.name}: {r.message} (after {r.attempts} attempts)")
+    if len(failed) > 10:
+        print(f"[ERROR] ... and {len(failed) - 10} more failures")
+
+
+def local_files(directory, prefix=None, skip=()):
+    """Walk `directory` -> ([(local path, remote name)], [rejected TransferResult])
+
+    Remote names are the paths relative to `directory` (under `prefix/` if
+    given). The server allows one directory level and no spaces, so other
+    files are reported and rejected. Names in `skip` are ignored.
+    """
+    files, rejected = [], []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name in skip:
+                continue
+            path = os.path.join(root, name)
+            remote = os.path.relpath(path, directory).replace(os.sep, "/")
+            if prefix:
+                remote = f"{prefix.strip('/')}/{remote}"
+            if remote.count("/") > 1 or any(c.isspace() for c in remote):
+                message = "Unsupported remote name (nested too deep or contains spaces)"
+                print(f"[ERROR] {remote}: {message}")
+                rejected.append(TransferResult(remote, False, 0, 0, message))
+                continue
+            files.append((path, remote))
+    return files, rejected
+
+
+def upload_jobs(client, files):
+    """(local path, remote name) pairs -> run_batch jobs"""
+    return [(remote, os.path.getsize(path), lambda path=path, remote=remote: upload_one(client, path, remote))
+            for path, remote in files]
+
+
+def upload_dir(client, directory, prefix=None, **options):
+    """Upload every regular file under `directory` (see local_files for names)"""
+    files, rejected = local_files(directory, prefix)
+    jobs = upload_jobs(client, files)
+    print(f"[UPLOAD-DIR] {len(jobs)} files from {directory}")
+    if rejected:
+        print(f"[UPLOAD-DIR] Skipping {len(rejected)} files the server cannot store")
+    return run_batch("UPLOAD-DIR", jobs, **options) + rejected
+
+
+def download_all(client, dest_dir, user=None, **options):
+    """Download every file in the server's LIST (or LIST <user>) into dest_dir"""
+    listing = fetch_listing(client, user)
+    jobs = [(name, size, lambda name=name: download_one(client, name, os.path.join(dest_dir, *name.split("/"))))
+            for name, size in listing]
+    print(f"[DOWNLOAD-ALL] {len(jobs)} files to {dest_dir}")
+    return run_batch("DOWNLOAD-ALL", jobs, **options)
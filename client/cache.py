@@ -0,0 +1,168 @@
+"""
+Client Content Cache
+Keeps a copy of every downloaded file keyed by server path and SHA-256 so a
+repeated DOWNLOAD costs one small round trip instead of the full transfer
+
+1. DOWNLOAD of a cached path sends DOWNLOAD_IF_NONE_MATCH <file> <sha256>.
+2. The server answers NOT_MODIFIED <size> <sha256> if its stored hash still
+   matches; the file is then copied from the cache (a hit). Any other answer
+   is a normal download (a miss), hashed while it is received and stored.
+3. Blobs are content-addressed (objects/<sha[:2]>/<sha>), so paths with the
+   same content share one copy. When the cache grows past its size limit the
+   least recently used paths are dropped, and blobs no path refers to any
+   more are deleted.
+
+Everything lives under FILE_CLIENT_CACHE_DIR (default ~/.cache/file_client);
+index.json holds the LRU-ordered entries and cumulative hit/miss counters.
+FILE_CLIENT_CACHE_MB sets the size limit (0 disables the cache).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.environ.get('FILE_CLIENT_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'file_client'))
+CACHE_MAX_MB = int(os.environ.get('FILE_CLIENT_CACHE_MB', '256'))
+INDEX_NAME = "index.json"
+
+
+class HashingWriter:
+    """File wrapper that hashes everything written through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+class ContentCache:
+    """LRU cache of downloaded files: server path -> (sha256, size)"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.entries = OrderedDict()    # name -> [sha256, size, last_used]; oldest first
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0}
+        self.lock = threading.Lock()
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            self.entries = OrderedDict((name, entry) for name, entry in data.get("entries", []))
+            self.stats.update(data.get("stats", {}))
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _blob_path(self, sha):
+        return os.path.join(self.directory, "objects", sha[:2], sha)
+
+    def used_bytes(self):
+        """Bytes held in blobs (shared content counted once)"""
+        return sum({entry[0]: entry[1] for entry in self.entries.values()}.values())
+
+    def lookup(self, name):
+        """(sha256, size) of the cached copy of `name`, or None"""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            if not os.path.exists(self._blob_path(entry[0])):
+                del self.entries[name]
+                return None
+            return entry[0], entry[1]
+
+    def restore(self, name, save_path):
+        """Copy the cached content of `name` to save_path and count a hit"""
+        with self.lock:
+            sha, size, _ = self.entries[name]
+            temp_path = save_path + ".part"
+            shutil.copyfile(self._blob_path(sha), temp_path)
+            os.replace(temp_path, save_path)
+            self.entries[name][2] = time.time()
+            self.entries.move_to_end(name)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += size
+
+    def store(self, name, path, sha, size):
+        """Record a downloaded file (a miss); evicts LRU entries past the limit"""
+        with self.lock:
+            self.stats["misses"] += 1
+            if not self.enabled or size > self.max_bytes:
+                self.entries.pop(name, None)
+                return
+            blob = self._blob_path(sha)
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                temp_path = blob + ".tmp"
+                shutil.copyfile(path, temp_path)
+                os.replace(temp_path, blob)
+            old = self.entries.pop(name, None)
+            self.entries[name] = [sha, size, time.time()]
+            if old and old[0] != sha:
+                self._drop_blob(old[0])
+            self._evict()
+
+    def forget(self, name):
+        with self.lock:
+            entry = self.entries.pop(name, None)
+            if entry:
+                self._drop_blob(entry[0])
+
+    def _drop_blob(self, sha):
+        if any(entry[0] == sha for entry in self.entries.values()):
+            return
+        try:
+            os.remove(self._blob_path(sha))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        used = self.used_bytes()
+        while used > self.max_bytes and self.entries:
+            _, (sha, size, _) = self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+            if not any(entry[0] == sha for entry in self.entries.values()):
+                used -= size
+                self._drop_blob(sha)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            shutil.rmtree(os.path.join(self.directory, "objects"), ignore_errors=True)
+            self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0}
+        self.save()
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def summary(self):
+        return (f"{self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"(hit rate {self.hit_rate() * 100:.1f}%), "
+                f"{self.stats['bytes_saved']} bytes served locally, "
+                f"{len(self.entries)} entries, {self.used_bytes()}/{self.max_bytes} bytes used, "
+                f"{self.stats['evictions']} evictions")
+
+    def save(self):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"version": 1, "entries": list(self.entries.items()), "stats": self.stats},
+                          f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
@@ -8,17 +8,23 @@ Connects to C-based file server via TCP sockets
 import socket
 import os
 import sys
-import time
+
+import bulk
+import sync
+from cache import CACHE_MAX_MB, ContentCache, HashingWriter
+from transfer import Progress, ResponseReader, recv_file, send_file
 
 # Configuration
 SERVER_HOST = '127.0.0.1'
 SERVER_PORT = 8888
 BUFFER_SIZE = 4096
+AUTH_TOKEN = os.environ.get('FILE_SERVER_AUTH', 'os-core-token')
 
 class FileClient:
     def __init__(self, host=SERVER_HOST, port=SERVER_PORT):
         self.host = host
         self.port = port
+        self.cache = ContentCache() if CACHE_MAX_MB > 0 else None
     
     def connect(self):
         """Create TCP socket connection to server"""
@@ -34,6 +40,10 @@ class FileClient:
             print(f"[ERROR] Connection failed: {e}")
             return None
     
+    def send_command(self, sock, command):
+        """Send the AUTH line followed by one protocol command"""
+        sock.sendall(f"AUTH {AUTH_TOKEN}\n{command}\n".encode())
+    
     def upload_file(self, filepath, slow_ms=0):
         """
         Upload file to server
@@ -56,12 +66,12 @@ class FileClient:
             if slow_ms > 0:
                 print(f"[UPLOAD] Throttling enabled: {slow_ms} ms per chunk")
             # Send UPLOAD command with filename and filesize
-            command = f"UPLOAD {filename} {filesize}\n"
-            sock.sendall(command.encode())
+            self.send_command(sock, f"UPLOAD {filename} {filesize}")
             print(f"[UPLOAD] Sent command: UPLOAD {filename} {filesize}")
             
             # Wait for READY response
-            response = sock.recv(BUFFER_SIZE).decode().strip()
+            reader = ResponseReader(sock)
+            response = reader.read_line()
             print(f"[UPLOAD] Server response: {response}")
             
             if not response.startswith("READY"):
@@ -70,27 +80,13 @@ class FileClient:
             
             # Send file data (bounded transfer)
             print(f"[UPLOAD] Sending {filesize} bytes...")
+            progress = Progress("UPLOAD", filesize)
             with open(filepath, 'rb') as f:
-                total_sent = 0
-                while total_sent < filesize:
-                    chunk = f.read(BUFFER_SIZE)
-                    if not chunk:
-                        break
-                    sock.sendall(chunk)
-                    total_sent += len(chunk)
-
-                    if slow_ms > 0:
-                        time.sleep(slow_ms / 1000.0)
-                    
-                    # Progress indicator
-                    progress = (total_sent / filesize) * 100
-                    print(f"\r[UPLOAD] Progress: {progress:.1f}% ({total_sent}/{filesize} bytes)", end='')
-            
-            print()  # New line after progress
+                send_file(sock, f, filesize, progress, slow_ms)
+            progress.finish()
             
-            # Wait for final response
-            time.sleep(0.1)  # Give server time to process
-            final_response = sock.recv(BUFFER_SIZE).decode().strip()
+            # Wait for final response (the server answers once the data is committed)
+            final_response = reader.read_line()
             print(f"[UPLOAD] Server response: {final_response}")
             
             if "SUCCESS" in final_response:
@@ -110,6 +106,8 @@ class FileClient:
         """
         Download file from server
         Demonstrates: Bounded file transfer
+        A cached copy is revalidated with DOWNLOAD_IF_NONE_MATCH and reused
+        when the server still holds the same content (see cache.py)
         """
         if save_path is None:
             save_path = filename
@@ -120,17 +118,33 @@ class FileClient:
             return False
         
         try:
-            # Send DOWNLOAD command
-            command = f"DOWNLOAD {filename}\n"
-            sock.sendall(command.encode())
-            print(f"[DOWNLOAD] Sent command: DOWNLOAD {filename}")
+            # Send DOWNLOAD (or the conditional form when a cached copy exists)
+            cached = self.cache.lookup(filename) if self.cache else None
+            if cached:
+                command = f"DOWNLOAD_IF_NONE_MATCH {filename} {cached[0]}"
+            else:
+                command = f"DOWNLOAD {filename}"
+            self.send_command(sock, command)
+            print(f"[DOWNLOAD] Sent command: {command}")
             
-            # Receive response with filesize
-            response = sock.recv(BUFFER_SIZE).decode().strip()
+            # Receive response with filesize (file data may follow in the same packet)
+            reader = ResponseReader(sock)
+            response = reader.read_line()
             print(f"[DOWNLOAD] Server response: {response}")
             
+            if response.startswith("NOT_MODIFIED") and cached:
+                self.cache.restore(filename, save_path)
+                self.cache.save()
+                print(f"[CACHE] Hit: {cached[1]} bytes copied from the local cache")
+                print(f"[CACHE] {self.cache.summary()}")
+                print(f"[SUCCESS] File downloaded successfully to {save_path}")
+                return True
+            
             if not response.startswith("SUCCESS"):
                 print(f"[ERROR] Download failed: {response}")
+                if cached and "not found" in response.lower():
+                    self.cache.forget(filename)
+                    self.cache.save()
                 return False
             
             # Parse filesize
@@ -142,27 +156,18 @@ class FileClient:
             filesize = int(parts[1])
             print(f"[DOWNLOAD] Receiving {filesize} bytes...")
             
-            # Receive file data (bounded transfer)
+            # Receive file data (bounded transfer), hashed on the way for the cache
+            progress = Progress("DOWNLOAD", filesize)
             with open(save_path, 'wb') as f:
-                total_received = 0
-                while total_received < filesize:
-                    remaining = filesize - total_received
-                    chunk_size = min(BUFFER_SIZE, remaining)
-                    chunk = sock.recv(chunk_size)
-                    
-                    if not chunk:
-                        break
-                    
-                    f.write(chunk)
-                    total_received += len(chunk)
-                    
-                    # Progress indicator
-                    progress = (total_received / filesize) * 100
-                    print(f"\r[DOWNLOAD] Progress: {progress:.1f}% ({total_received}/{filesize} bytes)", end='')
-            
-            print()  # New line after progress
+                writer = HashingWriter(f) if self.cache else f
+                total_received = recv_file(sock, writer, filesize, progress, initial=reader.take_pending())
+            progress.finish()
             
             if total_received == filesize:
+                if self.cache:
+                    self.cache.store(filename, save_path, writer.hexdigest(), filesize)
+                    self.cache.save()
+                    print(f"[CACHE] {self.cache.summary()}")
                 print(f"[SUCCESS] File downloaded successfully to {save_path}")
                 return True
             else:
@@ -184,8 +189,7 @@ class FileClient:
         
         try:
             # Send LIST command
-            command = "LIST\n"
-            sock.sendall(command.encode())
+            self.send_command(sock, "LIST")
             print(f"[LIST] Sent command: LIST")
             
             # Receive response
@@ -210,8 +214,7 @@ class FileClient:
         
         try:
             # Send DELETE command
-            command = f"DELETE {filename}\n"
-            sock.sendall(command.encode())
+            self.send_command(sock, f"DELETE {filename}")
             print(f"[DELETE] Sent command: DELETE {filename}")
             
             # Receive response
@@ -240,8 +243,7 @@ class FileClient:
         
         try:
             # Send LOCKS command
-            command = "LOCKS\n"
-            sock.sendall(command.encode())
+            self.send_command(sock, "LOCKS")
             print(f"[LOCKS] Sent command: LOCKS")
             
             # Receive response
@@ -266,8 +268,7 @@ class FileClient:
         
         try:
             # Send LOGS command
-            command = "LOGS\n"
-            sock.sendall(command.encode())
+            self.send_command(sock, "LOGS")
             print(f"[LOGS] Sent command: LOGS")
             
             # Receive response
@@ -299,6 +300,26 @@ def print_menu():
     print("="*60)
 
 
+def pop_option(args, flag, default, convert=str):
+    """Remove '<flag> <value>' from args and return the converted value"""
+    if flag not in args:
+        return default
+    idx = args.index(flag)
+    if idx + 1 >= len(args):
+        raise ValueError(f"{flag} expects a value")
+    value = convert(args[idx + 1])
+    del args[idx:idx + 2]
+    return value
+
+
+def bulk_options(args):
+    """--concurrency / --retries options shared by UPLOAD-DIR, DOWNLOAD-ALL and SYNC"""
+    return {
+        'concurrency': pop_option(args, "--concurrency", bulk.DEFAULT_CONCURRENCY, int),
+        'retries': pop_option(args, "--retries", bulk.DEFAULT_RETRIES, int),
+    }
+
+
 def main():
     """Main interactive client loop"""
     client = FileClient()
@@ -336,8 +357,21 @@ def main():
             filepath = args[0]
             client.upload_file(filepath, slow_ms=slow_ms)
         elif command == "DOWNLOAD" and len(sys.argv) > 2:
-            save_path = sys.argv[3] if len(sys.argv) > 3 else sys.argv[2]
-            client.download_file(sys.argv[2], save_path)
+            args = sys.argv[2:]
+            if "--no-cache" in args:
+                args.remove("--no-cache")
+                client.cache = None
+            if not args:
+                print("[ERROR] Please provide a file to download")
+                return
+            save_path = args[1] if len(args) > 1 else args[0]
+            client.download_file(args[0], save_path)
+        elif command in ("CACHE-STATS", "CACHE-CLEAR"):
+            cache = ContentCache()
+            if command == "CACHE-CLEAR":
+                cache.clear()
+                print(f"[CACHE] Cleared {cache.directory}")
+            print(f"[CACHE] {cache.directory}: {cache.summary()}")
         elif command == "LIST":
             client.list_files()
         elif command == "DELETE" and len(sys.argv) > 2:
@@ -346,14 +380,43 @@ def main():
             client.view_locks()
         elif command == "LOGS":
             client.view_logs()
+        elif command in ("UPLOAD-DIR", "DOWNLOAD-ALL", "SYNC"):
+            args = sys.argv[2:]
+            try:
+                prefix = pop_option(args, "--prefix", None)
+                user = pop_option(args, "--user", None)
+                options = bulk_options(args)
+            except ValueError as e:
+                print(f"[ERROR] {e}")
+                return
+            if command in ("UPLOAD-DIR", "SYNC"):
+                if not args or not os.path.isdir(args[0]):
+                    print("[ERROR] Please provide a directory to upload")
+                    return
+                if command == "UPLOAD-DIR":
+                    bulk.upload_dir(client, args[0], prefix=prefix, **options)
+                    return
+                try:
+                    sync.sync_dir(client, args[0], prefix=prefix, **options)
+                except (ConnectionError, RuntimeError) as e:
+                    print(f"[ERROR] Cannot read server hashes: {e}")
+            else:
+                try:
+                    bulk.download_all(client, args[0] if args else ".", user=user, **options)
+                except (ConnectionError, RuntimeError) as e:
+                    print(f"[ERROR] Cannot list server files: {e}")
         else:
             print("Usage:")
             print("  python client.py UPLOAD <filepath> [--slow <ms>]")
-            print("  python client.py DOWNLOAD <filename> [save_path]")
+            print("  python client.py DOWNLOAD <filename> [save_path] [--no-cache]")
             print("  python client.py LIST")
             print("  python client.py DELETE <filename>")
             print("  python client.py LOCKS")
             print("  python client.py LOGS")
+            print("  python client.py UPLOAD-DIR <directory> [--prefix <user>] [--concurrency N] [--retries N]")
+            print("  python client.py DOWNLOAD-ALL [dest_dir] [--user <user>] [--concurrency N] [--retries N]")
+            print("  python client.py SYNC <directory> [--prefix <user>] [--concurrency N] [--retries N]")
+            print("  python client.py CACHE-STATS | CACHE-CLEAR")
     else:
         # Interactive mode
         while True:
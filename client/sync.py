@@ -0,0 +1,120 @@
+"""
+Directory Sync
+SYNC <local_dir>: upload only the files whose content the server does not
+already have
+
+1. One HASHES round trip per server directory gives the size and stored
+   SHA-256 of every remote file.
+2. Local hashes come from a manifest cache (.sync_manifest.json in the
+   synced directory) keyed by relative path and validated by (size,
+   mtime_ns); only new or modified files are read and hashed.
+3. Files whose size and hash match the server are skipped; the rest are
+   uploaded in parallel through bulk.run_batch.
+"""
+
+import hashlib
+import json
+import os
+
+import bulk
+
+MANIFEST_NAME = ".sync_manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Local path -> (size, mtime_ns, sha256) cache persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def sha256(self, key, path):
+        """Hash of a local file, re-reading it only if size or mtime changed"""
+        st = os.stat(path)
+        cached = self.entries.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            self.hits += 1
+            return cached[2]
+        self.misses += 1
+        digest = file_sha256(path)
+        self.entries[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def prune(self, keys):
+        """Forget files that no longer exist locally"""
+        self.entries = {key: value for key, value in self.entries.items() if key in keys}
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"version": 1, "files": self.entries}, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+
+def fetch_hashes(client, user=None):
+    """HASHES (or HASHES <user>) -> {remote name: (size, sha256 or None)}"""
+    sock = client.connect()
+    if not sock:
+        raise ConnectionError("Cannot connect to server")
+    with sock:
+        client.send_command(sock, f"HASHES {user}" if user else "HASHES")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    lines = b"".join(chunks).decode(errors='replace').splitlines()
+    if not lines or not lines[0].startswith("SUCCESS"):
+        raise RuntimeError(lines[0] if lines else "Empty HASHES response")
+    remote = {}
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) == 3:
+            remote[parts[0]] = (int(parts[1]), None if parts[2] == "-" else parts[2])
+    return remote
+
+
+def sync_dir(client, directory, prefix=None, **options):
+    """Upload new or changed files under `directory`; returns TransferResults"""
+    files, rejected = bulk.local_files(directory, prefix, skip=(MANIFEST_NAME, MANIFEST_NAME + ".tmp"))
+
+    # One HASHES round trip per server directory the local names map to
+    remote = {}
+    for user in sorted({name.split("/")[0] if "/" in name else "" for _, name in files}):
+        remote.update(fetch_hashes(client, user or None))
+
+    manifest = Manifest(os.path.join(directory, MANIFEST_NAME))
+    changed = []
+    for path, name in files:
+        digest = manifest.sha256(name, path)
+        server = remote.get(name)
+        if server is None or server != (os.path.getsize(path), digest):
+            changed.append((path, name))
+    manifest.prune({name for _, name in files})
+    manifest.save()
+
+    print(f"[SYNC] {len(files)} local files: {len(files) - len(changed)} unchanged, "
+          f"{len(changed)} to upload ({manifest.hits} hashes from manifest, {manifest.misses} hashed)")
+    if rejected:
+        print(f"[SYNC] Skipping {len(rejected)} files the server cannot store")
+    if not changed:
+        print("[SYNC] Server is up to date")
+        return rejected
+    return bulk.run_batch("SYNC", bulk.upload_jobs(client, changed), **options) + rejected
@@ -0,0 +1,126 @@
+"""
+Client Transfer Engine
+Socket helpers used by FileClient for bulk file transfer
+
+- upload:   socket.sendfile (zero-copy on Linux) in large slices, with a
+            plain chunked loop only when throttling is requested (--slow)
+- download: recv_into one reusable buffer, written out through a memoryview,
+            so no bytes object is allocated per receive
+- progress: printed at most every PROGRESS_INTERVAL seconds (and at 100%)
+            instead of after every chunk
+- responses are read up to their newline; bytes that arrive after the
+  header line (the start of a download) are handed to the data loop
+"""
+
+import sys
+import time
+
+RECV_BUFFER_SIZE = 1024 * 1024     # Download buffer, reused for the whole transfer
+SENDFILE_SLICE = 8 * 1024 * 1024   # Bytes per sendfile call (progress granularity)
+SLOW_CHUNK_SIZE = 4096             # Chunk size of throttled (--slow) uploads
+PROGRESS_INTERVAL = 0.2            # Seconds between progress lines
+
+
+class Progress:
+    """Time-throttled progress line: [LABEL] Progress: 42.0% (n/total bytes)"""
+
+    def __init__(self, label, total, interval=PROGRESS_INTERVAL, stream=None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.done = 0
+        self._next = 0.0
+
+    def update(self, count):
+        self.done += count
+        now = time.monotonic()
+        if now >= self._next or self.done >= self.total:
+            self._next = now + self.interval
+            percent = (self.done / self.total) * 100 if self.total else 100.0
+            self.stream.write(f"\r[{self.label}] Progress: {percent:.1f}% ({self.done}/{self.total} bytes)")
+            self.stream.flush()
+
+    def finish(self):
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class ResponseReader:
+    """Reads newline-terminated server responses, keeping any bytes after them"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = bytearray()
+
+    def read_line(self, max_length=65536):
+        """Next response line (without the newline); '' if the server closed"""
+        while True:
+            end = self.pending.find(b"\n")
+            if end >= 0:
+                line = bytes(self.pending[:end])
+                del self.pending[:end + 1]
+                return line.decode(errors='replace').strip()
+            if len(self.pending) > max_length:
+                raise ValueError("Response line too long")
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                line = bytes(self.pending)
+                self.pending.clear()
+                return line.decode(errors='replace').strip()
+            self.pending += chunk
+
+    def take_pending(self):
+        """Bytes already received past the last line"""
+        data = bytes(self.pending)
+        self.pending.clear()
+        return data
+
+
+def send_file(sock, f, size, progress=None, slow_ms=0):
+    """Send `size` bytes of an open binary file; returns bytes sent"""
+    sent = 0
+    if slow_ms > 0:
+        # Throttled demo mode: small chunks with a pause after each
+        while sent < size:
+            chunk = f.read(min(SLOW_CHUNK_SIZE, size - sent))
+            if not chunk:
+                break
+            sock.sendall(chunk)
+            sent += len(chunk)
+            if progress:
+                progress.update(len(chunk))
+            time.sleep(slow_ms / 1000.0)
+        return sent
+
+    while sent < size:
+        count = sock.sendfile(f, offset=sent, count=min(SENDFILE_SLICE, size - sent))
+        if count == 0:
+            break
+        sent += count
+        if progress:
+            progress.update(count)
+    return sent
+
+
+def recv_file(sock, f, size, progress=None, initial=b"", buffer_size=RECV_BUFFER_SIZE):
+    """Receive `size` bytes into an open binary file; returns bytes received"""
+    received = 0
+    if initial:
+        initial = initial[:size]
+        f.write(initial)
+        received = len(initial)
+        if progress:
+            progress.update(received)
+
+    buf = bytearray(min(buffer_size, max(size - received, 1)))
+    view = memoryview(buf)
+    while received < size:
+        n = sock.recv_into(view, min(len(buf), size - received))
+        if n == 0:
+            break
+        f.write(view[:n])
+        received += n
+        if progress:
+            progress.update(n)
+    return received
@@ -9,6 +9,8 @@
  * - Thread synchronization with mutex
  */
 
+#define _GNU_SOURCE  // syncfs()
+
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
@@ -24,10 +26,13 @@
 #include <time.h>
 #include <dirent.h>
 #include <signal.h>
+#include <stdint.h>
+#include <zlib.h>
 #include <openssl/sha.h>
 
 // Configuration
 #define PORT 8888
+#define LISTEN_BACKLOG 128
 #define MAX_BUFFER 4096
 #define MAX_PATH 512
 #define STORAGE_DIR "./storage/"
@@ -42,11 +47,42 @@
 #define FAILURE_THRESHOLD 3
 #define BLOCK_SECONDS 600
 
+// Cold storage tier (at-rest compression of idle files)
+#define COLD_MAGIC "FSZ1"
+#define COLD_SUFFIX ".fz"
+#define UPLOAD_TEMP_SUFFIX ".upload"      // In-progress upload: "user/.name.upload"
+#define COLD_FRAME_SIZE (64 * 1024)       // Uncompressed bytes per independently compressed frame
+#define COLD_MIN_SIZE 4096                // Smaller files are never worth compressing
+#define COLD_AFTER_DEFAULT 604800         // Seconds without access before a file goes cold (7 days)
+#define COMPACT_INTERVAL_DEFAULT 600      // Seconds between compaction passes
+#define COMPACT_BUDGET_MB_DEFAULT 256     // Max input bytes compressed per pass (bounds CPU cost)
+#define COMPRESS_LEVEL_DEFAULT 6
+
+// Durability policy for uploads, .meta updates and the audit log
+#define DURABILITY_NONE 0                 // Rely on the kernel's writeback (fastest)
+#define DURABILITY_PER_FILE 1             // fsync every file and directory change before replying
+#define DURABILITY_GROUP_COMMIT 2         // Batch concurrent commits into one syncfs() per filesystem
+#define GROUP_COMMIT_MS_DEFAULT 5         // Max time a commit waits for others to join its batch
+#define GROUP_COMMIT_MAX_BATCH 64         // Flush early once this many commits are waiting
+
+// Large-file I/O mode
+#define IO_BUFFER_KB_DEFAULT 64           // Transfer/hash buffer size (was fixed at 4 KB)
+#define IO_BUFFER_KB_MAX 8192
+#define LARGE_FILE_MB_DEFAULT 8           // Files at least this big get preallocation + cache hints
+#define LARGE_IO_WINDOW (8L * 1024 * 1024) // Write-behind / drop-behind granularity
+
+// Hot small-file cache
+#define CACHE_MB_DEFAULT 32               // Total bytes of cached file contents (0 disables)
+#define CACHE_MAX_FILE_KB_DEFAULT 256     // Only files up to this size are cached
+#define CACHE_BUCKETS 1024
+
 // Global mutex for file locking simulation
 pthread_mutex_t file_locks_mutex = PTHREAD_MUTEX_INITIALIZER;
 pthread_mutex_t metadata_mutex = PTHREAD_MUTEX_INITIALIZER;
 pthread_mutex_t log_mutex = PTHREAD_MUTEX_INITIALIZER;
 pthread_mutex_t security_mutex = PTHREAD_MUTEX_INITIALIZER;
+pthread_mutex_t stats_mutex = PTHREAD_MUTEX_INITIALIZER;
+pthread_mutex_t cache_mutex = PTHREAD_MUTEX_INITIALIZER;
 
 // Structure to track locked files
 #define MAX_LOCKED_FILES 100
@@ -69,6 +105,106 @@ typedef struct {
 static client_security_t client_tracker[MAX_CLIENT_TRACK];
 static char auth_token[MAX_TOKEN_LEN] = AUTH_TOKEN_DEFAULT;
 
+// Cold storage configuration (overridable through environment variables)
+static long cold_after_seconds = COLD_AFTER_DEFAULT;
+static long compact_interval_seconds = COMPACT_INTERVAL_DEFAULT;
+static long compact_budget_bytes = COMPACT_BUDGET_MB_DEFAULT * 1024L * 1024L;
+static int compress_level = COMPRESS_LEVEL_DEFAULT;
+static int server_port = PORT;
+
+// Durability configuration and group-commit state
+static int durability_mode = DURABILITY_NONE;
+static long group_commit_ms = GROUP_COMMIT_MS_DEFAULT;
+
+// Large-file I/O configuration
+static size_t io_buffer_size = IO_BUFFER_KB_DEFAULT * 1024;
+static long large_file_bytes = LARGE_FILE_MB_DEFAULT * 1024L * 1024L;
+static int sync_fds[3];                   // One directory fd per distinct filesystem
+static int num_sync_fds = 0;
+static unsigned long commits_requested = 0;
+static unsigned long commits_completed = 0;
+
+// One per thread blocked in durability_barrier(); the committer hands each
+// waiter the syncfs result of the batch it was part of
+typedef struct commit_waiter {
+    struct commit_waiter *next;
+    int status;
+    int done;
+} commit_waiter_t;
+static commit_waiter_t *commit_waiters = NULL;
+pthread_mutex_t commit_mutex = PTHREAD_MUTEX_INITIALIZER;
+pthread_cond_t commit_requested_cond = PTHREAD_COND_INITIALIZER;
+pthread_cond_t commit_done_cond = PTHREAD_COND_INITIALIZER;
+
+// On-disk header of a cold file, followed by (frame_count + 1) uint64_t
+// frame offsets and the zlib-compressed frames (host byte order)
+typedef struct {
+    char magic[4];
+    uint32_t frame_size;
+    uint64_t original_size;
+    uint32_t frame_count;
+    uint32_t reserved;
+} cold_header_t;
+
+typedef struct {
+    int fd;
+    cold_header_t header;
+    uint64_t *offsets;
+} cold_file_t;
+
+// Server-wide counters reported by the STATS command
+typedef struct {
+    long compaction_passes;
+    long cold_files_compressed;
+    long cold_files_incompressible;
+    long cold_bytes_before;
+    long cold_bytes_after;
+    long cold_reads;
+    long cold_decompress_us;
+    long cold_decompress_max_us;
+    long fsync_calls;
+    long group_commits;
+    long group_commit_members;
+    long large_uploads;
+    long large_downloads;
+    long preallocated_bytes;
+    long conditional_not_modified;
+    long conditional_modified;
+} server_stats_t;
+
+static server_stats_t server_stats;
+
+// Hot file cache entry (reference counted: eviction never frees data being sent)
+typedef struct cache_entry {
+    char filename[MAX_FILENAME];
+    unsigned char *data;
+    long size;
+    char hash[SHA256_DIGEST_LENGTH * 2 + 1];
+    int refcount;
+    int linked;                           // Still reachable through the table / LRU list
+    struct cache_entry *bucket_next;
+    struct cache_entry *lru_prev;         // Towards most recently used
+    struct cache_entry *lru_next;         // Towards least recently used
+} cache_entry_t;
+
+typedef struct {
+    cache_entry_t *buckets[CACHE_BUCKETS];
+    cache_entry_t *lru_head;
+    cache_entry_t *lru_tail;
+    long capacity_bytes;
+    long max_file_bytes;
+    long used_bytes;
+    long entries;
+    unsigned long epoch;                  // Bumped by every invalidation
+    long hits;
+    long misses;
+    long insertions;
+    long evictions;
+    long invalidations;
+} file_cache_t;
+
+static file_cache_t file_cache;
+
 // Security helper functions
 const char *get_auth_token() {
     char *env = getenv("FILE_SERVER_AUTH");
@@ -235,24 +371,63 @@ typedef struct {
 // Function prototypes
 void *handle_client(void *arg);
 void handle_upload(int client_socket, char *filename, long filesize);
-void handle_download(int client_socket, char *filename);
+void handle_download(int client_socket, char *filename, long range_offset, long range_length);
 void handle_list(int client_socket, const char *username);
+void handle_hashes(int client_socket, const char *username);
+void handle_stat(int client_socket, const char *filename);
+void handle_download_if_none_match(int client_socket, char *filename, const char *etag);
 void handle_delete(int client_socket, char *filename);
 void handle_locks(int client_socket);
 void handle_logs(int client_socket);
+void handle_stats(int client_socket);
 void write_audit_log(const char *operation, const char *filename, const char *status, const char *details);
 void update_metadata(const char *filename, long filesize, const char *hash_hex);
+void write_metadata_locked(const char *filename, long filesize, const char *hash_hex);
+int commit_upload(const char *filename, const char *temp_path, const char *filepath,
+                  long filesize, const char *hash_hex);
 int acquire_file_lock(int fd, short lock_type);
 void release_file_lock(int fd);
 void send_response(int socket, const char *status, const char *message);
 char *get_timestamp();
 char *compute_sha256_file(const char *path);
+char *compute_sha256_fd(int fd);
 void write_security_event(const char *event, const char *ip, const char *filename, const char *details);
 int is_client_blocked(const char *ip);
 void record_failure(const char *ip, const char *reason);
 void record_success(const char *ip);
 int require_auth(char *buffer, int client_socket, const char *ip, char *command_out, size_t command_size);
 const char *get_auth_token();
+long env_long(const char *name, long default_value);
+void load_server_config();
+const char *durability_name();
+int sync_fd(int fd);
+int sync_parent_dir(const char *path);
+void init_durability();
+int durability_barrier();
+void *group_commit_thread(void *arg);
+int is_large_file(long size);
+void advise_sequential(int fd, off_t offset, off_t length);
+void drop_behind(int fd, off_t start, off_t end);
+void write_behind(int fd, off_t start, off_t end);
+ssize_t write_all(int fd, const void *data, size_t length);
+char *compute_sha256_buffer(const unsigned char *data, size_t length);
+int cache_accepts(long size);
+unsigned long cache_current_epoch();
+int serve_from_cache(int client_socket, const char *filename, long range_offset, long range_length);
+void cache_insert(const char *filename, unsigned char *data, long size, const char *hash, unsigned long epoch);
+void cache_invalidate(const char *filename);
+int read_metadata_hash(const char *filename, char *hash_out);
+void set_metadata_storage(const char *filename, const char *storage_lines);
+void build_hidden_path(const char *filename, const char *suffix, char *out_path);
+void build_cold_path(const char *filename, char *cold_path);
+int cold_open(const char *cold_path, cold_file_t *cf);
+void cold_close(cold_file_t *cf);
+long cold_stream(cold_file_t *cf, int out_fd, long offset, long length, SHA256_CTX *sha_ctx);
+char *compute_sha256_cold(cold_file_t *cf);
+int compress_to_cold(const char *plain_path, const char *tmp_path, const char *expected_hash, long *stored_size,
+                     long *bytes_read);
+void *compaction_thread(void *arg);
+void compact_storage_pass();
 
 /*
  * Main Server Function
@@ -271,14 +446,17 @@ int main() {
     // Ignore SIGPIPE (broken pipe) to prevent server crash
     signal(SIGPIPE, SIG_IGN);
 
-    // Load auth token from environment if provided
+    // Load auth token and server tuning from environment if provided
     get_auth_token();
+    load_server_config();
 
     // Create directories if they don't exist
     mkdir(STORAGE_DIR, 0755);
     mkdir(METADATA_DIR, 0755);
     mkdir(LOG_DIR, 0755);
 
+    init_durability();
+
     printf("=== SECURE FILE MANAGEMENT SERVER ===\n");
     printf("Operating System Concepts: File I/O, IPC, Locking, Deadlock Prevention\n\n");
 
@@ -300,7 +478,7 @@ int main() {
     memset(&server_addr, 0, sizeof(server_addr));
     server_addr.sin_family = AF_INET;
     server_addr.sin_addr.s_addr = INADDR_ANY;
-    server_addr.sin_port = htons(PORT);
+    server_addr.sin_port = htons(server_port);
 
     // Bind socket to address
     if (bind(server_socket, (struct sockaddr *)&server_addr, sizeof(server_addr)) < 0) {
@@ -309,16 +487,28 @@ int main() {
         exit(EXIT_FAILURE);
     }
 
-    // Listen for connections (max queue: 5)
-    if (listen(server_socket, 5) < 0) {
+    // Listen for connections (queue sized for bursts of concurrent clients)
+    if (listen(server_socket, LISTEN_BACKLOG) < 0) {
         perror("Listen failed");
         close(server_socket);
         exit(EXIT_FAILURE);
     }
 
-    printf("[SERVER] Listening on port %d...\n", PORT);
+    printf("[SERVER] Listening on port %d...\n", server_port);
+    printf("[SERVER] Durability mode: %s\n", durability_name());
     write_audit_log("SERVER_START", "N/A", "SUCCESS", "File server started");
 
+    // Background compaction of idle files into the cold (compressed) tier
+    if (cold_after_seconds > 0) {
+        pthread_t compactor;
+        if (pthread_create(&compactor, NULL, compaction_thread, NULL) == 0) {
+            pthread_detach(compactor);
+            printf("[SERVER] Cold tier enabled: files idle for %lds are compressed\n", cold_after_seconds);
+        } else {
+            perror("Compaction thread creation failed");
+        }
+    }
+
     // Accept client connections in loop
     while (1) {
         client_len = sizeof(client_addr);
@@ -416,10 +606,20 @@ void *handle_client(void *arg) {
         } else {
             send_response(client_socket, "ERROR", "Invalid UPLOAD command format");
         }
+    } else if (strncmp(command_buffer, "DOWNLOAD_IF_NONE_MATCH", 22) == 0) {
+        // Format: DOWNLOAD_IF_NONE_MATCH <filename> <sha256> - conditional download
+        char etag[65];
+        if (sscanf(command_buffer, "DOWNLOAD_IF_NONE_MATCH %s %64s", filename, etag) == 2) {
+            handle_download_if_none_match(client_socket, filename, etag);
+        } else {
+            send_response(client_socket, "ERROR", "Invalid DOWNLOAD_IF_NONE_MATCH command format");
+        }
     } else if (strncmp(command_buffer, "DOWNLOAD", 8) == 0) {
-        // Format: DOWNLOAD <filename>
-        if (sscanf(command_buffer, "DOWNLOAD %s", filename) == 1) {
-            handle_download(client_socket, filename);
+        // Format: DOWNLOAD <filename> [<offset> <length>] - optional byte range
+        long range_offset = 0, range_length = 0;
+        int fields = sscanf(command_buffer, "DOWNLOAD %s %ld %ld", filename, &range_offset, &range_length);
+        if (fields == 1 || (fields == 3 && range_offset >= 0 && range_length >= 0)) {
+            handle_download(client_socket, filename, range_offset, range_length);
         } else {
             send_response(client_socket, "ERROR", "Invalid DOWNLOAD command format");
         }
@@ -428,6 +628,18 @@ void *handle_client(void *arg) {
         char username[MAX_FILENAME] = "";
         sscanf(command_buffer, "LIST %s", username);
         handle_list(client_socket, username);
+    } else if (strncmp(command_buffer, "HASHES", 6) == 0) {
+        // Format: HASHES [username] - size and SHA-256 of every listed file
+        char username[MAX_FILENAME] = "";
+        sscanf(command_buffer, "HASHES %255s", username);
+        handle_hashes(client_socket, username);
+    } else if (strncmp(command_buffer, "STAT", 4) == 0 && strncmp(command_buffer, "STATS", 5) != 0) {
+        // Format: STAT <filename>
+        if (sscanf(command_buffer, "STAT %s", filename) == 1) {
+            handle_stat(client_socket, filename);
+        } else {
+            send_response(client_socket, "ERROR", "Invalid STAT command format");
+        }
     } else if (strncmp(command_buffer, "DELETE", 6) == 0) {
         // Format: DELETE <filename>
         if (sscanf(command_buffer, "DELETE %s", filename) == 1) {
@@ -439,6 +651,8 @@ void *handle_client(void *arg) {
         handle_locks(client_socket);
     } else if (strncmp(command_buffer, "LOGS", 4) == 0) {
         handle_logs(client_socket);
+    } else if (strncmp(command_buffer, "STATS", 5) == 0) {
+        handle_stats(client_socket);
     } else {
         send_response(client_socket, "ERROR", "Unknown command");
         write_security_event("ACCESS_VIOLATION", info->ip, "N/A", command_buffer);
@@ -457,12 +671,15 @@ void *handle_client(void *arg) {
  * - File locking with fcntl (F_WRLCK)
  * - Non-blocking lock acquisition (DEADLOCK AVOIDANCE)
  * - Timeout mechanism (DEADLOCK RECOVERY)
- * - UNIX file I/O (open, write)
+ * - UNIX file I/O (open, write, rename)
  * - Minimal critical section (lock held only during write)
+ * - Atomic replace: data goes to a temp file that is rename()d into place,
+ *   so readers never see a truncated or half-written file
  */
 void handle_upload(int client_socket, char *filename, long filesize) {
     char filepath[MAX_PATH];
-    char buffer[MAX_BUFFER];
+    char temp_path[MAX_PATH];
+    char *buffer;
     char dir_path[MAX_PATH];
     int fd;
     ssize_t bytes_read, total_read = 0;
@@ -496,7 +713,8 @@ void handle_upload(int client_socket, char *filename, long filesize) {
         // Create user directory if it doesn't exist
         struct stat st = {0};
         if (stat(dir_path, &st) == -1) {
-            if (mkdir(dir_path, 0755) != 0) {
+            // EEXIST: a concurrent upload to the same user created it first
+            if (mkdir(dir_path, 0755) != 0 && errno != EEXIST) {
                 send_response(client_socket, "ERROR", "Cannot create user directory");
                 write_audit_log("UPLOAD", filename, "FAILED", "Directory creation error");
                 return;
@@ -509,8 +727,10 @@ void handle_upload(int client_socket, char *filename, long filesize) {
         return;
     }
 
-    // Construct file path
+    // Construct file path and the per-upload temp file next to it
+    // (same directory, so the final rename() is atomic)
     snprintf(filepath, MAX_PATH, "%s%s", STORAGE_DIR, filename);
+    build_hidden_path(filename, UPLOAD_TEMP_SUFFIX, temp_path);
     printf("[DEBUG] Attempting to lock: %s\\n", filename);
     
     // DEADLOCK AVOIDANCE: Try to acquire GLOBAL write lock (non-blocking) BEFORE sending READY
@@ -522,8 +742,8 @@ void handle_upload(int client_socket, char *filename, long filesize) {
     }
     printf("[DEBUG] Global lock ACQUIRED\n");
     
-    // Now open and truncate file safely (protected by lock)
-    fd = open(filepath, O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    // Write into the temp file; the current version stays readable until commit
+    fd = open(temp_path, O_WRONLY | O_CREAT | O_TRUNC, 0644);
     if (fd < 0) {
         printf("[DEBUG] Open failed\n");
         release_global_lock(filename);
@@ -531,7 +751,33 @@ void handle_upload(int client_socket, char *filename, long filesize) {
         write_audit_log("UPLOAD", filename, "FAILED", "File creation error");
         return;
     }
-    printf("[DEBUG] File opened and truncated successfully, fd=%d\n", fd);
+    printf("[DEBUG] Temp file opened successfully, fd=%d\n", fd);
+
+    buffer = malloc(io_buffer_size);
+    if (buffer == NULL) {
+        release_global_lock(filename);
+        close(fd);
+        unlink(temp_path);
+        send_response(client_socket, "ERROR", "Out of memory");
+        write_audit_log("UPLOAD", filename, "FAILED", "Buffer allocation error");
+        return;
+    }
+
+    // LARGE FILES: reserve the declared size up front so the file is laid out
+    // contiguously instead of growing one buffer at a time
+    int large = is_large_file(filesize);
+    if (large) {
+        int rc = posix_fallocate(fd, 0, filesize);
+        if (rc == 0) {
+            pthread_mutex_lock(&stats_mutex);
+            server_stats.large_uploads++;
+            server_stats.preallocated_bytes += filesize;
+            pthread_mutex_unlock(&stats_mutex);
+        } else {
+            printf("[UPLOAD] Preallocation unavailable (%s)\n", strerror(rc));
+        }
+    }
+    off_t written_back = 0;
 
     // Send ready signal to client (AFTER global lock acquired and file prepared)
     send_response(client_socket, "READY", "Send file data");
@@ -539,6 +785,10 @@ void handle_upload(int client_socket, char *filename, long filesize) {
     printf("[UPLOAD] Acquiring write lock on %s\n", filename);
     printf("[UPLOAD] Starting bounded transfer: %ld bytes\n", filesize);
 
+    // Integrity hash is computed while receiving (no second pass over the file)
+    SHA256_CTX sha_ctx;
+    SHA256_Init(&sha_ctx);
+
     // DEADLOCK PREVENTION: Bounded read - read exactly filesize bytes
     // This prevents waiting for socket EOF which could cause deadlock
     start_time = time(NULL);
@@ -552,12 +802,13 @@ void handle_upload(int client_socket, char *filename, long filesize) {
             write_audit_log("UPLOAD", filename, "FAILED", "Timeout - deadlock recovery");
             release_global_lock(filename);
             close(fd);
-            unlink(filepath); // Remove incomplete file
+            unlink(temp_path); // Drop incomplete upload, previous version untouched
+            free(buffer);
             return;
         }
 
         long remaining = filesize - total_read;
-        long to_read = (remaining < MAX_BUFFER) ? remaining : MAX_BUFFER;
+        long to_read = (remaining < (long)io_buffer_size) ? remaining : (long)io_buffer_size;
         
         bytes_read = read(client_socket, buffer, to_read);
         
@@ -568,60 +819,148 @@ void handle_upload(int client_socket, char *filename, long filesize) {
             write_audit_log("UPLOAD", filename, "FAILED", "Connection error");
             release_global_lock(filename);
             close(fd);
-            unlink(filepath);
+            unlink(temp_path);
+            free(buffer);
             return;
         }
 
-        // CRITICAL SECTION: Write to file (lock held)
+        // CRITICAL SECTION: Write to temp file (lock held)
         ssize_t bytes_written = write(fd, buffer, bytes_read);
         if (bytes_written != bytes_read) {
             send_response(client_socket, "ERROR", "Write error");
             write_audit_log("UPLOAD", filename, "FAILED", "Write error");
             release_global_lock(filename);
             close(fd);
-            unlink(filepath);
+            unlink(temp_path);
+            free(buffer);
             return;
         }
+        SHA256_Update(&sha_ctx, buffer, bytes_read);
 
         total_read += bytes_read;
+
+        // LARGE FILES: start writeback of each finished window and drop the
+        // window before it, so one huge upload doesn't flood the page cache
+        if (large && total_read - written_back >= LARGE_IO_WINDOW) {
+            write_behind(fd, written_back, total_read);
+            if (written_back >= LARGE_IO_WINDOW) {
+                drop_behind(fd, 0, written_back - LARGE_IO_WINDOW);
+            }
+            written_back = total_read;
+        }
     }
+    free(buffer);
 
-    // Release lock BEFORE metadata/logging operations (MINIMIZE CRITICAL SECTION)
-    release_global_lock(filename);
+    // DURABILITY: data must be on disk before the rename makes it visible
+    if (durability_mode == DURABILITY_PER_FILE && sync_fd(fd) != 0) {
+        release_global_lock(filename);
+        close(fd);
+        unlink(temp_path);
+        send_response(client_socket, "ERROR", "Sync failed");
+        write_audit_log("UPLOAD", filename, "FAILED", "fsync error");
+        return;
+    }
+    if (large && durability_mode == DURABILITY_PER_FILE) {
+        drop_behind(fd, 0, filesize);  // Clean after fsync, so this releases the pages
+    }
     close(fd);
+
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    char hash_hex[SHA256_DIGEST_LENGTH * 2 + 1];
+    SHA256_Final(hash, &sha_ctx);
+    for (int i = 0; i < SHA256_DIGEST_LENGTH; i++) {
+        sprintf(hash_hex + (i * 2), "%02x", hash[i]);
+    }
+
+    // Atomically swap the new version in together with its metadata
+    int committed = commit_upload(filename, temp_path, filepath, filesize, hash_hex);
+    if (committed == -1) {
+        release_global_lock(filename);
+        unlink(temp_path);
+        send_response(client_socket, "ERROR", "Commit failed");
+        write_audit_log("UPLOAD", filename, "FAILED", "Rename error");
+        return;
+    }
+    if (committed == -2) {
+        // The new version is already live; only its durability is in doubt
+        release_global_lock(filename);
+        send_response(client_socket, "ERROR", "Sync failed");
+        write_audit_log("UPLOAD", filename, "FAILED", "Directory fsync error after rename");
+        return;
+    }
+
+    // Release lock BEFORE logging operations (MINIMIZE CRITICAL SECTION)
+    release_global_lock(filename);
     
     printf("[UPLOAD] Write lock released on %s\n", filename);
     printf("[UPLOAD] Successfully received %ld bytes\n", total_read);
 
-    // Compute integrity hash and update metadata (outside critical section)
-    char *hash_hex = compute_sha256_file(filepath);
-    if (hash_hex) {
-        update_metadata(filename, filesize, hash_hex);
-        free(hash_hex);
-    } else {
-        update_metadata(filename, filesize, "HASH_ERROR");
-    }
-    
     // Log operation (outside critical section)
     char log_details[256];
     snprintf(log_details, 256, "Size: %ld bytes", filesize);
     write_audit_log("UPLOAD", filename, "SUCCESS", log_details);
 
+    // GROUP COMMIT: file, rename, .meta and audit record become durable
+    // together with every other commit in the same batch
+    if (durability_barrier() != 0) {
+        send_response(client_socket, "ERROR", "Sync failed");
+        return;
+    }
+
     send_response(client_socket, "SUCCESS", "File uploaded successfully");
 }
 
+/*
+ * Upload Commit
+ * rename() the finished temp file over the destination. Readers that already
+ * opened the previous version keep streaming it; new readers see the new one.
+ * Rename and .meta rewrite happen under metadata_mutex, and DOWNLOAD opens the
+ * file and reads its hash under the same mutex, so a reader never pairs the
+ * new content with the old hash (or vice versa).
+ * Returns 0 on success, -1 if the rename failed (nothing changed), -2 if the
+ * new version is live but the per-file directory sync failed.
+ */
+int commit_upload(const char *filename, const char *temp_path, const char *filepath,
+                  long filesize, const char *hash_hex) {
+    char cold_path[MAX_PATH];
+    build_cold_path(filename, cold_path);
+
+    pthread_mutex_lock(&metadata_mutex);
+    if (rename(temp_path, filepath) != 0) {
+        pthread_mutex_unlock(&metadata_mutex);
+        return -1;
+    }
+    // A fresh upload supersedes any compressed copy from the cold tier
+    // and any cached copy of the previous version
+    unlink(cold_path);
+    cache_invalidate(filename);
+    write_metadata_locked(filename, filesize, hash_hex);
+    pthread_mutex_unlock(&metadata_mutex);
+
+    if (durability_mode == DURABILITY_PER_FILE && sync_parent_dir(filepath) != 0) {
+        return -2;
+    }
+    return 0;
+}
+
 /*
  * DOWNLOAD Handler
  * Demonstrates:
  * - File locking with F_RDLCK (read lock)
  * - Multiple readers allowed (demonstrates shared locks)
- * - UNIX file I/O (open, read, stat)
+ * - UNIX file I/O (open, read, lseek, stat)
+ * - Transparent decompression of cold (compressed) files
+ * - Hot small files served from the in-memory cache
+ * Optional byte range: range_length == 0 means "until end of file".
  */
-void handle_download(int client_socket, char *filename) {
+void handle_download(int client_socket, char *filename, long range_offset, long range_length) {
     char filepath[MAX_PATH];
-    char buffer[MAX_BUFFER];
+    char cold_path[MAX_PATH];
+    char expected_hash[SHA256_DIGEST_LENGTH * 2 + 1];
     int fd;
-    struct stat file_stat;
+    int is_cold = 0;
+    cold_file_t cold;
+    long file_size;
     ssize_t bytes_read;
 
     // Allow username/filename format, check for path traversal
@@ -636,94 +975,247 @@ void handle_download(int client_socket, char *filename) {
         return;
     }
 
-    snprintf(filepath, MAX_PATH, "%s%s", STORAGE_DIR, filename);
-
-    // Check if file exists using stat()
-    if (stat(filepath, &file_stat) != 0) {
-        send_response(client_socket, "ERROR", "File not found");
-        write_audit_log("DOWNLOAD", filename, "FAILED", "File not found");
+    // HOT CACHE: verified contents of small popular files, no syscalls on disk
+    if (serve_from_cache(client_socket, filename, range_offset, range_length) == 0) {
         return;
     }
 
-    // Open file for reading
+    snprintf(filepath, MAX_PATH, "%s%s", STORAGE_DIR, filename);
+
+    // Open the file and read its expected hash as one step with respect to
+    // commit_upload(), so the descriptor and the hash describe the same version
+    pthread_mutex_lock(&metadata_mutex);
+    unsigned long cache_epoch = cache_current_epoch();
+
+    // Hot files are served from the plain path; fall back to the cold tier
     fd = open(filepath, O_RDONLY);
+    if (fd < 0 && errno == ENOENT) {
+        build_cold_path(filename, cold_path);
+        if (access(cold_path, F_OK) != 0) {
+            pthread_mutex_unlock(&metadata_mutex);
+            send_response(client_socket, "ERROR", "File not found");
+            write_audit_log("DOWNLOAD", filename, "FAILED", "File not found");
+            return;
+        }
+        if (cold_open(cold_path, &cold) == 0) {
+            is_cold = 1;
+            fd = cold.fd;
+        }
+    }
+    read_metadata_hash(filename, expected_hash);
+    pthread_mutex_unlock(&metadata_mutex);
+
     if (fd < 0) {
         send_response(client_socket, "ERROR", "Cannot open file");
         write_audit_log("DOWNLOAD", filename, "FAILED", "Open error");
         return;
     }
 
+    if (is_cold) {
+        file_size = (long)cold.header.original_size;
+    } else {
+        struct stat file_stat;
+        fstat(fd, &file_stat);
+        file_size = file_stat.st_size;
+    }
+
     // Acquire read lock (allows multiple readers)
     if (acquire_file_lock(fd, F_RDLCK) != 0) {
         send_response(client_socket, "ERROR", "File is locked for writing");
         write_audit_log("DOWNLOAD", filename, "FAILED", "File locked");
-        close(fd);
+        if (is_cold) cold_close(&cold); else close(fd);
         return;
     }
 
-    printf("[DOWNLOAD] Acquired read lock on %s\n", filename);
+    printf("[DOWNLOAD] Acquired read lock on %s%s\n", filename, is_cold ? " (cold)" : "");
 
-    // Integrity check before sending
-    char expected_hash[SHA256_DIGEST_LENGTH * 2 + 1];
-    expected_hash[0] = '\0';
-    char meta_path[MAX_PATH];
-    snprintf(meta_path, MAX_PATH, "%s%s.meta", METADATA_DIR, filename);
-    int meta_fd = open(meta_path, O_RDONLY);
-    if (meta_fd >= 0) {
-        char meta_buf[512];
-        ssize_t mread = read(meta_fd, meta_buf, sizeof(meta_buf) - 1);
-        if (mread > 0) {
-            meta_buf[mread] = '\0';
-            char *hash_line = strstr(meta_buf, "SHA256:");
-            if (hash_line) {
-                sscanf(hash_line, "SHA256: %64s", expected_hash);
-            }
+    if (range_offset > file_size) {
+        send_response(client_socket, "ERROR", "Invalid range");
+        release_file_lock(fd);
+        if (is_cold) cold_close(&cold); else close(fd);
+        return;
+    }
+    long send_length = file_size - range_offset;
+    if (range_length > 0 && range_length < send_length) {
+        send_length = range_length;
+    }
+    int full_download = (range_offset == 0 && send_length == file_size);
+
+    // Streaming access pattern: ask for aggressive readahead
+    int large = is_large_file(send_length);
+    if (!is_cold) {
+        advise_sequential(fd, range_offset, send_length);
+    }
+
+    // Cacheable files are read into memory once and hashed, sent and cached
+    // from that buffer (instead of a hash pass plus a send pass over the file)
+    unsigned char *content = NULL;
+    if (full_download && !is_cold && cache_accepts(file_size)) {
+        content = malloc(file_size > 0 ? file_size : 1);
+        long got = 0;
+        while (content && got < file_size) {
+            ssize_t n = pread(fd, content + got, file_size - got, got);
+            if (n <= 0) break;
+            got += n;
+        }
+        if (content && got != file_size) {
+            free(content);
+            content = NULL;
+        }
+    }
+
+    // Integrity check before sending (whole-file downloads; cold frames are
+    // additionally protected by zlib's per-frame checksum)
+    char *actual_hash = NULL;
+    if (full_download) {
+        if (content) {
+            actual_hash = compute_sha256_buffer(content, file_size);
+        } else {
+            actual_hash = is_cold ? compute_sha256_cold(&cold) : compute_sha256_fd(fd);
+        }
+        if (expected_hash[0] != '\0' && actual_hash && strcmp(expected_hash, actual_hash) != 0) {
+            write_security_event("INTEGRITY_FAIL", "", filename, "Hash mismatch detected before download");
+            send_response(client_socket, "ERROR", "Integrity check failed");
+            release_file_lock(fd);
+            if (is_cold) cold_close(&cold); else close(fd);
+            free(actual_hash);
+            free(content);
+            return;
         }
-        close(meta_fd);
     }
 
-    char *actual_hash = compute_sha256_file(filepath);
-    if (expected_hash[0] != '\0' && actual_hash && strcmp(expected_hash, actual_hash) != 0) {
-        write_security_event("INTEGRITY_FAIL", "", filename, "Hash mismatch detected before download");
-        send_response(client_socket, "ERROR", "Integrity check failed");
+    // The I/O buffer must exist before the size header goes out: a failure
+    // after it would leave the client waiting for bytes that never come
+    char *buffer = NULL;
+    if (!content && !is_cold && (buffer = malloc(io_buffer_size)) == NULL) {
+        send_response(client_socket, "ERROR", "Server out of memory");
+        write_audit_log("DOWNLOAD", filename, "FAILED", "Buffer allocation error");
         release_file_lock(fd);
         close(fd);
         free(actual_hash);
         return;
     }
-    if (actual_hash) {
-        free(actual_hash);
-    }
 
-    // Send response with file size
+    // Send response with number of bytes that follow
     char response[256];
-    snprintf(response, 256, "SUCCESS %ld", file_stat.st_size);
+    snprintf(response, 256, "SUCCESS %ld", send_length);
     write(client_socket, response, strlen(response));
     write(client_socket, "\n", 1);
 
     // Send file data
     long total_sent = 0;
-    while ((bytes_read = read(fd, buffer, MAX_BUFFER)) > 0) {
-        ssize_t bytes_sent = write(client_socket, buffer, bytes_read);
-        if (bytes_sent != bytes_read) {
-            printf("[DOWNLOAD] Send error\n");
-            break;
+    if (content) {
+        total_sent = write_all(client_socket, content, file_size);
+        if (total_sent < 0) total_sent = 0;
+        if (total_sent == file_size && actual_hash) {
+            cache_insert(filename, content, file_size, actual_hash, cache_epoch);
+            content = NULL;  // Owned by the cache now
+        }
+        free(content);
+    } else if (is_cold) {
+        total_sent = cold_stream(&cold, client_socket, range_offset, send_length, NULL);
+        if (total_sent < 0) {
+            printf("[DOWNLOAD] Decompression error\n");
+            write_security_event("INTEGRITY_FAIL", "", filename, "Corrupt cold frame");
+            total_sent = 0;
+        }
+    } else {
+        off_t pos = range_offset;
+        off_t dropped = range_offset;
+        while (total_sent < send_length) {
+            long remaining = send_length - total_sent;
+            bytes_read = pread(fd, buffer, remaining < (long)io_buffer_size ? remaining : (long)io_buffer_size, pos);
+            if (bytes_read <= 0) break;
+            ssize_t bytes_sent = write_all(client_socket, buffer, bytes_read);
+            if (bytes_sent != bytes_read) {
+                printf("[DOWNLOAD] Send error\n");
+                break;
+            }
+            total_sent += bytes_sent;
+            pos += bytes_sent;
+
+            // LARGE FILES: pages already sent won't be needed again by this reader
+            if (large && pos - dropped >= LARGE_IO_WINDOW) {
+                drop_behind(fd, dropped, pos);
+                dropped = pos;
+            }
         }
-        total_sent += bytes_sent;
+        if (large) {
+            drop_behind(fd, dropped, pos);
+        }
+        free(buffer);
+    }
+    if (large) {
+        pthread_mutex_lock(&stats_mutex);
+        server_stats.large_downloads++;
+        pthread_mutex_unlock(&stats_mutex);
     }
 
     // Release lock and close
     release_file_lock(fd);
-    close(fd);
+    if (is_cold) cold_close(&cold); else close(fd);
+    free(actual_hash);
 
     printf("[DOWNLOAD] Released read lock on %s\n", filename);
     printf("[DOWNLOAD] Sent %ld bytes\n", total_sent);
 
     char log_details[256];
-    snprintf(log_details, 256, "Size: %ld bytes", total_sent);
+    if (full_download) {
+        snprintf(log_details, 256, "Size: %ld bytes", total_sent);
+    } else {
+        snprintf(log_details, 256, "Size: %ld bytes Range: %ld+%ld", total_sent, range_offset, send_length);
+    }
     write_audit_log("DOWNLOAD", filename, "SUCCESS", log_details);
 }
 
+/*
+ * Directory entry -> listed name and size, shared by LIST and HASHES.
+ * Hidden files are skipped, except cold-tier copies (".<name>.fz") which are
+ * listed under their original name and size. Returns 0 if the entry is listed.
+ */
+static int describe_entry(const char *dirpath, const char *d_name,
+                          char *display_name, size_t name_size, long *display_size) {
+    char filepath[MAX_PATH];
+    struct stat file_stat;
+    size_t name_len = strlen(d_name);
+    size_t suffix_len = strlen(COLD_SUFFIX);
+
+    snprintf(filepath, MAX_PATH, "%s/%s", dirpath, d_name);
+
+    if (d_name[0] == '.') {
+        if (name_len <= suffix_len + 1 || strcmp(d_name + name_len - suffix_len, COLD_SUFFIX) != 0) {
+            return -1;
+        }
+        cold_file_t cold;
+        if (cold_open(filepath, &cold) != 0) return -1;
+        *display_size = (long)cold.header.original_size;
+        cold_close(&cold);
+        snprintf(display_name, name_size, "%.*s", (int)(name_len - suffix_len - 1), d_name + 1);
+        return 0;
+    }
+    if (stat(filepath, &file_stat) == 0 && S_ISREG(file_stat.st_mode)) {
+        *display_size = file_stat.st_size;
+        snprintf(display_name, name_size, "%s", d_name);
+        return 0;
+    }
+    return -1;
+}
+
+// Append one line to a response buffer, sending full buffers as we go so
+// large directories never overflow it. Returns -1 if the client went away.
+static int append_chunked(int client_socket, char *response, size_t capacity,
+                          size_t *used, const char *line, size_t line_len) {
+    if (*used + line_len >= capacity) {
+        if (write_all(client_socket, response, *used) != (ssize_t)*used) {
+            return -1;
+        }
+        *used = 0;
+    }
+    memcpy(response + *used, line, line_len);
+    *used += line_len;
+    return 0;
+}
+
 /*
  * LIST Handler
  * Demonstrates: Directory traversal, stat() usage
@@ -731,10 +1223,9 @@ void handle_download(int client_socket, char *filename) {
 void handle_list(int client_socket, const char *username) {
     DIR *dir;
     struct dirent *entry;
-    struct stat file_stat;
     char dirpath[MAX_PATH];
-    char filepath[MAX_PATH];
     char response[MAX_BUFFER * 4];
+    size_t used;
     int count = 0;
 
     // If username provided, list only that user's directory
@@ -751,35 +1242,204 @@ void handle_list(int client_socket, const char *username) {
     }
 
     strcpy(response, "SUCCESS\n");
+    used = strlen(response);
 
     while ((entry = readdir(dir)) != NULL) {
-        if (entry->d_name[0] == '.') continue; // Skip hidden files
-        
-        snprintf(filepath, MAX_PATH, "%s/%s", dirpath, entry->d_name);
-        
-        if (stat(filepath, &file_stat) == 0 && S_ISREG(file_stat.st_mode)) {
-            char line[512];
-            if (username && username[0] != '\0') {
-                // Include username prefix for consistency
-                snprintf(line, 512, "%s/%s (%ld bytes)\n", username, entry->d_name, file_stat.st_size);
-            } else {
-                snprintf(line, 512, "%s (%ld bytes)\n", entry->d_name, file_stat.st_size);
-            }
-            strcat(response, line);
-            count++;
+        char display_name[MAX_FILENAME];
+        long display_size;
+        if (describe_entry(dirpath, entry->d_name, display_name, sizeof(display_name), &display_size) != 0) {
+            continue;
+        }
+
+        char line[512];
+        int line_len;
+        if (username && username[0] != '\0') {
+            // Include username prefix for consistency
+            line_len = snprintf(line, 512, "%s/%s (%ld bytes)\n", username, display_name, display_size);
+        } else {
+            line_len = snprintf(line, 512, "%s (%ld bytes)\n", display_name, display_size);
         }
+        if (line_len >= 512) line_len = 511;
+
+        if (append_chunked(client_socket, response, sizeof(response), &used, line, (size_t)line_len) != 0) {
+            closedir(dir);
+            return;
+        }
+        count++;
     }
 
     closedir(dir);
 
     if (count == 0) {
-        strcat(response, "No files found\n");
+        strcpy(response + used, "No files found\n");
+        used += strlen("No files found\n");
     }
 
-    write(client_socket, response, strlen(response));
+    write_all(client_socket, response, used);
     write_audit_log("LIST", username && username[0] ? username : "all", "SUCCESS", "Listed files");
 }
 
+/*
+ * HASHES Handler
+ * Format: HASHES [username]
+ * Size and stored SHA-256 (from metadata/<name>.meta, "-" if unknown) of every
+ * file LIST would show, in one round trip:
+ *   SUCCESS\n<name> <size> <sha256>\n...
+ * Used by the client's SYNC mode to skip files the server already has.
+ */
+void handle_hashes(int client_socket, const char *username) {
+    DIR *dir;
+    struct dirent *entry;
+    char dirpath[MAX_PATH];
+    char response[MAX_BUFFER * 4];
+    size_t used;
+
+    if (username && username[0] != '\0' && (strchr(username, '/') || strstr(username, ".."))) {
+        send_response(client_socket, "ERROR", "Invalid username");
+        return;
+    }
+
+    if (username && username[0] != '\0') {
+        snprintf(dirpath, MAX_PATH, "%s%s", STORAGE_DIR, username);
+    } else {
+        snprintf(dirpath, MAX_PATH, "%s", STORAGE_DIR);
+    }
+
+    dir = opendir(dirpath);
+    if (dir == NULL) {
+        // A user without files yet: empty result rather than an error
+        send_response(client_socket, "SUCCESS", "");
+        return;
+    }
+
+    strcpy(response, "SUCCESS\n");
+    used = strlen(response);
+
+    while ((entry = readdir(dir)) != NULL) {
+        char display_name[MAX_FILENAME];
+        char full_name[MAX_FILENAME * 2];
+        char hash[65];
+        long display_size;
+
+        // Same lock as commit_upload() around both the stat and the hash read,
+        // so size and hash describe one version
+        pthread_mutex_lock(&metadata_mutex);
+        if (describe_entry(dirpath, entry->d_name, display_name, sizeof(display_name), &display_size) != 0) {
+            pthread_mutex_unlock(&metadata_mutex);
+            continue;
+        }
+        if (username && username[0] != '\0') {
+            snprintf(full_name, sizeof(full_name), "%s/%s", username, display_name);
+        } else {
+            snprintf(full_name, sizeof(full_name), "%s", display_name);
+        }
+        int have_hash = read_metadata_hash(full_name, hash) == 0 && strcmp(hash, "UNKNOWN") != 0;
+        pthread_mutex_unlock(&metadata_mutex);
+
+        char line[MAX_FILENAME * 2 + 96];
+        int line_len = snprintf(line, sizeof(line), "%s %ld %s\n", full_name, display_size,
+                                have_hash ? hash : "-");
+        if (line_len >= (int)sizeof(line)) line_len = sizeof(line) - 1;
+
+        if (append_chunked(client_socket, response, sizeof(response), &used, line, (size_t)line_len) != 0) {
+            closedir(dir);
+            return;
+        }
+    }
+
+    closedir(dir);
+    write_all(client_socket, response, used);
+    write_audit_log("HASHES", username && username[0] ? username : "all", "SUCCESS", "Listed file hashes");
+}
+
+/*
+ * Look up a stored file (plain or cold tier) for STAT / DOWNLOAD_IF_NONE_MATCH
+ * Returns 0 and fills size and hash ("-" if unknown), -1 if not found
+ */
+static int lookup_file(const char *filename, long *size, char *hash) {
+    char dirpath[MAX_PATH];
+    char display_name[MAX_FILENAME];
+
+    // Split "user/name" into the directory and entry describe_entry() expects
+    const char *slash = strrchr(filename, '/');
+    const char *base = slash ? slash + 1 : filename;
+    if (slash) {
+        snprintf(dirpath, MAX_PATH, "%s%.*s", STORAGE_DIR, (int)(slash - filename), filename);
+    } else {
+        snprintf(dirpath, MAX_PATH, "%s", STORAGE_DIR);
+    }
+
+    pthread_mutex_lock(&metadata_mutex);
+    int found = describe_entry(dirpath, base, display_name, sizeof(display_name), size) == 0;
+    if (!found) {
+        // Cold tier: ".<name>.fz" next to where the plain file would be
+        char cold_entry[MAX_FILENAME + 8];
+        snprintf(cold_entry, sizeof(cold_entry), ".%s%s", base, COLD_SUFFIX);
+        found = describe_entry(dirpath, cold_entry, display_name, sizeof(display_name), size) == 0;
+    }
+    int have_hash = found && read_metadata_hash(filename, hash) == 0 && strcmp(hash, "UNKNOWN") != 0;
+    pthread_mutex_unlock(&metadata_mutex);
+
+    if (!have_hash) {
+        strcpy(hash, "-");
+    }
+    return found ? 0 : -1;
+}
+
+/*
+ * STAT Handler
+ * Format: STAT <filename>  ->  SUCCESS <size> <sha256|->
+ */
+void handle_stat(int client_socket, const char *filename) {
+    char hash[65];
+    char message[128];
+    long size;
+
+    if (strstr(filename, "..") || filename[0] == '/') {
+        send_response(client_socket, "ERROR", "Invalid filename");
+        return;
+    }
+    if (lookup_file(filename, &size, hash) != 0) {
+        send_response(client_socket, "ERROR", "File not found");
+        return;
+    }
+    snprintf(message, sizeof(message), "%ld %s", size, hash);
+    send_response(client_socket, "SUCCESS", message);
+}
+
+/*
+ * Conditional DOWNLOAD Handler
+ * Format: DOWNLOAD_IF_NONE_MATCH <filename> <sha256>
+ * If the stored hash equals <sha256> the client's copy is current:
+ *   NOT_MODIFIED <size> <sha256>
+ * and no file data is read or sent. Otherwise this is a plain DOWNLOAD.
+ */
+void handle_download_if_none_match(int client_socket, char *filename, const char *etag) {
+    char hash[65];
+    char message[128];
+    long size;
+
+    if (strstr(filename, "..") || filename[0] == '/') {
+        send_response(client_socket, "ERROR", "Invalid filename");
+        return;
+    }
+    if (lookup_file(filename, &size, hash) == 0 && strcmp(hash, "-") != 0 && strcmp(hash, etag) == 0) {
+        pthread_mutex_lock(&stats_mutex);
+        server_stats.conditional_not_modified++;
+        pthread_mutex_unlock(&stats_mutex);
+
+        snprintf(message, sizeof(message), "%ld %s", size, hash);
+        send_response(client_socket, "NOT_MODIFIED", message);
+        write_audit_log("DOWNLOAD", filename, "NOT_MODIFIED", "Client copy is current");
+        return;
+    }
+
+    pthread_mutex_lock(&stats_mutex);
+    server_stats.conditional_modified++;
+    pthread_mutex_unlock(&stats_mutex);
+    handle_download(client_socket, filename, 0, 0);
+}
+
 /*
  * DELETE Handler
  * Demonstrates:
@@ -804,16 +1464,31 @@ void handle_delete(int client_socket, char *filename) {
 
     snprintf(filepath, MAX_PATH, "%s%s", STORAGE_DIR, filename);
 
-    // Check if file exists
-    if (access(filepath, F_OK) != 0) {
-        send_response(client_socket, "ERROR", "File not found");
-        write_audit_log("DELETE", filename, "FAILED", "File not found");
+    // Same global lock as UPLOAD and compaction: the file cannot be replaced or
+    // moved to the cold tier while it is being deleted
+    if (acquire_global_lock(filename) != 0) {
+        send_response(client_socket, "ERROR", "File is currently in use");
+        write_audit_log("DELETE", filename, "FAILED", "File locked");
         return;
     }
 
+    // Check if file exists (a cold file lives under its compressed name)
+    if (access(filepath, F_OK) != 0) {
+        char cold_path[MAX_PATH];
+        build_cold_path(filename, cold_path);
+        if (access(cold_path, F_OK) != 0) {
+            release_global_lock(filename);
+            send_response(client_socket, "ERROR", "File not found");
+            write_audit_log("DELETE", filename, "FAILED", "File not found");
+            return;
+        }
+        snprintf(filepath, MAX_PATH, "%s", cold_path);
+    }
+
     // Open file to acquire lock
     fd = open(filepath, O_RDWR);
     if (fd < 0) {
+        release_global_lock(filename);
         send_response(client_socket, "ERROR", "Cannot open file");
         write_audit_log("DELETE", filename, "FAILED", "Open error");
         return;
@@ -821,6 +1496,7 @@ void handle_delete(int client_socket, char *filename) {
 
     // Try to acquire exclusive lock (prevents deletion if file is in use)
     if (acquire_file_lock(fd, F_WRLCK) != 0) {
+        release_global_lock(filename);
         send_response(client_socket, "ERROR", "File is currently in use");
         write_audit_log("DELETE", filename, "FAILED", "File locked");
         close(fd);
@@ -832,9 +1508,20 @@ void handle_delete(int client_socket, char *filename) {
     // Close and delete using unlink()
     close(fd);
     
-    if (unlink(filepath) == 0) {
-        send_response(client_socket, "SUCCESS", "File deleted successfully");
+    int unlinked = (unlink(filepath) == 0);
+    if (unlinked) {
+        cache_invalidate(filename);
+    }
+    release_global_lock(filename);
+
+    if (unlinked) {
         write_audit_log("DELETE", filename, "SUCCESS", "File deleted");
+        if ((durability_mode == DURABILITY_PER_FILE && sync_parent_dir(filepath) != 0) ||
+            durability_barrier() != 0) {
+            send_response(client_socket, "ERROR", "Sync failed");
+            return;
+        }
+        send_response(client_socket, "SUCCESS", "File deleted successfully");
         printf("[DELETE] File %s deleted\n", filename);
     } else {
         send_response(client_socket, "ERROR", "Delete failed");
@@ -940,6 +1627,70 @@ void handle_logs(int client_socket) {
     }
 }
 
+/*
+ * STATS Handler - View server counters (cold tier, durability, large-file I/O, hot cache)
+ */
+void handle_stats(int client_socket) {
+    char response[MAX_BUFFER * 2];
+    server_stats_t snapshot;
+
+    pthread_mutex_lock(&stats_mutex);
+    snapshot = server_stats;
+    pthread_mutex_unlock(&stats_mutex);
+
+    file_cache_t cache;
+    pthread_mutex_lock(&cache_mutex);
+    cache = file_cache;
+    pthread_mutex_unlock(&cache_mutex);
+
+    long avg_us = snapshot.cold_reads ? snapshot.cold_decompress_us / snapshot.cold_reads : 0;
+    snprintf(response, sizeof(response),
+             "SUCCESS\nServer Statistics:\n"
+             "  compaction_passes: %ld\n"
+             "  cold_files_compressed: %ld\n"
+             "  cold_files_incompressible: %ld\n"
+             "  cold_bytes_before: %ld\n"
+             "  cold_bytes_after: %ld\n"
+             "  cold_bytes_reclaimed: %ld\n"
+             "  cold_reads: %ld\n"
+             "  cold_decompress_avg_us: %ld\n"
+             "  cold_decompress_max_us: %ld\n"
+             "  durability_mode: %s\n"
+             "  fsync_calls: %ld\n"
+             "  group_commits: %ld\n"
+             "  group_commit_avg_batch: %.2f\n"
+             "  io_buffer_bytes: %zu\n"
+             "  large_file_threshold_bytes: %ld\n"
+             "  large_uploads: %ld\n"
+             "  large_downloads: %ld\n"
+             "  preallocated_bytes: %ld\n"
+             "  conditional_not_modified: %ld\n"
+             "  conditional_modified: %ld\n"
+             "  cache_capacity_bytes: %ld\n"
+             "  cache_used_bytes: %ld\n"
+             "  cache_entries: %ld\n"
+             "  cache_hits: %ld\n"
+             "  cache_misses: %ld\n"
+             "  cache_hit_rate: %.3f\n"
+             "  cache_evictions: %ld\n"
+             "  cache_invalidations: %ld\n",
+             snapshot.compaction_passes, snapshot.cold_files_compressed,
+             snapshot.cold_files_incompressible, snapshot.cold_bytes_before,
+             snapshot.cold_bytes_after, snapshot.cold_bytes_before - snapshot.cold_bytes_after,
+             snapshot.cold_reads, avg_us, snapshot.cold_decompress_max_us,
+             durability_name(), snapshot.fsync_calls, snapshot.group_commits,
+             snapshot.group_commits ? (double)snapshot.group_commit_members / snapshot.group_commits : 0.0,
+             io_buffer_size, large_file_bytes, snapshot.large_uploads,
+             snapshot.large_downloads, snapshot.preallocated_bytes,
+             snapshot.conditional_not_modified, snapshot.conditional_modified,
+             cache.capacity_bytes, cache.used_bytes, cache.entries, cache.hits, cache.misses,
+             (cache.hits + cache.misses) ? (double)cache.hits / (cache.hits + cache.misses) : 0.0,
+             cache.evictions, cache.invalidations);
+
+    write(client_socket, response, strlen(response));
+    write_audit_log("STATS", "N/A", "SUCCESS", "Viewed statistics");
+}
+
 /*
  * File Locking Functions
  * Demonstrates: fcntl() system call for file locking
@@ -986,13 +1737,26 @@ void release_file_lock(int fd) {
  * Demonstrates: Thread synchronization with mutex
  */
 void update_metadata(const char *filename, long filesize, const char *hash_hex) {
+    // THREAD SYNCHRONIZATION: Lock mutex for metadata access
+    pthread_mutex_lock(&metadata_mutex);
+    write_metadata_locked(filename, filesize, hash_hex);
+    pthread_mutex_unlock(&metadata_mutex);
+}
+
+// Caller must hold metadata_mutex
+void write_metadata_locked(const char *filename, long filesize, const char *hash_hex) {
     char metapath[MAX_PATH];
     int fd;
     char metadata[768];
     time_t now = time(NULL);
 
-    // THREAD SYNCHRONIZATION: Lock mutex for metadata access
-    pthread_mutex_lock(&metadata_mutex);
+    // Per-user files ("user/name") keep their metadata in a matching subdirectory
+    const char *slash = strchr(filename, '/');
+    if (slash) {
+        char user_dir[MAX_PATH];
+        snprintf(user_dir, MAX_PATH, "%s%.*s", METADATA_DIR, (int)(slash - filename), filename);
+        mkdir(user_dir, 0755);
+    }
 
     snprintf(metapath, MAX_PATH, "%s%s.meta", METADATA_DIR, filename);
     
@@ -1002,10 +1766,12 @@ void update_metadata(const char *filename, long filesize, const char *hash_hex)
                  "Filename: %s\nSize: %ld\nUploadTime: %sSHA256: %s\n",
                  filename, filesize, ctime(&now), hash_hex ? hash_hex : "UNKNOWN");
         write(fd, metadata, strlen(metadata));
+        if (durability_mode == DURABILITY_PER_FILE) {
+            sync_fd(fd);
+            sync_parent_dir(metapath);
+        }
         close(fd);
     }
-
-    pthread_mutex_unlock(&metadata_mutex);
 }
 
 /*
@@ -1029,6 +1795,9 @@ void write_audit_log(const char *operation, const char *filename,
         snprintf(log_entry, 1024, "[%s] OPERATION=%s FILE=%s STATUS=%s DETAILS=%s\n",
                  timestamp, operation, filename, status, details);
         write(fd, log_entry, strlen(log_entry));
+        if (durability_mode == DURABILITY_PER_FILE) {
+            sync_fd(fd);
+        }
         close(fd);
         free(timestamp);
     }
@@ -1060,20 +1829,60 @@ void write_security_event(const char *event, const char *ip, const char *filenam
 }
 
 char *compute_sha256_file(const char *path) {
-    unsigned char hash[SHA256_DIGEST_LENGTH];
-    unsigned char buffer[MAX_BUFFER];
-    SHA256_CTX sha_ctx;
     int fd = open(path, O_RDONLY);
     if (fd < 0) {
         return NULL;
     }
+    char *output = compute_sha256_fd(fd);
+    close(fd);
+    return output;
+}
+
+char *compute_sha256_buffer(const unsigned char *data, size_t length) {
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    SHA256(data, length, hash);
+
+    char *output = malloc(SHA256_DIGEST_LENGTH * 2 + 1);
+    if (!output) return NULL;
+    for (int i = 0; i < SHA256_DIGEST_LENGTH; i++) {
+        sprintf(output + (i * 2), "%02x", hash[i]);
+    }
+    output[SHA256_DIGEST_LENGTH * 2] = '\0';
+    return output;
+}
+
+// Hash an already open file from the start (uses pread, file offset untouched)
+char *compute_sha256_fd(int fd) {
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    unsigned char *buffer = malloc(io_buffer_size);
+    SHA256_CTX sha_ctx;
+
+    if (buffer == NULL) {
+        return NULL;
+    }
+    advise_sequential(fd, 0, 0);
+
+    // LARGE FILES: drop hashed pages behind us so a hash pass doesn't fill
+    // the page cache (the send loop that follows drops its own pages too)
+    struct stat st;
+    int large = fstat(fd, &st) == 0 && is_large_file(st.st_size);
 
     SHA256_Init(&sha_ctx);
     ssize_t bytes_read;
-    while ((bytes_read = read(fd, buffer, sizeof(buffer))) > 0) {
+    off_t pos = 0;
+    off_t dropped = 0;
+    while ((bytes_read = pread(fd, buffer, io_buffer_size, pos)) > 0) {
         SHA256_Update(&sha_ctx, buffer, bytes_read);
+        pos += bytes_read;
+        if (large && pos - dropped >= LARGE_IO_WINDOW) {
+            drop_behind(fd, dropped, pos);
+            dropped = pos;
+        }
     }
-    close(fd);
+    if (large) {
+        drop_behind(fd, dropped, pos);
+    }
+    free(buffer);
 
     SHA256_Final(hash, &sha_ctx);
 
@@ -1086,9 +1895,877 @@ char *compute_sha256_file(const char *path) {
     return output;
 }
 
+/*
+ * Configuration Helpers
+ */
+long env_long(const char *name, long default_value) {
+    char *env = getenv(name);
+    if (env == NULL || *env == '\0') {
+        return default_value;
+    }
+    char *end;
+    long value = strtol(env, &end, 10);
+    if (*end != '\0' || value < 0) {
+        printf("[CONFIG] Ignoring invalid %s=%s\n", name, env);
+        return default_value;
+    }
+    return value;
+}
+
+void load_server_config() {
+    server_port = (int)env_long("FILE_SERVER_PORT", PORT);
+    if (server_port < 1 || server_port > 65535) server_port = PORT;
+
+    char *durability = getenv("FILE_SERVER_DURABILITY");
+    if (durability == NULL || strcmp(durability, "none") == 0) {
+        durability_mode = DURABILITY_NONE;
+    } else if (strcmp(durability, "per-file") == 0) {
+        durability_mode = DURABILITY_PER_FILE;
+    } else if (strcmp(durability, "group-commit") == 0) {
+        durability_mode = DURABILITY_GROUP_COMMIT;
+    } else {
+        printf("[CONFIG] Unknown FILE_SERVER_DURABILITY=%s, using none\n", durability);
+    }
+    group_commit_ms = env_long("FILE_SERVER_GROUP_COMMIT_MS", GROUP_COMMIT_MS_DEFAULT);
+
+    long buffer_kb = env_long("FILE_SERVER_IO_BUFFER_KB", IO_BUFFER_KB_DEFAULT);
+    if (buffer_kb < 4) buffer_kb = 4;
+    if (buffer_kb > IO_BUFFER_KB_MAX) buffer_kb = IO_BUFFER_KB_MAX;
+    io_buffer_size = (size_t)buffer_kb * 1024;
+    large_file_bytes = env_long("FILE_SERVER_LARGE_FILE_MB", LARGE_FILE_MB_DEFAULT) * 1024L * 1024L;
+
+    file_cache.capacity_bytes = env_long("FILE_SERVER_CACHE_MB", CACHE_MB_DEFAULT) * 1024L * 1024L;
+    file_cache.max_file_bytes = env_long("FILE_SERVER_CACHE_MAX_FILE_KB", CACHE_MAX_FILE_KB_DEFAULT) * 1024L;
+
+    cold_after_seconds = env_long("FILE_SERVER_COLD_AFTER", COLD_AFTER_DEFAULT);
+    compact_interval_seconds = env_long("FILE_SERVER_COMPACT_INTERVAL", COMPACT_INTERVAL_DEFAULT);
+    if (compact_interval_seconds < 1) compact_interval_seconds = 1;
+    compact_budget_bytes = env_long("FILE_SERVER_COMPACT_BUDGET_MB", COMPACT_BUDGET_MB_DEFAULT) * 1024L * 1024L;
+    compress_level = (int)env_long("FILE_SERVER_COMPRESS_LEVEL", COMPRESS_LEVEL_DEFAULT);
+    if (compress_level < 1 || compress_level > 9) compress_level = COMPRESS_LEVEL_DEFAULT;
+}
+
+/*
+ * Metadata Helpers
+ */
+int read_metadata_hash(const char *filename, char *hash_out) {
+    char meta_path[MAX_PATH];
+    hash_out[0] = '\0';
+    snprintf(meta_path, MAX_PATH, "%s%s.meta", METADATA_DIR, filename);
+    int meta_fd = open(meta_path, O_RDONLY);
+    if (meta_fd < 0) {
+        return -1;
+    }
+    char meta_buf[1024];
+    ssize_t mread = read(meta_fd, meta_buf, sizeof(meta_buf) - 1);
+    close(meta_fd);
+    if (mread <= 0) {
+        return -1;
+    }
+    meta_buf[mread] = '\0';
+    char *hash_line = strstr(meta_buf, "SHA256:");
+    if (hash_line == NULL || sscanf(hash_line, "SHA256: %64s", hash_out) != 1) {
+        hash_out[0] = '\0';
+        return -1;
+    }
+    return 0;
+}
+
+// Replace the storage tier lines ("Storage:", "StoredSize:") of a .meta file
+void set_metadata_storage(const char *filename, const char *storage_lines) {
+    char metapath[MAX_PATH];
+    char meta_buf[1024];
+    char updated[1024 + 128];
+    size_t used = 0;
+
+    snprintf(metapath, MAX_PATH, "%s%s.meta", METADATA_DIR, filename);
+
+    pthread_mutex_lock(&metadata_mutex);
+
+    int fd = open(metapath, O_RDONLY);
+    ssize_t mread = (fd >= 0) ? read(fd, meta_buf, sizeof(meta_buf) - 1) : 0;
+    if (fd >= 0) close(fd);
+    meta_buf[mread > 0 ? mread : 0] = '\0';
+
+    updated[0] = '\0';
+    char *saveptr = NULL;
+    for (char *line = strtok_r(meta_buf, "\n", &saveptr); line; line = strtok_r(NULL, "\n", &saveptr)) {
+        if (strncmp(line, "Storage:", 8) == 0 || strncmp(line, "StoredSize:", 11) == 0) continue;
+        used += snprintf(updated + used, sizeof(updated) - used, "%s\n", line);
+        if (used >= sizeof(updated)) break;
+    }
+    if (used < sizeof(updated)) {
+        snprintf(updated + used, sizeof(updated) - used, "%s", storage_lines);
+    }
+
+    fd = open(metapath, O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    if (fd >= 0) {
+        write(fd, updated, strlen(updated));
+        close(fd);
+    }
+
+    pthread_mutex_unlock(&metadata_mutex);
+}
+
+/*
+ * Cold Storage Tier
+ * Files not accessed for cold_after_seconds are rewritten by a background
+ * thread into a framed format: every COLD_FRAME_SIZE bytes are compressed
+ * independently, and a frame offset table after the header lets ranged
+ * reads decompress only the frames they touch.
+ * The cold copy of "user/a.txt" is stored as "user/.a.txt.fz".
+ */
+// "user/name" -> "./storage/user/.name<suffix>" (hidden from LIST and LOCKS)
+void build_hidden_path(const char *filename, const char *suffix, char *out_path) {
+    const char *base = strrchr(filename, '/');
+    if (base) {
+        snprintf(out_path, MAX_PATH, "%s%.*s/.%s%s", STORAGE_DIR,
+                 (int)(base - filename), filename, base + 1, suffix);
+    } else {
+        snprintf(out_path, MAX_PATH, "%s.%s%s", STORAGE_DIR, filename, suffix);
+    }
+}
+
+void build_cold_path(const char *filename, char *cold_path) {
+    build_hidden_path(filename, COLD_SUFFIX, cold_path);
+}
+
+int cold_open(const char *cold_path, cold_file_t *cf) {
+    struct stat st;
+    cf->offsets = NULL;
+    cf->fd = open(cold_path, O_RDONLY);
+    if (cf->fd < 0) {
+        return -1;
+    }
+
+    if (fstat(cf->fd, &st) != 0 ||
+        pread(cf->fd, &cf->header, sizeof(cf->header), 0) != (ssize_t)sizeof(cf->header) ||
+        memcmp(cf->header.magic, COLD_MAGIC, 4) != 0 ||
+        cf->header.frame_size == 0 || cf->header.frame_size > 16 * 1024 * 1024 ||
+        cf->header.frame_count != (cf->header.original_size + cf->header.frame_size - 1) / cf->header.frame_size) {
+        close(cf->fd);
+        cf->fd = -1;
+        return -1;
+    }
+
+    size_t table_size = ((size_t)cf->header.frame_count + 1) * sizeof(uint64_t);
+    cf->offsets = malloc(table_size);
+    if (cf->offsets == NULL ||
+        pread(cf->fd, cf->offsets, table_size, sizeof(cf->header)) != (ssize_t)table_size ||
+        cf->offsets[cf->header.frame_count] > (uint64_t)st.st_size) {
+        cold_close(cf);
+        return -1;
+    }
+    for (uint32_t i = 0; i < cf->header.frame_count; i++) {
+        if (cf->offsets[i] > cf->offsets[i + 1]) {
+            cold_close(cf);
+            return -1;
+        }
+    }
+    return 0;
+}
+
+void cold_close(cold_file_t *cf) {
+    if (cf->fd >= 0) close(cf->fd);
+    free(cf->offsets);
+    cf->fd = -1;
+    cf->offsets = NULL;
+}
+
+/*
+ * Decompress the frames covering [offset, offset + length) and write them to
+ * out_fd (when >= 0) and/or feed them to sha_ctx. Returns bytes produced, -1 on
+ * a corrupt frame. Only client-facing streams (out_fd >= 0) count towards the
+ * cold read / decompression stats; the integrity hash pass before a full
+ * download would otherwise count every download twice.
+ */
+long cold_stream(cold_file_t *cf, int out_fd, long offset, long length, SHA256_CTX *sha_ctx) {
+    uLong bound = compressBound(cf->header.frame_size);
+    unsigned char *frame = malloc(cf->header.frame_size);
+    unsigned char *packed = malloc(bound);
+    long produced = 0;
+    long elapsed_us = 0;
+
+    if (frame == NULL || packed == NULL) {
+        free(frame);
+        free(packed);
+        return -1;
+    }
+
+    uint32_t idx = (uint32_t)(offset / cf->header.frame_size);
+    long skip = offset % cf->header.frame_size;
+
+    while (produced < length && idx < cf->header.frame_count) {
+        uint64_t packed_len = cf->offsets[idx + 1] - cf->offsets[idx];
+        if (packed_len > bound ||
+            pread(cf->fd, packed, packed_len, cf->offsets[idx]) != (ssize_t)packed_len) {
+            produced = -1;
+            break;
+        }
+
+        struct timespec t0, t1;
+        uLongf frame_len = cf->header.frame_size;
+        clock_gettime(CLOCK_MONOTONIC, &t0);
+        int rc = uncompress(frame, &frame_len, packed, packed_len);
+        clock_gettime(CLOCK_MONOTONIC, &t1);
+        elapsed_us += (t1.tv_sec - t0.tv_sec) * 1000000L + (t1.tv_nsec - t0.tv_nsec) / 1000;
+        if (rc != Z_OK) {
+            produced = -1;
+            break;
+        }
+
+        long chunk = (long)frame_len - skip;
+        if (chunk > length - produced) chunk = length - produced;
+        if (chunk > 0) {
+            if (sha_ctx) SHA256_Update(sha_ctx, frame + skip, chunk);
+            if (out_fd >= 0 && write_all(out_fd, frame + skip, chunk) != chunk) {
+                break;
+            }
+            produced += chunk;
+        }
+        skip = 0;
+        idx++;
+    }
+
+    free(frame);
+    free(packed);
+
+    if (out_fd >= 0) {
+        pthread_mutex_lock(&stats_mutex);
+        server_stats.cold_reads++;
+        server_stats.cold_decompress_us += elapsed_us;
+        if (elapsed_us > server_stats.cold_decompress_max_us) {
+            server_stats.cold_decompress_max_us = elapsed_us;
+        }
+        pthread_mutex_unlock(&stats_mutex);
+    }
+
+    return produced;
+}
+
+char *compute_sha256_cold(cold_file_t *cf) {
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    SHA256_CTX sha_ctx;
+
+    SHA256_Init(&sha_ctx);
+    if (cold_stream(cf, -1, 0, (long)cf->header.original_size, &sha_ctx) < 0) {
+        return NULL;
+    }
+    SHA256_Final(hash, &sha_ctx);
+
+    char *output = malloc(SHA256_DIGEST_LENGTH * 2 + 1);
+    if (!output) return NULL;
+    for (int i = 0; i < SHA256_DIGEST_LENGTH; i++) {
+        sprintf(output + (i * 2), "%02x", hash[i]);
+    }
+    output[SHA256_DIGEST_LENGTH * 2] = '\0';
+    return output;
+}
+
+/*
+ * Write the framed compressed form of plain_path to tmp_path.
+ * The input is hashed while compressing and must match expected_hash
+ * (when known) so that corrupt files never enter the cold tier.
+ * Returns 0 on success, 1 if compression saves less than 10%,
+ * 2 on hash mismatch, -1 on I/O error. *bytes_read is set to the input
+ * read whatever the result, so callers can charge failed attempts too.
+ */
+int compress_to_cold(const char *plain_path, const char *tmp_path, const char *expected_hash, long *stored_size,
+                     long *bytes_read) {
+    struct stat st;
+    *bytes_read = 0;
+    int in_fd = open(plain_path, O_RDONLY);
+    if (in_fd < 0) return -1;
+    if (fstat(in_fd, &st) != 0) {
+        close(in_fd);
+        return -1;
+    }
+    advise_sequential(in_fd, 0, 0);
+
+    cold_header_t header;
+    memcpy(header.magic, COLD_MAGIC, 4);
+    header.frame_size = COLD_FRAME_SIZE;
+    header.original_size = (uint64_t)st.st_size;
+    header.frame_count = (uint32_t)((header.original_size + COLD_FRAME_SIZE - 1) / COLD_FRAME_SIZE);
+    header.reserved = 0;
+
+    size_t table_size = ((size_t)header.frame_count + 1) * sizeof(uint64_t);
+    uLong bound = compressBound(COLD_FRAME_SIZE);
+    uint64_t *offsets = malloc(table_size);
+    unsigned char *frame = malloc(COLD_FRAME_SIZE);
+    unsigned char *packed = malloc(bound);
+    int out_fd = open(tmp_path, O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    int result = 0;
+
+    if (offsets == NULL || frame == NULL || packed == NULL || out_fd < 0) {
+        result = -1;
+        goto done;
+    }
+
+    SHA256_CTX sha_ctx;
+    SHA256_Init(&sha_ctx);
+
+    uint64_t pos = sizeof(header) + table_size;
+    for (uint32_t i = 0; i < header.frame_count; i++) {
+        ssize_t frame_len = read(in_fd, frame, COLD_FRAME_SIZE);
+        if (frame_len <= 0) {
+            result = -1;
+            goto done;
+        }
+        *bytes_read += frame_len;
+        SHA256_Update(&sha_ctx, frame, frame_len);
+
+        uLongf packed_len = bound;
+        if (compress2(packed, &packed_len, frame, frame_len, compress_level) != Z_OK ||
+            pwrite(out_fd, packed, packed_len, pos) != (ssize_t)packed_len) {
+            result = -1;
+            goto done;
+        }
+        offsets[i] = pos;
+        pos += packed_len;
+    }
+    offsets[header.frame_count] = pos;
+
+    // Always synced: the plain copy is unlinked as soon as this one is renamed
+    if (pwrite(out_fd, &header, sizeof(header), 0) != (ssize_t)sizeof(header) ||
+        pwrite(out_fd, offsets, table_size, sizeof(header)) != (ssize_t)table_size ||
+        sync_fd(out_fd) != 0) {
+        result = -1;
+        goto done;
+    }
+
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    char actual_hash[SHA256_DIGEST_LENGTH * 2 + 1];
+    SHA256_Final(hash, &sha_ctx);
+    for (int i = 0; i < SHA256_DIGEST_LENGTH; i++) {
+        sprintf(actual_hash + (i * 2), "%02x", hash[i]);
+    }
+    if (expected_hash && expected_hash[0] != '\0' && strcmp(expected_hash, actual_hash) != 0) {
+        result = 2;
+        goto done;
+    }
+
+    *stored_size = (long)pos;
+    if ((long)pos > st.st_size - st.st_size / 10) {
+        result = 1;
+    }
+
+done:
+    if (out_fd >= 0) close(out_fd);
+    drop_behind(in_fd, 0, 0);
+    close(in_fd);
+    free(offsets);
+    free(frame);
+    free(packed);
+    if (result != 0) unlink(tmp_path);
+    return result;
+}
+
+// Compress one storage file ("name" or "user/name") if it has gone cold.
+// Returns the number of input bytes read (counts against the pass budget,
+// whether or not compaction succeeded); skipped files cost nothing.
+static long compact_file(const char *filename, time_t now) {
+    char filepath[MAX_PATH];
+    char cold_path[MAX_PATH];
+    char tmp_path[MAX_PATH + 8];
+    char expected_hash[SHA256_DIGEST_LENGTH * 2 + 1];
+    char meta_path[MAX_PATH];
+    struct stat st;
+
+    snprintf(filepath, MAX_PATH, "%s%s", STORAGE_DIR, filename);
+    if (stat(filepath, &st) != 0 || !S_ISREG(st.st_mode) || st.st_size < COLD_MIN_SIZE) {
+        return 0;
+    }
+    time_t last_used = st.st_atime > st.st_mtime ? st.st_atime : st.st_mtime;
+    if (difftime(now, last_used) < cold_after_seconds) {
+        return 0;
+    }
+
+    // Files already found incompressible or corrupt are skipped until re-uploaded
+    snprintf(meta_path, MAX_PATH, "%s%s.meta", METADATA_DIR, filename);
+    int meta_fd = open(meta_path, O_RDONLY);
+    if (meta_fd >= 0) {
+        char meta_buf[1024];
+        ssize_t mread = read(meta_fd, meta_buf, sizeof(meta_buf) - 1);
+        close(meta_fd);
+        if (mread > 0) {
+            meta_buf[mread] = '\0';
+            if (strstr(meta_buf, "Storage: incompressible") || strstr(meta_buf, "Storage: corrupt")) return 0;
+            // Failed attempts back off for one cold period instead of re-reading every pass
+            char *failed = strstr(meta_buf, "Storage: failed ");
+            if (failed && difftime(now, (time_t)atol(failed + 16)) < cold_after_seconds) return 0;
+        }
+    }
+
+    // Same global lock as UPLOAD: never compress a file that is being written
+    if (acquire_global_lock(filename) != 0) {
+        return 0;
+    }
+
+    build_cold_path(filename, cold_path);
+    snprintf(tmp_path, sizeof(tmp_path), "%s.tmp", cold_path);
+    read_metadata_hash(filename, expected_hash);
+
+    long stored_size = 0;
+    long bytes_read = 0;
+    int settled = 0;                // Outcome recorded in the metadata
+    int rc = compress_to_cold(filepath, tmp_path, expected_hash, &stored_size, &bytes_read);
+    if (rc == 0) {
+        // Readers that already opened the plain file keep their descriptor;
+        // new readers find the cold copy once the plain name is gone
+        if (rename(tmp_path, cold_path) == 0 && sync_parent_dir(cold_path) == 0 &&
+            unlink(filepath) == 0) {
+            char lines[128];
+            snprintf(lines, sizeof(lines), "Storage: cold\nStoredSize: %ld\n", stored_size);
+            set_metadata_storage(filename, lines);
+
+            pthread_mutex_lock(&stats_mutex);
+            server_stats.cold_files_compressed++;
+            server_stats.cold_bytes_before += st.st_size;
+            server_stats.cold_bytes_after += stored_size;
+            pthread_mutex_unlock(&stats_mutex);
+
+            char details[256];
+            snprintf(details, sizeof(details), "Compressed %ld -> %ld bytes", (long)st.st_size, stored_size);
+            write_audit_log("COMPACT", filename, "SUCCESS", details);
+            settled = 1;
+        } else {
+            unlink(tmp_path);
+        }
+    } else if (rc == 1) {
+        set_metadata_storage(filename, "Storage: incompressible\n");
+        pthread_mutex_lock(&stats_mutex);
+        server_stats.cold_files_incompressible++;
+        pthread_mutex_unlock(&stats_mutex);
+        settled = 1;
+    } else if (rc == 2) {
+        // Reported once: the marker keeps later passes from re-reading the file
+        set_metadata_storage(filename, "Storage: corrupt\n");
+        write_security_event("INTEGRITY_FAIL", "", filename, "Hash mismatch detected during compaction");
+        write_audit_log("COMPACT", filename, "FAILED", "Hash mismatch");
+        settled = 1;
+    }
+    if (!settled) {
+        // I/O error (e.g. ENOSPC on the .tmp) or a failed rename/sync/unlink
+        char lines[64];
+        snprintf(lines, sizeof(lines), "Storage: failed %ld\n", (long)now);
+        set_metadata_storage(filename, lines);
+        write_audit_log("COMPACT", filename, "FAILED", "I/O error");
+    }
+
+    release_global_lock(filename);
+    return bytes_read;
+}
+
+void compact_storage_pass() {
+    DIR *dir = opendir(STORAGE_DIR);
+    struct dirent *entry;
+    time_t now = time(NULL);
+    long budget = compact_budget_bytes;
+
+    if (dir == NULL) return;
+
+    // Storage holds top-level files and one level of per-user directories
+    while (budget > 0 && (entry = readdir(dir)) != NULL) {
+        char path[MAX_PATH];
+        struct stat st;
+        if (entry->d_name[0] == '.') continue;
+
+        snprintf(path, MAX_PATH, "%s%s", STORAGE_DIR, entry->d_name);
+        if (stat(path, &st) != 0) continue;
+
+        if (S_ISREG(st.st_mode)) {
+            budget -= compact_file(entry->d_name, now);
+        } else if (S_ISDIR(st.st_mode)) {
+            DIR *user_dir = opendir(path);
+            struct dirent *user_entry;
+            if (user_dir == NULL) continue;
+            while (budget > 0 && (user_entry = readdir(user_dir)) != NULL) {
+                char filename[MAX_FILENAME];
+                if (user_entry->d_name[0] == '.') continue;
+                if (snprintf(filename, sizeof(filename), "%s/%s", entry->d_name, user_entry->d_name) >= (int)sizeof(filename)) {
+                    continue;
+                }
+                budget -= compact_file(filename, now);
+            }
+            closedir(user_dir);
+        }
+    }
+    closedir(dir);
+
+    pthread_mutex_lock(&stats_mutex);
+    server_stats.compaction_passes++;
+    pthread_mutex_unlock(&stats_mutex);
+}
+
+void *compaction_thread(void *arg) {
+    (void)arg;
+    while (1) {
+        sleep((unsigned int)compact_interval_seconds);
+        compact_storage_pass();
+    }
+    return NULL;
+}
+
+/*
+ * Durability & Group Commit
+ * none         - no fsync; the kernel writes data back on its own schedule
+ * per-file     - each upload fsyncs its data, directory entry, .meta and
+ *                audit record before replying (4+ fsyncs per upload)
+ * group-commit - committers queue up for the group commit thread, which waits
+ *                up to group_commit_ms for more commits to join and then makes
+ *                the whole batch durable with one syncfs() per filesystem
+ */
+const char *durability_name() {
+    switch (durability_mode) {
+        case DURABILITY_PER_FILE: return "per-file";
+        case DURABILITY_GROUP_COMMIT: return "group-commit";
+        default: return "none";
+    }
+}
+
+int sync_fd(int fd) {
+    pthread_mutex_lock(&stats_mutex);
+    server_stats.fsync_calls++;
+    pthread_mutex_unlock(&stats_mutex);
+    return fsync(fd);
+}
+
+// Make a create/rename/unlink inside a directory durable
+int sync_parent_dir(const char *path) {
+    char dir_path[MAX_PATH];
+    snprintf(dir_path, MAX_PATH, "%s", path);
+    char *slash = strrchr(dir_path, '/');
+    if (slash == NULL) return -1;
+    *slash = '\0';
+
+    int dir_fd = open(dir_path, O_RDONLY | O_DIRECTORY);
+    if (dir_fd < 0) return -1;
+    int rc = sync_fd(dir_fd);
+    close(dir_fd);
+    return rc;
+}
+
+void init_durability() {
+    const char *dirs[3] = {STORAGE_DIR, METADATA_DIR, LOG_DIR};
+    dev_t devices[3];
+
+    if (durability_mode != DURABILITY_GROUP_COMMIT) {
+        return;
+    }
+
+    // syncfs() flushes a whole filesystem, so one fd per distinct device suffices
+    for (int i = 0; i < 3; i++) {
+        struct stat st;
+        int duplicate = 0;
+        if (stat(dirs[i], &st) != 0) continue;
+        for (int j = 0; j < num_sync_fds; j++) {
+            if (devices[j] == st.st_dev) duplicate = 1;
+        }
+        if (duplicate) continue;
+        int fd = open(dirs[i], O_RDONLY | O_DIRECTORY);
+        if (fd < 0) continue;
+        devices[num_sync_fds] = st.st_dev;
+        sync_fds[num_sync_fds++] = fd;
+    }
+
+    pthread_t committer;
+    if (pthread_create(&committer, NULL, group_commit_thread, NULL) != 0) {
+        perror("Group commit thread creation failed");
+        durability_mode = DURABILITY_PER_FILE;
+        return;
+    }
+    pthread_detach(committer);
+}
+
+// Block until everything written so far is durable (group-commit mode only)
+int durability_barrier() {
+    if (durability_mode != DURABILITY_GROUP_COMMIT) {
+        return 0;
+    }
+
+    commit_waiter_t waiter = { NULL, 0, 0 };
+    pthread_mutex_lock(&commit_mutex);
+    waiter.next = commit_waiters;
+    commit_waiters = &waiter;
+    commits_requested++;
+    pthread_cond_signal(&commit_requested_cond);
+    while (!waiter.done) {
+        pthread_cond_wait(&commit_done_cond, &commit_mutex);
+    }
+    pthread_mutex_unlock(&commit_mutex);
+    return waiter.status;
+}
+
+void *group_commit_thread(void *arg) {
+    (void)arg;
+    pthread_mutex_lock(&commit_mutex);
+    while (1) {
+        while (commits_completed == commits_requested) {
+            pthread_cond_wait(&commit_requested_cond, &commit_mutex);
+        }
+
+        // Let concurrent committers join the batch, bounded by the max delay
+        struct timespec deadline;
+        clock_gettime(CLOCK_REALTIME, &deadline);
+        deadline.tv_nsec += group_commit_ms * 1000000L;
+        deadline.tv_sec += deadline.tv_nsec / 1000000000L;
+        deadline.tv_nsec %= 1000000000L;
+        while (commits_requested - commits_completed < GROUP_COMMIT_MAX_BATCH) {
+            if (pthread_cond_timedwait(&commit_requested_cond, &commit_mutex, &deadline) == ETIMEDOUT) {
+                break;
+            }
+        }
+
+        // Everyone queued so far is in this batch; later arrivals start the next
+        unsigned long batch_end = commits_requested;
+        unsigned long batch_size = batch_end - commits_completed;
+        commit_waiter_t *batch = commit_waiters;
+        commit_waiters = NULL;
+        pthread_mutex_unlock(&commit_mutex);
+
+        int status = 0;
+        for (int i = 0; i < num_sync_fds; i++) {
+            if (syncfs(sync_fds[i]) != 0) {
+                status = -1;
+            }
+        }
+
+        pthread_mutex_lock(&stats_mutex);
+        server_stats.group_commits++;
+        server_stats.group_commit_members += batch_size;
+        pthread_mutex_unlock(&stats_mutex);
+
+        pthread_mutex_lock(&commit_mutex);
+        commits_completed = batch_end;
+        for (commit_waiter_t *w = batch; w != NULL; w = w->next) {
+            w->status = status;
+            w->done = 1;
+        }
+        pthread_cond_broadcast(&commit_done_cond);
+    }
+    return NULL;
+}
+
+/*
+ * Large-File I/O
+ * Transfers of at least large_file_bytes get kernel hints:
+ * - fallocate() of the declared upload size (contiguous layout)
+ * - sync_file_range() write-behind and POSIX_FADV_DONTNEED drop-behind,
+ *   so one huge transfer does not evict other clients' hot files
+ * Streaming reads and hashing always announce POSIX_FADV_SEQUENTIAL.
+ */
+int is_large_file(long size) {
+    return large_file_bytes > 0 && size >= large_file_bytes;
+}
+
+void advise_sequential(int fd, off_t offset, off_t length) {
+    posix_fadvise(fd, offset, length, POSIX_FADV_SEQUENTIAL);
+}
+
+void drop_behind(int fd, off_t start, off_t end) {
+    posix_fadvise(fd, start, end > start ? end - start : 0, POSIX_FADV_DONTNEED);
+}
+
+void write_behind(int fd, off_t start, off_t end) {
+    sync_file_range(fd, start, end - start, SYNC_FILE_RANGE_WRITE);
+}
+
+/*
+ * Hot File Cache
+ * Bounded LRU of verified contents of small files. Entries are dropped by
+ * commit_upload() and DELETE, which both run under the file's global lock;
+ * a download only inserts what it read if no invalidation happened since
+ * it opened the file (cache epoch check), so stale data is never cached.
+ */
+static unsigned long cache_bucket(const char *filename) {
+    unsigned long h = 5381;
+    for (const unsigned char *p = (const unsigned char *)filename; *p; p++) {
+        h = h * 33 + *p;
+    }
+    return h % CACHE_BUCKETS;
+}
+
+int cache_accepts(long size) {
+    return file_cache.capacity_bytes > 0 && size <= file_cache.max_file_bytes &&
+           size <= file_cache.capacity_bytes;
+}
+
+// Callers snapshot the epoch together with opening the file (metadata_mutex held)
+unsigned long cache_current_epoch() {
+    pthread_mutex_lock(&cache_mutex);
+    unsigned long epoch = file_cache.epoch;
+    pthread_mutex_unlock(&cache_mutex);
+    return epoch;
+}
+
+static void cache_lru_unlink(cache_entry_t *entry) {
+    if (entry->lru_prev) entry->lru_prev->lru_next = entry->lru_next;
+    else file_cache.lru_head = entry->lru_next;
+    if (entry->lru_next) entry->lru_next->lru_prev = entry->lru_prev;
+    else file_cache.lru_tail = entry->lru_prev;
+    entry->lru_prev = entry->lru_next = NULL;
+}
+
+static void cache_lru_push_front(cache_entry_t *entry) {
+    entry->lru_prev = NULL;
+    entry->lru_next = file_cache.lru_head;
+    if (file_cache.lru_head) file_cache.lru_head->lru_prev = entry;
+    file_cache.lru_head = entry;
+    if (!file_cache.lru_tail) file_cache.lru_tail = entry;
+}
+
+static void cache_entry_free(cache_entry_t *entry) {
+    free(entry->data);
+    free(entry);
+}
+
+// Remove from table and LRU list (cache_mutex held); freed once unreferenced
+static void cache_remove_locked(cache_entry_t *entry) {
+    cache_entry_t **link = &file_cache.buckets[cache_bucket(entry->filename)];
+    while (*link && *link != entry) {
+        link = &(*link)->bucket_next;
+    }
+    if (*link) *link = entry->bucket_next;
+    cache_lru_unlink(entry);
+    entry->linked = 0;
+    file_cache.used_bytes -= entry->size;
+    file_cache.entries--;
+    if (entry->refcount == 0) {
+        cache_entry_free(entry);
+    }
+}
+
+static cache_entry_t *cache_find_locked(const char *filename) {
+    cache_entry_t *entry = file_cache.buckets[cache_bucket(filename)];
+    while (entry && strcmp(entry->filename, filename) != 0) {
+        entry = entry->bucket_next;
+    }
+    return entry;
+}
+
+// Returns 0 if the request was answered from the cache, -1 on a miss
+int serve_from_cache(int client_socket, const char *filename, long range_offset, long range_length) {
+    if (file_cache.capacity_bytes <= 0) {
+        return -1;
+    }
+
+    pthread_mutex_lock(&cache_mutex);
+    cache_entry_t *entry = cache_find_locked(filename);
+    if (!entry) {
+        file_cache.misses++;
+        pthread_mutex_unlock(&cache_mutex);
+        return -1;
+    }
+    file_cache.hits++;
+    entry->refcount++;
+    cache_lru_unlink(entry);
+    cache_lru_push_front(entry);
+    pthread_mutex_unlock(&cache_mutex);
+
+    long total_sent = 0;
+    if (range_offset > entry->size) {
+        send_response(client_socket, "ERROR", "Invalid range");
+    } else {
+        long send_length = entry->size - range_offset;
+        if (range_length > 0 && range_length < send_length) {
+            send_length = range_length;
+        }
+
+        char response[256];
+        snprintf(response, 256, "SUCCESS %ld\n", send_length);
+        write(client_socket, response, strlen(response));
+        total_sent = write_all(client_socket, entry->data + range_offset, send_length);
+        if (total_sent < 0) total_sent = 0;
+
+        printf("[DOWNLOAD] Sent %ld bytes of %s from cache\n", total_sent, filename);
+
+        char log_details[256];
+        if (range_offset == 0 && send_length == entry->size) {
+            snprintf(log_details, 256, "Size: %ld bytes (cached)", total_sent);
+        } else {
+            snprintf(log_details, 256, "Size: %ld bytes Range: %ld+%ld (cached)",
+                     total_sent, range_offset, send_length);
+        }
+        write_audit_log("DOWNLOAD", filename, "SUCCESS", log_details);
+    }
+
+    pthread_mutex_lock(&cache_mutex);
+    entry->refcount--;
+    if (entry->refcount == 0 && !entry->linked) {
+        cache_entry_free(entry);
+    }
+    pthread_mutex_unlock(&cache_mutex);
+    return 0;
+}
+
+// Takes ownership of data (freed here if the entry is not cached)
+void cache_insert(const char *filename, unsigned char *data, long size, const char *hash, unsigned long epoch) {
+    if (!cache_accepts(size)) {
+        free(data);
+        return;
+    }
+
+    cache_entry_t *entry = calloc(1, sizeof(cache_entry_t));
+    if (!entry) {
+        free(data);
+        return;
+    }
+    snprintf(entry->filename, MAX_FILENAME, "%s", filename);
+    snprintf(entry->hash, sizeof(entry->hash), "%s", hash);
+    entry->data = data;
+    entry->size = size;
+    entry->linked = 1;
+
+    pthread_mutex_lock(&cache_mutex);
+    // The file may have been replaced or deleted since it was opened
+    if (epoch != file_cache.epoch || cache_find_locked(filename)) {
+        pthread_mutex_unlock(&cache_mutex);
+        cache_entry_free(entry);
+        return;
+    }
+
+    while (file_cache.lru_tail && file_cache.used_bytes + size > file_cache.capacity_bytes) {
+        cache_remove_locked(file_cache.lru_tail);
+        file_cache.evictions++;
+    }
+
+    unsigned long bucket = cache_bucket(filename);
+    entry->bucket_next = file_cache.buckets[bucket];
+    file_cache.buckets[bucket] = entry;
+    cache_lru_push_front(entry);
+    file_cache.used_bytes += size;
+    file_cache.entries++;
+    file_cache.insertions++;
+    pthread_mutex_unlock(&cache_mutex);
+}
+
+void cache_invalidate(const char *filename) {
+    pthread_mutex_lock(&cache_mutex);
+    file_cache.epoch++;
+    cache_entry_t *entry = cache_find_locked(filename);
+    if (entry) {
+        cache_remove_locked(entry);
+        file_cache.invalidations++;
+    }
+    pthread_mutex_unlock(&cache_mutex);
+}
+
 /*
  * Utility Functions
  */
+// write() until everything is sent (large buffers may be written partially)
+ssize_t write_all(int fd, const void *data, size_t length) {
+    size_t done = 0;
+    while (done < length) {
+        ssize_t n = write(fd, (const char *)data + done, length - done);
+        if (n < 0 && errno == EINTR) continue;
+        if (n <= 0) return done > 0 ? (ssize_t)done : n;
+        done += n;
+    }
+    return (ssize_t)done;
+}
+
 void send_response(int socket, const char *status, const char *message) {
     char response[MAX_BUFFER];
     snprintf(response, MAX_BUFFER, "%s %s\n", status, message);
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Unit tests for the asyncio client library against a fake server (run with pytest)"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'client'))
+
+from aioclient import AsyncFileClient, FileLockedError, ServerError
+
+
+class FakeServer:
+    """asyncio stand-in for file_server: one command per connection"""
+
+    def __init__(self, respond):
+        self.respond = respond      # async (command, reader, writer) -> None
+        self.commands = []
+        self.active = 0
+        self.peak = 0
+        self.closed = 0
+
+    async def handle(self, reader, writer):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            auth = await reader.readline()
+            assert auth.startswith(b"AUTH ")
+            command = (await reader.readline()).decode().strip()
+            self.commands.append(command)
+            await self.respond(command, reader, writer)
+            await writer.drain()
+        finally:
+            self.active -= 1
+            self.closed += 1
+            writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_upload_download_and_list_framing():
+    stored = {}
+
+    async def respond(command, reader, writer):
+        op, *args = command.split()
+        if op == "UPLOAD":
+            writer.write(b"READY Send file data\n")
+            stored[args[0]] = await reader.readexactly(int(args[1]))
+            writer.write(b"SUCCESS File uploaded successfully\n")
+        elif op == "DOWNLOAD":
+            data = stored[args[0]]
+            writer.write(f"SUCCESS {len(data)}\n".encode() + data[:3])
+            await writer.drain()
+            writer.write(data[3:])
+        elif op == "LIST":
+            writer.write(b"SUCCESS\n" + "".join(f"{n} ({len(d)} bytes)\n" for n, d in stored.items()).encode())
+
+    async def main():
+        async with FakeServer(respond) as server:
+            client = AsyncFileClient(port=server.port)
+            assert await client.upload("a.txt", b"hello world") == "File uploaded successfully"
+            assert await client.download("a.txt") == b"hello world"
+            assert await client.list() == [("a.txt", 11)]
+
+    run(main())
+
+
+def test_concurrency_limit_and_many_operations():
+    async def respond(command, reader, writer):
+        await asyncio.sleep(0.01)
+        writer.write(b"SUCCESS 4\ndata")
+
+    async def main():
+        async with FakeServer(respond) as server:
+            client = AsyncFileClient(port=server.port, max_connections=5)
+            results = await asyncio.gather(*(client.download(f"f{i}") for i in range(200)))
+            assert results == [b"data"] * 200
+            assert server.peak <= 5
+            assert client.in_flight == 0
+
+    run(main())
+
+
+def test_errors_are_typed():
+    async def respond(command, reader, writer):
+        if command.startswith("UPLOAD"):
+            writer.write(b"ERROR File is locked by another process\n")
+        elif command.startswith("DOWNLOAD"):
+            writer.write(b"SUCCESS 10\nshort")
+        else:
+            writer.write(b"ERROR File not found\n")
+
+    async def main():
+        async with FakeServer(respond) as server:
+            client = AsyncFileClient(port=server.port)
+            with pytest.raises(FileLockedError):
+                await client.upload("a.txt", b"x")
+            with pytest.raises(ServerError) as info:
+                await client.delete("missing.txt")
+            assert not info.value.locked and info.value.message == "File not found"
+            with pytest.raises(ConnectionError):
+                await client.download("a.txt")
+
+    run(main())
+
+
+def test_timeout_and_cancellation_close_the_connection():
+    async def respond(command, reader, writer):
+        await reader.read()     # Never answers; returns when the client hangs up
+
+    async def main():
+        async with FakeServer(respond) as server:
+            client = AsyncFileClient(port=server.port, timeout=0.2)
+            with pytest.raises(asyncio.TimeoutError):
+                await client.stat("a.txt")
+
+            slow = AsyncFileClient(port=server.port, timeout=30)
+            task = asyncio.create_task(slow.stat("b.txt"))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            for _ in range(50):
+                if server.closed == 2:
+                    break
+                await asyncio.sleep(0.02)
+            assert server.closed == 2
+            assert client.in_flight == slow.in_flight == 0
+
+    run(main())
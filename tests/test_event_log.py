@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Unit tests for the persistent security event log (run with pytest)"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from event_log import EventLog
+from security import SecurityManager
+from state_backend import MemoryBackend
+
+T0 = 1_700_000_000
+
+
+def event(n, type_='AUTH_FAIL', ip='10.0.0.1', ts=None):
+    ts = T0 + n if ts is None else ts
+    return {'timestamp': datetime.fromtimestamp(ts).isoformat(), 'type': type_, 'ip': ip,
+            'severity': 'HIGH', 'n': n}
+
+
+def fill(log, count, step=10, batch=1000):
+    for n in range(count):
+        log.append(event(n, 'AUTH_FAIL' if n % 3 else 'CLIENT_BLOCKED', f"10.0.0.{n % 4}", T0 + n * step))
+        if n % batch == batch - 1:
+            log.flush()
+    log.flush()
+
+
+def test_query_filters_by_type_ip_and_time(tmp_path):
+    log = EventLog(str(tmp_path), bucket_seconds=60)
+    fill(log, 100)
+
+    assert [e['n'] for e in log.query(limit=3)] == [97, 98, 99]
+    assert all(e['type'] == 'CLIENT_BLOCKED' for e in log.query(event_type='CLIENT_BLOCKED', limit=100))
+    assert len(log.query(event_type='CLIENT_BLOCKED', limit=100)) == 34
+    assert [e['n'] for e in log.query(ip='10.0.0.2', limit=2)] == [94, 98]
+    window = log.query(since=T0 + 200, until=T0 + 290, limit=100)
+    assert [e['n'] for e in window] == list(range(20, 30))
+    assert [e['n'] for e in log.query(event_type='CLIENT_BLOCKED', ip='10.0.0.3',
+                                      since=T0 + 500, until=T0 + 530, limit=10)] == [51]
+    log.close()
+
+
+def test_log_survives_restart(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=2000)
+    fill(log, 60, batch=5)
+    log.close()
+
+    reopened = EventLog(str(tmp_path), segment_bytes=2000)
+    assert [e['n'] for e in reopened.query(limit=2)] == [58, 59]
+    assert len(reopened.query(ip='10.0.0.1', limit=1000)) == 15
+    reopened.append(event(60, ts=T0 + 600))
+    reopened.flush()
+    assert reopened.query(limit=1)[0]['n'] == 60
+    reopened.close()
+
+
+def test_segments_rotate_and_expire(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=1000, max_segments=3)
+    fill(log, 200, batch=5)
+    log.close()
+
+    segments = [name for name in os.listdir(tmp_path) if name.endswith('.jsonl')]
+    assert len(segments) <= 3
+    events = log.query(limit=1000)
+    assert events[-1]['n'] == 199
+    assert events[0]['n'] > 0   # Oldest segments were deleted
+
+
+def test_torn_tail_is_truncated_on_load(tmp_path):
+    log = EventLog(str(tmp_path))
+    fill(log, 5)
+    log.close()
+    segment = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[-1])
+    with open(segment, 'ab') as f:
+        f.write(b'{"type": "AUTH_F')
+
+    reopened = EventLog(str(tmp_path))
+    assert [e['n'] for e in reopened.query(limit=10)] == [0, 1, 2, 3, 4]
+    reopened.close()
+
+
+def test_sealed_segment_without_index_skips_bad_lines(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=1000)
+    fill(log, 30, batch=5)
+    log.close()
+    sealed = sorted(name for name in os.listdir(tmp_path) if name.endswith('.jsonl'))[0]
+    path = os.path.join(tmp_path, sealed)
+    os.unlink(path[:-len('jsonl')] + 'idx')
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    lines[2] = b'{"type": "AUTH_F\n'
+    with open(path, 'wb') as f:
+        f.writelines(lines)
+    size = os.path.getsize(path)
+
+    reopened = EventLog(str(tmp_path), segment_bytes=1000)
+    assert os.path.getsize(path) == size     # Only the active segment is ever truncated
+    assert [e['n'] for e in reopened.query(limit=100)] == [n for n in range(30) if n != 2]
+    reopened.close()
+
+
+def test_security_manager_persists_and_queries_events(tmp_path):
+    security = SecurityManager(state=MemoryBackend(), log_dir=str(tmp_path))
+    security.track_auth_failure('10.0.0.9', 'mallory')
+    security.track_file_operation('a.txt', 'alice', 'WRITE')
+    security.event_log.flush()
+
+    restarted = SecurityManager(state=MemoryBackend(), log_dir=str(tmp_path))
+    events = restarted.query_events(event_type='AUTH_FAIL', ip='10.0.0.9')
+    assert [e['username'] for e in events] == ['mallory']
+    assert restarted.query_events(ip='10.0.0.8') == []
+
+
+def test_events_evicted_from_memory_stay_in_the_log(tmp_path):
+    security = SecurityManager(state=MemoryBackend(), max_events=2, log_dir=str(tmp_path))
+    for n in range(30):
+        security.track_file_operation(f"f{n}.txt", "alice", "WRITE")
+    security.event_log.close()
+
+    assert [e['file'] for e in security.security_events] == ['f28.txt', 'f29.txt']
+    logged = security.query_events(event_type='FILE_WRITE', limit=100)
+    assert [e['file'] for e in logged] == [f"f{n}.txt" for n in range(30)]
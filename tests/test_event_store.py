@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Unit tests for the ring-buffered security event store (run with pytest)"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from event_store import EventStore, SharedEventStore
+from security import SecurityManager
+from state_backend import MemoryBackend, SQLiteBackend
+
+
+def event(n, severity='INFO', type_='FILE_WRITE'):
+    return {'timestamp': f"2026-01-01T00:00:{n:06d}", 'type': type_, 'severity': severity, 'n': n}
+
+
+@pytest.fixture(params=["local", "shared"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return EventStore(capacity=8)
+    return SharedEventStore(SQLiteBackend(str(tmp_path / "state.db")), capacity=8)
+
+
+def test_recent_returns_newest_events_oldest_first(store):
+    for n in range(5):
+        store.append(event(n))
+    assert [e['n'] for e in store.recent(3)] == [2, 3, 4]
+    assert [e['n'] for e in store.recent()] == [0, 1, 2, 3, 4]
+
+
+def test_severity_and_type_indexes(store):
+    for n in range(6):
+        store.append(event(n, 'HIGH' if n % 2 else 'INFO', 'AUTH_FAIL' if n % 2 else 'FILE_WRITE'))
+    store.append(event(6, 'CRITICAL', 'CLIENT_BLOCKED'))
+    assert [e['n'] for e in store.by_severity(['HIGH', 'CRITICAL'], 3)] == [3, 5, 6]
+    assert [e['n'] for e in store.by_type('AUTH_FAIL', 10)] == [1, 3, 5]
+    assert store.by_severity(['LOW'], 5) == []
+
+
+def test_counters_are_cumulative(store):
+    for n in range(20):
+        store.append(event(n, 'HIGH' if n < 4 else 'INFO'))
+    counts = store.counts()
+    assert counts['total'] == 20
+    assert counts['by_severity'] == {'HIGH': 4, 'INFO': 16}
+    assert counts['by_type'] == {'FILE_WRITE': 20}
+
+
+def test_ring_evicts_oldest_and_keeps_indexes_consistent():
+    store = EventStore(capacity=4)
+    store.append(event(0, 'HIGH'))
+    for n in range(1, 10):
+        store.append(event(n))
+    assert len(store) == 4
+    assert [e['n'] for e in store.recent()] == [6, 7, 8, 9]
+    assert store.by_severity(['HIGH'], 10) == []   # Evicted from the ring
+    assert [e['n'] for e in store.by_type('FILE_WRITE', 2)] == [8, 9]
+
+
+def test_security_manager_summary_uses_counters(tmp_path):
+    security = SecurityManager(state=MemoryBackend(), max_events=3, log_dir="")
+    for n in range(5):
+        security.track_file_operation(f"f{n}.txt", "alice", "WRITE")
+    security.track_auth_failure("10.0.0.1", "bob")
+    security.track_auth_failure("10.0.0.1", "bob")
+
+    summary = security.get_summary()
+    assert summary['total_events'] == 7
+    assert summary['high_severity'] == 1
+    assert summary['events_by_type']['FILE_WRITE'] == 5
+    assert len(summary['recent_events']) == 3
+    assert [e['failure_count'] for e in security.get_high_severity_events()] == [2]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Unit tests for the file integrity hash store (run with pytest)"""
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from integrity_store import HashStore, hash_content
+from security import SecurityManager
+from state_backend import MemoryBackend
+
+
+def test_hash_content_accepts_bytes_streams_and_chunks():
+    data = os.urandom(300000)
+    expected = hashlib.sha256(data).hexdigest()
+    assert hash_content(data) == expected
+    assert hash_content(io.BytesIO(data), chunk_size=4096) == expected
+    assert hash_content(data[i:i + 1000] for i in range(0, len(data), 1000)) == expected
+
+
+def test_changes_are_batched_until_flush(tmp_path):
+    path = str(tmp_path / "hashes.jsonl")
+    store = HashStore(path, flush_delay=60)
+    for n in range(10):
+        store[f"f{n}"] = f"h{n}"
+    assert not os.path.exists(path)
+
+    store.flush()
+    with open(path) as f:
+        assert len(f.readlines()) == 10
+    store.close()
+
+
+def test_debounced_flush_runs_after_delay(tmp_path):
+    path = str(tmp_path / "hashes.jsonl")
+    store = HashStore(path, flush_delay=0.05)
+    store["a"] = "1"
+    store["b"] = "2"
+    deadline = time.time() + 2
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    assert HashStore(path).items() == {"a": "1", "b": "2"}.items()
+    store.close()
+
+
+def test_reload_replays_updates_and_deletes(tmp_path):
+    path = str(tmp_path / "hashes.jsonl")
+    store = HashStore(path, flush_delay=0)
+    store["a"] = "1"
+    store["b"] = "2"
+    store["a"] = "3"
+    del store["b"]
+    store.close()
+    assert dict(HashStore(path).items()) == {"a": "3"}
+
+
+def test_torn_tail_is_truncated_and_failed_flush_is_retried(tmp_path):
+    path = str(tmp_path / "hashes.jsonl")
+    store = HashStore(path, flush_delay=0)
+    store["a"] = "1"
+    store.close()
+    with open(path, 'a') as f:
+        f.write('{"file": "b", "ha')
+
+    store = HashStore(path, flush_delay=60)
+    store["c"] = "2"
+    store["d"] = "4"
+    os.rename(path, path + ".moved")
+    os.mkdir(path)                          # Appends now fail
+    store.flush()
+    store["c"] = "3"                        # Newer than the failed change
+    os.rmdir(path)
+    os.rename(path + ".moved", path)
+    store.close()
+    assert dict(HashStore(path).items()) == {"a": "1", "c": "3", "d": "4"}
+
+
+def test_log_is_compacted(tmp_path):
+    path = str(tmp_path / "hashes.jsonl")
+    store = HashStore(path, flush_delay=0, compact_min_records=5)
+    for n in range(12):
+        store["same"] = str(n)
+    store.close()
+    with open(path) as f:
+        assert len(f.readlines()) < 5
+    assert HashStore(path).get("same") == "11"
+
+
+def test_legacy_state_is_imported(tmp_path):
+    legacy = tmp_path / "security_state.json"
+    legacy.write_text(json.dumps({"file_hashes": {"old.txt": "abc"}}))
+    path = str(tmp_path / "hashes.jsonl")
+    assert HashStore(path, legacy_path=str(legacy)).get("old.txt") == "abc"
+    assert HashStore(path).get("old.txt") == "abc"
+
+
+def test_security_manager_checks_integrity_from_a_stream(tmp_path):
+    security = SecurityManager(state=MemoryBackend(), hashes_path=str(tmp_path / "hashes.jsonl"),
+                               log_dir="")
+    assert security.check_file_integrity("a.bin", io.BytesIO(b"x" * 100000))[0]
+    assert security.check_file_integrity("a.bin", [b"x" * 50000, b"x" * 50000])[0]
+    ok, reason = security.check_file_integrity("a.bin", b"changed")
+    assert not ok and "FILE_INTEGRITY_ALERT" in reason
+    security.file_hashes.close()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Unit tests for the API metrics registry and /metrics exposition (run with pytest)"""
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from metrics import Metrics
+
+
+def samples(text):
+    """exposition text -> {'name{labels}': value} (comments skipped)"""
+    result = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            key, value = line.rsplit(' ', 1)
+            result[key] = float(value)
+    return result
+
+
+def test_request_counters_gauge_and_histogram():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.request_started('/api/list')
+    metrics.request_started('/api/list')
+    metrics.request_finished('/api/list', 'GET', 200, 0.005)
+    metrics.request_finished('/api/list', 'GET', 200, 0.05)
+
+    text = metrics.render()
+    assert '# TYPE api_request_duration_seconds histogram' in text
+    values = samples(text)
+    assert values['api_requests_in_flight{route="/api/list"}'] == 0
+    assert values['api_requests_total{route="/api/list",method="GET",status="200"}'] == 2
+    labels = 'route="/api/list",method="GET"'
+    assert values[f'api_request_duration_seconds_bucket{{{labels},le="0.01"}}'] == 1
+    assert values[f'api_request_duration_seconds_bucket{{{labels},le="0.1"}}'] == 2
+    assert values[f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 2
+    assert values[f'api_request_duration_seconds_count{{{labels}}}'] == 2
+    assert values[f'api_request_duration_seconds_sum{{{labels}}}'] == pytest.approx(0.055)
+
+
+def test_per_thread_shards_merge_and_retire():
+    metrics = Metrics()
+    live = threading.Event()
+    done = threading.Event()
+
+    def worker(count, hold):
+        for _ in range(count):
+            metrics.inc('api_requests_total', (('route', '/x'),))
+        if hold:
+            live.set()
+            done.wait()
+
+    threads = [threading.Thread(target=worker, args=(100, False)) for _ in range(200)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    holder = threading.Thread(target=worker, args=(5, True))
+    holder.start()
+    live.wait()
+
+    assert samples(metrics.render())['api_requests_total{route="/x"}'] == 20005
+    assert len(metrics._shards) == 1        # finished threads folded into the retired shard
+    done.set()
+    holder.join()
+    assert samples(metrics.render())['api_requests_total{route="/x"}'] == 20005
+
+
+def test_c_server_calls_by_command_and_error_type():
+    metrics = Metrics()
+    with metrics.c_server_call('UPLOAD a.txt 5\n') as call:
+        call.sent, call.received = 40, 30
+    with metrics.c_server_call('DELETE a.txt') as call:
+        call.fail('ERROR File is locked by another process')
+    for error in (socket.timeout(), ConnectionRefusedError(), ValueError('bad')):
+        with pytest.raises(type(error)):
+            with metrics.c_server_call('LIST alice'):
+                raise error
+
+    values = samples(metrics.render())
+    assert values['c_server_requests_total{command="UPLOAD"}'] == 1
+    assert values['c_server_sent_bytes_total{command="UPLOAD"}'] == 40
+    assert values['c_server_received_bytes_total{command="UPLOAD"}'] == 30
+    assert values['c_server_errors_total{command="DELETE",type="locked"}'] == 1
+    assert values['c_server_request_duration_seconds_count{command="LIST"}'] == 3
+    for error in ('timeout', 'refused', 'ValueError'):
+        assert values[f'c_server_errors_total{{command="LIST",type="{error}"}}'] == 1
+
+
+def test_disabled_and_label_escaping():
+    metrics = Metrics(enabled=False)
+    metrics.request_started('/api/list')
+    with metrics.c_server_call('LIST'):
+        pass
+    assert metrics.render() == '\n'
+
+    metrics = Metrics()
+    metrics.inc('api_requests_total', (('route', 'a"b\\c\nd'),))
+    assert 'api_requests_total{route="a\\"b\\\\c\\nd"} 1' in metrics.render()
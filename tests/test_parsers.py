@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Unit tests for the API's C server output parsers (run with pytest)"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from parsers import (format_bytes, parse_audit_log_line, parse_event_line, parse_list_response,
+                     parse_security_log_line)
+
+
+def test_parse_list_response_skips_headers_and_bad_lines():
+    response = "SUCCESS\nFiles:\nalice/a.txt (12 bytes)\nb.bin (2048 bytes)\nbroken (x bytes)\n"
+    assert parse_list_response(response) == [('alice/a.txt', 12), ('b.bin', 2048)]
+    assert parse_list_response("SUCCESS \n") == []
+
+
+def test_log_line_parsers():
+    audit = parse_audit_log_line("[2026-01-27 21:47:10] OPERATION=DOWNLOAD FILE=demo.txt STATUS=SUCCESS "
+                                 "DETAILS=Sent 12 bytes")
+    assert audit == {'timestamp': '2026-01-27 21:47:10', 'operation': 'DOWNLOAD', 'file': 'demo.txt',
+                     'status': 'SUCCESS', 'details': 'Sent 12 bytes'}
+
+    security = parse_security_log_line("[2026-01-27 21:47:10] EVENT=AUTH_FAIL IP=10.0.0.1 FILE=N/A "
+                                       "DETAILS=Wrong token")
+    assert (security['event'], security['ip'], security['details']) == ('AUTH_FAIL', '10.0.0.1', 'Wrong token')
+
+    event = parse_event_line("[2026-01-27 21:47:10] LOCK_ACQUIRED a.txt WRITE 42 alice GRANTED")
+    assert (event['event_type'], event['filename'], event['pid'], event['status']) == \
+        ('LOCK_ACQUIRED', 'a.txt', '42', 'GRANTED')
+    assert parse_event_line("garbage")['event_type'] == 'PARSE_ERROR'
+
+
+def test_format_bytes():
+    assert format_bytes(512) == "512.0 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_bytes(5 * 1024 ** 4) == "5.0 TB"
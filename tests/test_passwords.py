@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Unit tests for salted password hashing and verification (run with pytest)"""
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from auth import AuthManager
+from passwords import PasswordHasher
+from state_backend import MemoryBackend
+
+
+def fast_hasher(**kwargs):
+    return PasswordHasher(scrypt_n=1024, workers=0, **kwargs)
+
+
+def test_salted_hashes_verify():
+    hasher = fast_hasher()
+    first, second = hasher.hash("pw"), hasher.hash("pw")
+    assert first != second and first.startswith("$scrypt$n=1024,r=8,p=1$")
+    assert hasher.verify("u", "pw", first) == (True, False)
+    assert hasher.verify("u", "nope", first) == (False, False)
+    assert hasher.verify("u", "pw", "$scrypt$garbage") == (False, False)
+
+
+def test_pbkdf2_and_parameter_changes_need_rehash():
+    pbkdf2 = PasswordHasher(scheme="pbkdf2", pbkdf2_iterations=1000, workers=0)
+    encoded = pbkdf2.hash("pw")
+    assert encoded.startswith("$pbkdf2-sha256$i=1000$")
+    assert fast_hasher().verify("u", "pw", encoded) == (True, True)
+    assert PasswordHasher(scrypt_n=2048, workers=0).verify("u", "pw", fast_hasher().hash("pw")) == (True, True)
+
+
+def test_cache_skips_kdf_and_follows_hash_changes():
+    hasher = fast_hasher(cache_ttl=60)
+    encoded = hasher.hash("pw")
+    hasher.verify("u", "pw", encoded)
+    hasher.verify("u", "pw", encoded)
+    assert hasher.cache_hits == 1
+    assert hasher.verify("u", "pw", hasher.hash("other"))[0] is False
+
+
+def test_process_pool_verification():
+    hasher = PasswordHasher(scrypt_n=1024, workers=2, cache_ttl=0)
+    try:
+        encoded = hasher.hash("pw")
+        assert hasher.verify("u", "pw", encoded) == (True, False)
+
+        for worker in list(hasher._workers):
+            worker.process.kill()
+            worker.process.wait()
+        for _ in range(2):
+            with pytest.raises((OSError, EOFError)):
+                hasher.verify("u", "pw", encoded)
+        assert hasher.verify("u", "pw", encoded) == (True, False)   # Dead workers were replaced
+    finally:
+        hasher.shutdown()
+
+
+def test_legacy_hash_is_upgraded_on_login(tmp_path):
+    db = tmp_path / "users.db"
+    db.write_text(f"erin:{hashlib.sha256(b'pw').hexdigest()}:user\n")
+    manager = AuthManager(users_path=str(db), sessions_path=str(tmp_path / "sessions.json"),
+                          sweep_interval=0, state=MemoryBackend(), password_hasher=fast_hasher())
+
+    assert manager.authenticate("erin", "pw", "127.0.0.1")[0]
+    assert db.read_text().startswith("erin:$scrypt$")
+    assert manager.authenticate("erin", "pw", "127.0.0.1")[0]
+    assert not manager.authenticate("erin", "wrong", "127.0.0.1")[0]
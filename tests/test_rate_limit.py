@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Unit tests for sliding-window brute-force tracking (run with pytest)"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from rate_limit import RateTracker, SharedRateTracker
+from security import SecurityManager
+from state_backend import MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["local", "shared"])
+def tracker(request, tmp_path):
+    config = dict(window=100, buckets=10, threshold=3, block_duration=50)
+    if request.param == "local":
+        return RateTracker(**config)
+    return SharedRateTracker(SQLiteBackend(str(tmp_path / "state.db")), "test", **config)
+
+
+# Bucket-aligned current time (the shared backend expires keys in real time)
+T0 = int(time.time()) // 10 * 10
+
+
+def test_failures_decay_out_of_the_window(tracker):
+    assert tracker.record("ip", now=T0) == (1, None)
+    assert tracker.record("ip", now=T0 + 50) == (2, None)
+    # The first failure has left the 100s window
+    assert tracker.record("ip", now=T0 + 105) == (2, None)
+    assert tracker.count("ip", now=T0 + 105) == 2
+
+
+def test_threshold_blocks(tracker):
+    tracker.record("ip", now=T0)
+    tracker.record("ip", now=T0 + 1)
+    assert tracker.record("ip", now=T0 + 2) == (3, T0 + 52)
+    assert tracker.blocked_until("ip", now=T0 + 10) == T0 + 52
+    assert tracker.count("ip", now=T0 + 10) == 0
+
+
+def test_local_tracker_memory_is_bounded():
+    tracker = RateTracker(threshold=0, max_keys=100, max_blocked=10)
+    for i in range(1000):
+        tracker.record(f"10.0.{i // 256}.{i % 256}")
+        tracker.block(f"b{i}", 1e12 + i)
+    assert len(tracker) == 100
+    assert len(tracker.blocked()) == 10
+
+    tracker.block("old", 1.0)
+    tracker.purge(now=2.0)
+    assert tracker.blocked_until("old") is None
+
+
+def test_blocks_expire_in_any_order_and_live_blocks_are_never_evicted():
+    tracker = RateTracker(threshold=0, max_blocked=3)
+    assert tracker.block("long", 1000.0, now=0) == 1000.0
+    tracker.block("short1", 10.0, now=0)
+    tracker.block("short2", 20.0, now=0)
+    assert tracker.block("sprayed", 1000.0, now=5) is None     # Full of live blocks
+    assert tracker.blocked_until("short1", now=5) == 10.0
+
+    tracker.purge(now=30)                                       # Expired behind a longer block
+    assert sorted(tracker._blocked) == ["long"]
+    assert tracker.block("sprayed", 1000.0, now=30) == 1000.0
+
+    tracker.block("long", 2000.0, now=30)                       # Renewal outlives the old expiry
+    tracker.purge(now=1500)
+    assert tracker.blocked_until("long", now=1500) == 2000.0
+    assert tracker.blocked_until("sprayed", now=1500) is None
+
+
+def test_security_manager_blocks_after_three_failures():
+    security = SecurityManager(state=MemoryBackend(), log_dir="")
+    assert security.track_auth_failure("1.2.3.4", "mallory")[0]
+    assert security.track_auth_failure("1.2.3.4", "mallory")[0]
+    assert security.track_auth_failure("1.2.3.4", "mallory") == (False, "IP blocked after 3 failures")
+    assert security.is_ip_blocked("1.2.3.4")[0]
+    assert security.get_summary()["blocked_ips"] == 1
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Unit tests for workload capture (API request trace) and replay planning (run with pytest)"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, os.path.join(ROOT, 'api_layer'))
+
+from replay import MAX_UPLOAD, load_audit, load_trace, plan
+from request_trace import RequestTrace
+
+AUDIT = """\
+[2026-01-27 20:28:17] OPERATION=SERVER_START FILE=N/A STATUS=SUCCESS DETAILS=File server started
+[2026-01-27 20:28:17] OPERATION=UPLOAD FILE=alice/a.bin STATUS=SUCCESS DETAILS=Size: 2048 bytes
+[2026-01-27 20:28:17] OPERATION=LIST FILE=all STATUS=SUCCESS DETAILS=Listed files
+[2026-01-27 20:28:17] OPERATION=UPLOAD FILE=alice/b.bin STATUS=FAILED DETAILS=File locked
+[2026-01-27 20:28:17] OPERATION=DOWNLOAD FILE=alice/a.bin STATUS=SUCCESS DETAILS=Size: 2048 bytes
+[2026-01-27 20:28:19] OPERATION=DOWNLOAD FILE=bob/c.bin STATUS=SUCCESS DETAILS=Size: 100 bytes Range: 0+100
+[2026-01-27 20:28:19] OPERATION=DELETE FILE=alice/a.bin STATUS=SUCCESS DETAILS=File deleted
+"""
+
+
+def test_audit_log_becomes_timed_workload():
+    events = load_audit(AUDIT.splitlines())
+    assert [(e['op'], e['file'], e['bytes']) for e in events] == [
+        ('upload', 'alice/a.bin', 2048), ('list', 'all', 0), ('download', 'alice/a.bin', 2048),
+        ('download', 'bob/c.bin', 100), ('delete', 'alice/a.bin', 0)]
+    offsets = [e['ts'] - events[0]['ts'] for e in events]
+    assert offsets == pytest.approx([0.0, 1 / 3, 2 / 3, 2.0, 2.5])     # same-second entries spread evenly
+
+    failed = load_audit(AUDIT.splitlines(), include_failed=True)
+    assert [e['file'] for e in failed if e['op'] == 'upload'] == ['alice/a.bin', 'alice/b.bin']
+
+
+def test_plan_sizes_uploads_and_preloads_missing_files():
+    events, preload = plan(load_audit(AUDIT.splitlines(), include_failed=True))
+    assert preload == {'bob/c.bin': 100}
+    assert [e['bytes'] for e in events if e['op'] == 'upload'] == [2048, 4096]
+
+    events, _ = plan([{'ts': 0.0, 'op': 'upload', 'file': 'huge', 'bytes': MAX_UPLOAD * 2}])
+    assert events[0]['bytes'] == MAX_UPLOAD
+
+
+def test_api_trace_round_trip(tmp_path):
+    path = str(tmp_path / 'trace' / 'requests.jsonl')
+    trace = RequestTrace(path)
+    trace.record(1767225600.5, 'upload', 'alice/a.bin', 4096, 200, 0.003)
+    trace.record(1767225600.1, 'list', None, 0, 200, 0.001)
+    trace.record(1767225601.0, 'download', 'alice/x.bin', 0, 404, 0.002)
+    trace.close()
+    assert not RequestTrace('').enabled
+
+    with open(path) as f:
+        lines = f.readlines()
+    events = load_trace(lines)
+    assert [(e['op'], e['file'], e['bytes']) for e in events] == [('list', 'N/A', 0),
+                                                                  ('upload', 'alice/a.bin', 4096)]
+    assert len(load_trace(lines, include_failed=True)) == 3
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Unit tests for the append-only session journal (run with pytest)"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from session_store import Session, SessionJournal, SessionTable
+
+
+def session(token, login_time=1000.0):
+    return Session(token, "user-" + token, "user", "127.0.0.1", login_time)
+
+
+def test_replay_restores_sessions(tmp_path):
+    journal = SessionJournal(str(tmp_path / "sessions.json"), touch_interval=0)
+    a = session("a")
+    journal.record_create(a)
+    journal.record_create(session("b"))
+    a.last_activity = 1500.0
+    journal.record_touch(a)
+    journal.record_delete("b")
+    journal.close()
+
+    sessions = SessionJournal(str(tmp_path / "sessions.json")).load()
+    assert list(sessions) == ["a"]
+    assert sessions["a"].last_activity == 1500.0
+    assert sessions["a"].username == "user-a"
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    journal = SessionJournal(str(tmp_path / "sessions.json"))
+    journal.record_create(session("a"))
+    journal.close()
+    with open(journal.journal_path, 'ab') as f:
+        f.write('{"op": "create", "token": "\u00e9'.encode()[:-1])   # Torn inside a UTF-8 character
+
+    reloaded = SessionJournal(str(tmp_path / "sessions.json"))
+    assert list(reloaded.load()) == ["a"]
+    reloaded.record_create(session("b"))
+    reloaded.close()
+    assert list(SessionJournal(str(tmp_path / "sessions.json")).load()) == ["a", "b"]
+
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    journal = SessionJournal(str(tmp_path / "sessions.json"), compact_min_records=3)
+    table = {}
+    for token in ("a", "b", "c"):
+        table[token] = session(token)
+        journal.record_create(table[token])
+    assert not journal.needs_compaction(len(table))
+    assert journal.needs_compaction(1)
+
+    journal.compact(table)
+    journal.record_delete("a")
+    journal.close()
+
+    with open(tmp_path / "sessions.json") as f:
+        assert set(json.load(f)) == {"a", "b", "c"}
+    assert set(SessionJournal(str(tmp_path / "sessions.json")).load()) == {"b", "c"}
+
+
+def test_touches_are_rate_limited(tmp_path):
+    journal = SessionJournal(str(tmp_path / "sessions.json"), touch_interval=60)
+    a = session("a")
+    journal.record_create(a)
+    assert journal.record_touch(a) is False
+    journal.close()
+
+
+def test_legacy_iso_snapshot_is_converted(tmp_path):
+    with open(tmp_path / "sessions.json", 'w') as f:
+        json.dump({"a": {"username": "alice", "role": "user", "token": "a", "client_ip": "",
+                         "login_time": "2026-01-27T23:45:35", "last_activity": "2026-01-27T23:45:36"}}, f)
+    sessions = SessionJournal(str(tmp_path / "sessions.json")).load()
+    assert sessions["a"].last_activity - sessions["a"].login_time == 1.0
+
+
+def test_sweep_evicts_by_max_age_and_idle_timeout():
+    table = SessionTable(max_age=100, idle_timeout=10)
+    for token in ("a", "b", "c"):
+        table.add(session(token))
+    table.touch(table.get("a"), 1008.0)
+    table.touch(table.get("b"), 1008.0)
+    table.remove("c")
+
+    assert table.sweep(now=1011.0) == []
+    table.touch(table.get("a"), 1015.0)
+    assert table.sweep(now=1019.0) == ["b"]
+    assert table.sweep(now=1100.0) == ["a"]
+    assert len(table) == 0
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Unit tests for stateless signed session tokens (run with pytest)"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from auth import AuthManager
+from signed_tokens import RevocationList, TokenSigner, load_or_create_key
+
+
+def make_signer(tmp_path, key=b"k" * 32):
+    return TokenSigner(key, RevocationList(str(tmp_path / "revoked")), max_age=100)
+
+
+def test_issue_verify_expire(tmp_path):
+    signer = make_signer(tmp_path)
+    token = signer.issue("alice", "admin", now=1000)
+
+    payload = signer.verify(token, now=1050)
+    assert payload["u"] == "alice" and payload["r"] == "admin"
+    assert signer.verify(token, now=1100) is None
+    assert make_signer(tmp_path, key=b"x" * 32).verify(token, now=1050) is None
+    assert signer.verify(token[:-2] + "AA", now=1050) is None
+
+
+def test_revocation_is_shared_between_workers(tmp_path):
+    worker_a, worker_b = make_signer(tmp_path), make_signer(tmp_path)
+    token = worker_a.issue("alice", "user")
+    assert worker_b.verify(token)
+
+    assert worker_a.revoke(token)
+    assert worker_b.verify(token) is None
+
+
+def test_compaction_drops_expired_entries(tmp_path):
+    revocations = RevocationList(str(tmp_path / "revoked"))
+    revocations.revoke("old", 1.0)
+    revocations.revoke("live", 4e9)
+    revocations.compact()
+
+    with open(tmp_path / "revoked") as f:
+        assert f.read().split() == ["live", "4000000000"]
+
+
+def test_auth_manager_signed_mode(tmp_path):
+    db = tmp_path / "users.db"
+    db.write_text("")
+    manager = AuthManager(users_path=str(db), sessions_path=str(tmp_path / "sessions.json"),
+                          sweep_interval=0, token_mode="signed",
+                          token_key_path=str(tmp_path / "token.key"),
+                          revoked_path=str(tmp_path / "revoked"))
+    manager.add_user("carol", "secret")
+
+    ok, _, token = manager.authenticate("carol", "secret", "127.0.0.1")
+    assert ok and manager.get_active_sessions_count() == 0
+    assert manager.get_session_info(token)["username"] == "carol"
+    assert manager.logout(token)
+    assert manager.validate_token(token) == (False, None)
+
+
+def test_signing_key_is_created_once_and_short_keys_are_refused(tmp_path):
+    path = str(tmp_path / "keys" / "token.key")
+    key = load_or_create_key(path)
+    assert len(key) == 32 and load_or_create_key(path) == key
+    assert os.listdir(tmp_path / "keys") == ["token.key"]
+
+    with open(path, 'wb'):
+        pass  # Empty key left by a crash
+    with pytest.raises(ValueError):
+        load_or_create_key(path, timeout=0.1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Unit tests for the pluggable API state backends (run with pytest)"""
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from auth import AuthManager
+from security import SecurityManager
+from state_backend import CachedBackend, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "state.db"))
+
+
+def test_keys_counters_and_expiry(backend):
+    backend.set("ns", "a", {"x": 1})
+    backend.set("ns", "old", 1, expires_at=time.time() - 1)
+    assert backend.get("ns", "a") == {"x": 1}
+    assert backend.get("ns", "old") is None
+    assert backend.count("ns") == 1
+
+    assert backend.incr("hits", "k") == 1
+    assert backend.incr("hits", "k", 5) == 6
+    backend.set("hits", "stale", 9, expires_at=time.time() - 1)
+    assert backend.incr("hits", "stale") == 1
+
+    backend.set("ns", "gone", 1, expires_at=time.time() - 1)
+    assert "gone" in backend.purge_expired("ns")
+    assert backend.delete("ns", "a") and not backend.delete("ns", "a")
+
+
+def test_prefix_items_and_event_lists(backend):
+    backend.set("w", "f1\0alice", True)
+    backend.set("w", "f1\0bob", True)
+    backend.set("w", "f2\0carol", True)
+    assert set(backend.items("w", "f1\0")) == {"f1\0alice", "f1\0bob"}
+
+    for i in range(5):
+        backend.append("events", {"n": i})
+    assert [e["n"] for e in backend.tail("events", 2)] == [3, 4]
+    assert backend.length("events") == 5
+
+
+def test_cached_reads_and_own_write_invalidation(tmp_path):
+    shared = SQLiteBackend(str(tmp_path / "state.db"))
+    cached = CachedBackend(shared, ttl=60)
+    cached.set("ns", "k", 1)
+    assert cached.get("ns", "k") == 1
+
+    shared.set("ns", "k", 2)           # Another worker's write
+    assert cached.get("ns", "k") == 1  # Served from cache within the TTL
+    cached.set("ns", "k", 3)           # Own write invalidates
+    assert cached.get("ns", "k") == 3
+
+
+def _bump(path, n):
+    backend = SQLiteBackend(path)
+    for _ in range(n):
+        backend.incr("c", "k")
+
+
+def test_sqlite_counters_are_atomic_across_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    SQLiteBackend(path)
+    workers = [multiprocessing.Process(target=_bump, args=(path, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert SQLiteBackend(path).get("c", "k") == 800
+
+
+def test_managers_share_state_through_sqlite(tmp_path):
+    db = tmp_path / "users.db"
+    db.write_text("")
+    path = str(tmp_path / "state.db")
+
+    def worker():
+        return AuthManager(users_path=str(db), sessions_path=str(tmp_path / "sessions.json"),
+                           sweep_interval=0, state=SQLiteBackend(path))
+
+    worker_a, worker_b = worker(), worker()
+    worker_a.add_user("dave", "pw")
+    ok, _, token = worker_a.authenticate("dave", "pw", "10.0.0.1")
+    assert ok and worker_b.validate_token(token)[0]
+    assert worker_b.logout(token)
+    assert worker_a.validate_token(token) == (False, None)
+
+    security_a = SecurityManager(state=SQLiteBackend(path))
+    security_b = SecurityManager(state=SQLiteBackend(path))
+    for _ in range(3):
+        security_a.track_auth_failure("10.0.0.9", "eve")
+    assert security_b.is_ip_blocked("10.0.0.9")[0]
+    assert security_b.get_summary()["blocked_ips"] == 1
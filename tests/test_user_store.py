@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Unit tests for the cached users.db index (run with pytest)"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api_layer'))
+
+from auth import AuthManager, UserStore
+
+
+def write_users(path, lines):
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def test_lookup_and_reload_on_change(tmp_path):
+    db = tmp_path / "users.db"
+    write_users(db, ["# comment", "alice:aaa:admin", "bad line"])
+    store = UserStore(str(db))
+
+    assert store.get("alice") == ("aaa", "admin")
+    assert store.refresh() is False
+
+    write_users(db, ["alice:aaa:admin", "bob:bbb:user"])
+    assert store.get("bob") == ("bbb", "user")
+
+
+def test_add_and_remove_keep_file_in_sync(tmp_path):
+    db = tmp_path / "users.db"
+    write_users(db, ["# users", "alice:aaa:admin"])
+    store = UserStore(str(db))
+
+    store.add_user("bob", "bbb")
+    store.add_user("alice", "ccc", "user")
+    assert store.remove_user("nobody") is False
+    assert store.remove_user("bob") is True
+
+    assert UserStore(str(db)).all() == {"alice": ("ccc", "user")}
+    assert db.read_text().startswith("# users\n")
+
+
+def test_authenticate_uses_store(tmp_path):
+    db = tmp_path / "users.db"
+    db.write_text("")
+    manager = AuthManager(users_path=str(db), sessions_path=str(tmp_path / "sessions.json"),
+                          sweep_interval=0)
+
+    manager.add_user("carol", "secret", "user")
+    ok, _, token = manager.authenticate("carol", "secret", "127.0.0.1")
+    assert ok and token
+
+    manager.remove_user("carol")
+    ok, _, _ = manager.authenticate("carol", "secret", "127.0.0.1")
+    assert not ok